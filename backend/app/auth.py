@@ -1,11 +1,18 @@
+import asyncio
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .database import get_db
@@ -14,8 +21,19 @@ from .models import User
 SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below the configured cost are flagged by verify_and_update and rehashed on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
@@ -35,14 +53,122 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash when the stored one uses an outdated cost."""
+    try:
+        if not hashed_password or len(hashed_password) < 20:
+            return False, None
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception as e:
+        print(f"Password verification error: {e}")
+        return False, None
+
+
+class PasswordHashPool:
+    """Dedicated, size-limited executor for bcrypt work.
+
+    Keeps password hashing off the shared Starlette threadpool so login spikes
+    can't starve other endpoints. At most `workers` hashes run at once and
+    `max_pending` more may wait; beyond that callers get a fast 503.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente em instantes",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot follows the job, not the request: a cancelled request (client gone)
+        # leaves a running hash behind, which must still count against the limit
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+password_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await password_pool.run(verify_and_update_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
+
+
+def create_access_token(subject: str, expires_delta: Optional[timedelta] = None, user_id: Optional[int] = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode = {"sub": subject, "exp": expire}
+    if user_id is not None:
+        # Lets routes that only need the id skip loading the user
+        to_encode["uid"] = user_id
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+class UserCache:
+    """Small thread-safe TTL + LRU cache of resolved users, keyed by token subject (email).
+
+    Entries are detached copies of the User row, so they can be shared between
+    requests and sessions. Routes that modify the user must load it from their
+    own session and call `invalidate` afterwards.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return user
+
+    def put(self, subject: str, user: User):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+def _detached_copy(user: User) -> User:
+    """Copy the column values into a new instance that belongs to no session."""
+    values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    return User(**values)
+
+
+def _decode_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,13 +176,68 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    payload = _decode_token(token)
+    email: str = payload["sub"]
+
+    user = user_cache.get(email)
+    if user is not None:
+        return user
 
     user = db.query(User).filter(User.email == email).first()
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = _detached_copy(user)
+    user_cache.put(email, user)
+    return user
+
+
+def get_current_user_id(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> int:
+    """Resolve only the user id: straight from the token, without touching the database."""
+    payload = _decode_token(token)
+    uid = payload.get("uid")
+    if isinstance(uid, int):
+        return uid
+    # Tokens issued before the id was embedded still go through the cached lookup
+    return get_current_user(db, token).id
+
+
+# DATABASE_MODE=async versions, installed as dependency overrides in main.py:
+# the same cache, with the lookup on a miss awaited on the AsyncSession
+async def get_current_user_async(db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    payload = _decode_token(token)
+    email: str = payload["sub"]
+
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = _detached_copy(user)
+    user_cache.put(email, user)
+    return user
+
+
+async def get_current_user_id_async(db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)) -> int:
+    payload = _decode_token(token)
+    uid = payload.get("uid")
+    if isinstance(uid, int):
+        return uid
+    return (await get_current_user_async(db, token)).id
@@ -0,0 +1,53 @@
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from .models import Bank, Vault
+
+
+def adjust_bank_balance(db: Session, bank_id: Optional[int], delta: Decimal):
+    """Apply a vault balance change to its bank, keeping Bank.current_balance = sum of vaults."""
+    if bank_id and delta:
+        db.query(Bank).filter(Bank.id == bank_id).update(
+            {Bank.current_balance: Bank.current_balance + delta}, synchronize_session=False
+        )
+
+
+def adjust_vault_balance(db: Session, vault: Vault, delta: Decimal):
+    """Atomically add `delta` to a vault and its bank, in the caller's transaction."""
+    if not delta:
+        return
+    db.query(Vault).filter(Vault.id == vault.id).update(
+        {Vault.balance: Vault.balance + delta}, synchronize_session=False
+    )
+    adjust_bank_balance(db, vault.bank_id, delta)
+
+
+def move_vault_balance(db: Session, vault_id: int, from_bank_id: Optional[int], to_bank_id: Optional[int]):
+    """Move a vault's balance between banks (None = out of / into no bank), reading it in the same statements."""
+    balance = select(Vault.balance).where(Vault.id == vault_id).scalar_subquery()
+    if from_bank_id:
+        db.query(Bank).filter(Bank.id == from_bank_id).update(
+            {Bank.current_balance: Bank.current_balance - balance}, synchronize_session=False
+        )
+    if to_bank_id:
+        db.query(Bank).filter(Bank.id == to_bank_id).update(
+            {Bank.current_balance: Bank.current_balance + balance}, synchronize_session=False
+        )
+
+
+def sync_bank_balances(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute every bank's current_balance from its vaults in one statement. Returns rows updated."""
+    vault_sum = (
+        select(func.coalesce(func.sum(Vault.balance), 0))
+        .where(Vault.bank_id == Bank.id)
+        .scalar_subquery()
+    )
+    stmt = update(Bank).values(current_balance=vault_sum)
+    if user_id is not None:
+        stmt = stmt.where(Bank.user_id == user_id)
+    result = db.execute(stmt)
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,119 @@
+"""
+In-process registry of categories, shared by validation and listing.
+
+System categories only change through `python migrate.py`, so they are loaded
+once (on startup, or on first use) and kept. Each user's own categories are
+loaded in one query and kept in an LRU with a TTL; the category routes call
+`invalidate` after every write. Entries are versioned: a load that started
+before an invalidation is not stored, so a slow reader cannot put back the
+categories an edit just replaced.
+
+Other workers learn about a write when their entry expires, or immediately
+for a category they do not know yet: a miss on a category id reloads the
+user's entry once before answering 404.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .models import Category
+
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "1024"))
+CATEGORY_CACHE_TTL_SECONDS = float(os.getenv("CATEGORY_CACHE_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class CachedCategory:
+    """Detached copy of a Category row; readable by CategoryOut like the ORM object."""
+    id: int
+    user_id: Optional[int]
+    name: str
+    type: str
+    is_system: bool
+    icon: Optional[str]
+    created_at: Optional[datetime]
+
+
+def _load(db: Session, *criteria) -> Dict[int, CachedCategory]:
+    rows = db.query(
+        Category.id, Category.user_id, Category.name, Category.type, Category.is_system, Category.icon,
+        Category.created_at,
+    ).filter(*criteria).order_by(Category.id).all()
+    return {r.id: CachedCategory(r.id, r.user_id, r.name, r.type, bool(r.is_system), r.icon, r.created_at) for r in rows}
+
+
+class CategoryRegistry:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._system: Optional[Dict[int, CachedCategory]] = None
+        self._users: "OrderedDict[int, Tuple[float, Dict[int, CachedCategory]]]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def load_system(self, db: Session) -> Dict[int, CachedCategory]:
+        system = _load(db, Category.is_system == True)
+        with self._lock:
+            self._system = system
+        return system
+
+    def _system_categories(self, db: Session) -> Dict[int, CachedCategory]:
+        system = self._system
+        return system if system is not None else self.load_system(db)
+
+    def _user_categories(self, db: Session, user_id: int, reload: bool = False) -> Dict[int, CachedCategory]:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and not reload and entry[0] >= time.monotonic():
+                self._users.move_to_end(user_id)
+                return entry[1]
+            version = self._versions.get(user_id, 0)
+        categories = _load(db, Category.user_id == user_id, Category.is_system != True)
+        if self.max_size <= 0:
+            return categories
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._users[user_id] = (time.monotonic() + self.ttl, categories)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_size:
+                    evicted, _ = self._users.popitem(last=False)
+                    self._versions.pop(evicted, None)
+        return categories
+
+    def get(self, db: Session, user_id: int, category_id: int) -> Optional[CachedCategory]:
+        """The category if it is a system category or one of the user's own, else None."""
+        category = self._system_categories(db).get(category_id)
+        if category is None:
+            category = self._user_categories(db, user_id).get(category_id)
+        if category is None:
+            # Possibly created by another worker after this entry was loaded
+            category = self._user_categories(db, user_id, reload=True).get(category_id)
+        return category
+
+    def for_user(self, db: Session, user_id: int) -> List[CachedCategory]:
+        """System categories and the user's own, by id."""
+        merged = {**self._system_categories(db), **self._user_categories(db, user_id)}
+        return [merged[key] for key in sorted(merged)]
+
+    def names(self, db: Session, user_id: int) -> Dict[int, str]:
+        return {c.id: c.name for c in self.for_user(db, user_id)}
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._system = None
+            self._users.clear()
+            self._versions.clear()
+
+
+category_registry = CategoryRegistry(CATEGORY_CACHE_SIZE, CATEGORY_CACHE_TTL_SECONDS)
@@ -0,0 +1,108 @@
+"""
+In-process domain events.
+
+Transaction writes call `emit` after their commit; the event goes onto an
+asyncio queue owned by the running app and is consumed in the background
+(`app/notifications.py`), so the writer never waits for whatever reacts to it.
+`emit` is safe from the event loop and from threadpool workers, never blocks
+and never raises: when the queue is full, or no app is running (CLI scripts,
+tests without the lifespan), the event is dropped and counted.
+"""
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class TransactionEvent:
+    """A committed write to a user's transactions.
+
+    kind: "created" (one transaction), "plan_created" (an installment purchase,
+    `amount` is its total), "imported" (a statement import, one event per month
+    and category with the summed amount) or "recurring_posted".
+    """
+    kind: str
+    user_id: int
+    type: str
+    amount: Decimal
+    date: date
+    category_id: Optional[int] = None
+    credit_card_id: Optional[int] = None
+    source_id: Optional[int] = None  # Transaction or plan id
+    description: Optional[str] = None
+
+
+class EventBus:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    def start(self):
+        """Bind to the running event loop; called from the app's lifespan."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.max_size)
+
+    def stop(self) -> List[TransactionEvent]:
+        """Unbind and return the events still queued."""
+        queue, self._queue, self._loop = self._queue, None, None
+        pending = []
+        while queue is not None and not queue.empty():
+            pending.append(queue.get_nowait())
+        return pending
+
+    def _put(self, events):
+        queue = self._queue
+        if queue is None:
+            return
+        for n, event in enumerate(events):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(len(events) - n)
+                return
+
+    def _drop(self, count: int):
+        with self._lock:
+            self.dropped += count
+
+    def emit(self, *events: TransactionEvent):
+        loop = self._loop
+        if loop is None or not events:
+            return
+        try:
+            loop.call_soon_threadsafe(self._put, events)
+        except RuntimeError:
+            # Loop closed while shutting down
+            self._drop(len(events))
+
+    async def next_batch(self, max_size: int, wait: float) -> List[TransactionEvent]:
+        """Wait for one event, then give others `wait` seconds to arrive; at most `max_size`."""
+        queue = self._queue
+        batch = [await queue.get()]
+        if wait > 0 and queue.qsize() < max_size - 1:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Leave the event for stop() to hand over
+                self._put(batch)
+                raise
+        while len(batch) < max_size and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+
+bus = EventBus(EVENT_QUEUE_SIZE)
+emit = bus.emit
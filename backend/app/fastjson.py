@@ -0,0 +1,57 @@
+"""
+Opt-in fast path for large list responses (FAST_JSON=1, needs orjson).
+
+The default path loads ORM objects, builds one pydantic model per row to
+validate the `response_model` and then JSON-encodes the result. On the fast
+path a route selects only the response's columns as row tuples, labelled with
+the response model's field names, and returns them serialized by orjson: no
+ORM identity map, no pydantic objects, no second encoding pass.
+
+The JSON is the same as the response model would produce (floats for Numeric
+columns, ISO dates); `benchmarks/serialization.py` checks this and measures the
+gain. Since `response_model` no longer validates these responses, a route's
+column list must be kept in step with its schema.
+"""
+import os
+from decimal import Decimal
+from typing import Any, Iterable, List, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: without it every route stays on the pydantic path
+    orjson = None
+
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+
+def enabled() -> bool:
+    return FAST_JSON and orjson is not None
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def model_columns(model, schema) -> Tuple:
+    """The model's columns named like the schema's fields, in the schema's order."""
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+def row_dicts(rows: Iterable) -> List[dict]:
+    """Rows of a column query as dicts keyed by their labels."""
+    return [row._asdict() for row in rows]
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+def json_response(request: Request, content: Any) -> Response:
+    """JSON response that keeps the cache headers set by the `etag` dependency."""
+    headers = getattr(request.state, "cache_headers", None)
+    return Response(dumps(content), media_type="application/json", headers=headers)
@@ -0,0 +1,250 @@
+"""
+Bulk import of bank statements (CSV or OFX) into transactions.
+
+Files are parsed as a stream, one row at a time. Rows are validated against
+lookup maps loaded once per import, then inserted with executemany in batches.
+Rollups and the vault balance each get a single aggregated update at the end.
+Everything runs in one DB transaction: either all valid rows are imported or none.
+After the commit, one event per month and category goes to the notification rules.
+"""
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .category_registry import category_registry
+from .models import Transaction, Vault
+from .balances import adjust_vault_balance
+from .events import TransactionEvent, emit
+from .invoices import invalidate as invalidate_invoices
+from .rollups import add_delta, apply_deltas, new_deltas
+from .versioning import bump_data_version
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# (line number, raw fields)
+RawRow = Tuple[int, Dict[str, str]]
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+_AMOUNT = re.compile(r"[+-]?\d[\d.,]*", re.ASCII)
+
+
+def _ungroup(integer: str, separator: str) -> Optional[str]:
+    """Digits of `integer` if every `separator` splits off a group of exactly three digits."""
+    if separator not in integer:
+        return integer
+    if not re.fullmatch(rf"[1-9]\d{{0,2}}(?:{re.escape(separator)}\d{{3}})+", integer):
+        return None
+    return integer.replace(separator, "")
+
+
+def parse_amount(raw: str) -> Decimal:
+    """Accept 1234.56, 1,234.56 and Brazilian 1.234,56 formats (optionally with R$ and a sign).
+
+    With both separators the last one is the decimal separator. A single
+    separator followed by exactly three digits ("1.234", "1,234") could be either
+    and is rejected, like NaN, Infinity and thousands groups of the wrong size.
+    Raises ValueError with a message for the import report.
+    """
+    value = raw.strip().replace("R$", "").replace(" ", "").replace("\xa0", "")
+    if not _AMOUNT.fullmatch(value):
+        raise ValueError(f"Valor inválido: {raw}")
+    sign = "-" if value[0] == "-" else ""
+    digits = value.lstrip("+-")
+
+    separators = {c for c in digits if c in ".,"}
+    integer, fraction = digits, ""
+    if len(separators) == 2:
+        # 1,234.56 / 1.234,56: the last separator is the decimal one
+        last = max(digits.rfind("."), digits.rfind(","))
+        integer, fraction = _ungroup(digits[:last], "," if digits[last] == "." else "."), digits[last + 1:]
+    elif separators:
+        separator = separators.pop()
+        if digits.count(separator) > 1:
+            # 1.234.567: thousands groups only
+            integer = _ungroup(digits, separator)
+        else:
+            integer, fraction = digits.split(separator)
+            if len(fraction) == 3 and integer[0] != "0":
+                raise ValueError(f"Valor ambíguo (separador de milhar ou decimal?): {raw}")
+    if integer is None or not integer.isdigit() or (fraction and not fraction.isdigit()) or digits[-1] in ".,":
+        raise ValueError(f"Valor inválido: {raw}")
+    return Decimal(f"{sign}{integer}.{fraction}" if fraction else f"{sign}{integer}")
+
+
+def parse_date(raw: str) -> date:
+    value = raw.strip()
+    # OFX dates carry a time/zone suffix (20260315120000[-3:BRT]); only the day matters
+    for fmt, size in (("%Y-%m-%d", 10), ("%d/%m/%Y", 10), ("%Y%m%d", 8)):
+        try:
+            return datetime.strptime(value[:size], fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {raw}")
+
+
+def iter_csv(stream: BinaryIO) -> Iterator[RawRow]:
+    """Rows of a CSV with a header line (date, amount, [type], [category], [description]).
+
+    The delimiter (',' or ';') is taken from the header line.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    header_line = text.readline()
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    header = [h.strip().lower() for h in next(csv.reader([header_line], delimiter=delimiter))]
+    for line_no, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield line_no, dict(zip(header, values))
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def iter_ofx(stream: BinaryIO) -> Iterator[RawRow]:
+    """<STMTTRN> entries of an OFX statement (SGML v1 or XML v2), read line by line."""
+    text = io.TextIOWrapper(stream, encoding="latin-1", newline=None)
+    current: Optional[Dict[str, str]] = None
+    start_line = 0
+    for line_no, line in enumerate(text, start=1):
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if closing and current is not None:
+                    yield start_line, {
+                        "date": current.get("DTPOSTED", ""),
+                        "amount": current.get("TRNAMT", ""),
+                        "description": current.get("MEMO") or current.get("NAME", ""),
+                    }
+                    current = None
+                elif not closing:
+                    current = {}
+                    start_line = line_no
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def import_statement(
+    db: Session,
+    user_id: int,
+    rows: Iterator[RawRow],
+    vault: Optional[Vault] = None,
+    bank_id: Optional[int] = None,
+    credit_card_id: Optional[int] = None,
+) -> ImportReport:
+    report = ImportReport()
+
+    # Lookups from the category registry instead of one query per row
+    categories = category_registry.for_user(db, user_id)
+    category_ids = {c.id for c in categories}
+    category_by_name: Dict[Tuple[str, str], int] = {}
+    for c in categories:
+        category_by_name.setdefault((c.name.strip().lower(), c.type), c.id)
+
+    vault_delta = Decimal("0")
+    first_date: Optional[date] = None
+    # Summed as rows stream in, so memory does not grow with the file
+    deltas = new_deltas()
+    batch: List[dict] = []
+
+    def flush():
+        if batch:
+            db.execute(insert(Transaction), batch)
+            batch.clear()
+
+    for line_no, raw in rows:
+        amount_raw = raw.get("amount") or raw.get("valor") or ""
+        try:
+            amount = parse_amount(amount_raw)
+        except ValueError as e:
+            report.add_error(line_no, str(e))
+            continue
+        try:
+            tx_date = parse_date(raw.get("date") or raw.get("data") or "")
+        except ValueError as e:
+            report.add_error(line_no, str(e))
+            continue
+
+        typ = (raw.get("type") or raw.get("tipo") or "").strip().lower()
+        if typ in ("receita", "credit"):
+            typ = "income"
+        elif typ in ("despesa", "debit"):
+            typ = "expense"
+        if not typ:
+            typ = "expense" if amount < 0 else "income"
+        if typ not in ("income", "expense"):
+            report.add_error(line_no, f"Tipo inválido: {typ}")
+            continue
+        amount = abs(amount)
+        if amount == 0:
+            report.add_error(line_no, "Valor deve ser diferente de zero")
+            continue
+
+        category_id = None
+        category_raw = (raw.get("category") or raw.get("categoria") or "").strip()
+        if category_raw:
+            if category_raw.isdigit():
+                category_id = int(category_raw) if int(category_raw) in category_ids else None
+            else:
+                category_id = category_by_name.get((category_raw.lower(), typ))
+            if category_id is None:
+                report.add_error(line_no, f"Categoria não encontrada: {category_raw}")
+                continue
+
+        description = (raw.get("description") or raw.get("descricao") or raw.get("descrição") or "").strip()[:255] or None
+        batch.append({
+            "user_id": user_id,
+            "amount": amount,
+            "type": typ,
+            "category_id": category_id,
+            "bank_id": bank_id,
+            "vault_id": vault.id if vault else None,
+            "credit_card_id": credit_card_id,
+            "installment_number": 1 if credit_card_id else None,
+            "total_installments": 1 if credit_card_id else None,
+            "date": tx_date,
+            "description": description,
+        })
+        add_delta(deltas, user_id, tx_date, category_id, typ, amount)
+        if first_date is None or tx_date < first_date:
+            first_date = tx_date
+        if vault:
+            vault_delta += amount if typ == "income" else -amount
+        report.imported += 1
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+
+    flush()
+    apply_deltas(db, deltas)
+    if vault:
+        adjust_vault_balance(db, vault, vault_delta)
+    if credit_card_id and first_date:
+        invalidate_invoices(db, credit_card_id, first_date)
+    if report.imported:
+        bump_data_version(db, user_id)
+    db.commit()
+    # One event per month and category, with the imported total
+    emit(*(
+        TransactionEvent("imported", user_id, typ, total, date(year, month, 1), category_id or None, credit_card_id)
+        for (_, year, month, category_id, typ), (total, _) in deltas.items()
+    ))
+    return report
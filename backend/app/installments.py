@@ -0,0 +1,142 @@
+"""
+Installment plans: a credit card purchase split over N months is stored once
+(InstallmentPlan) and its per-month installments are computed when read.
+
+Every reader that used to see one Transaction per installment (listing,
+reports, rollups) goes through `expand`, so the plan row stays the single
+source of truth: editing or cancelling a purchase touches one row.
+"""
+import calendar
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Query, Session
+
+from .category_registry import category_registry
+from .models import InstallmentPlan
+from .rollups import CENT, apply_deltas, collect_deltas
+
+
+@dataclass
+class PlanInstallment:
+    """One month of a plan, shaped like a Transaction for TransactionOut."""
+    plan: InstallmentPlan
+    installment_number: int
+    date: date
+    amount: Decimal
+
+    # Installments have no transaction row
+    id = None
+    bank_id = None
+    vault_id = None
+    bank_name = None
+    vault_name = None
+
+    @property
+    def installment_plan_id(self):
+        return self.plan.id
+
+    @property
+    def user_id(self):
+        return self.plan.user_id
+
+    @property
+    def type(self):
+        return self.plan.type
+
+    @property
+    def category_id(self):
+        return self.plan.category_id
+
+    @property
+    def credit_card_id(self):
+        return self.plan.credit_card_id
+
+    @property
+    def total_installments(self):
+        return self.plan.installments
+
+    @property
+    def description(self):
+        return f"{self.plan.description or ''} ({self.installment_number}/{self.plan.installments})".strip()
+
+    @property
+    def category_name(self):
+        return self.plan.category_name
+
+    @property
+    def credit_card_name(self):
+        return self.plan.credit_card_name
+
+
+def installment_date(first_date: date, number: int) -> date:
+    """Date of installment `number` (1-based): same day as the first, clamped to the month's last day."""
+    months = first_date.month - 1 + number - 1
+    year, month = first_date.year + months // 12, months % 12 + 1
+    return date(year, month, min(first_date.day, calendar.monthrange(year, month)[1]))
+
+
+def installment_amounts(total: Decimal, installments: int) -> List[Decimal]:
+    """Equal installments rounded to cents; the last one absorbs the rounding difference."""
+    total = Decimal(str(total))
+    base = (total / installments).quantize(CENT, rounding=ROUND_HALF_UP)
+    return [base] * (installments - 1) + [total - base * (installments - 1)]
+
+
+def expand(plan: InstallmentPlan, start: Optional[date] = None, end: Optional[date] = None) -> List[PlanInstallment]:
+    """Installments of `plan` dated within [start, end) (None = unbounded), in date order."""
+    result = []
+    for number, amount in enumerate(installment_amounts(plan.total_amount, plan.installments), start=1):
+        day = installment_date(plan.first_date, number)
+        if start and day < start:
+            continue
+        if end and day >= end:
+            break
+        result.append(PlanInstallment(plan, number, day, amount))
+    return result
+
+
+def overlapping(q: Query, start: Optional[date], end: Optional[date]) -> Query:
+    """Restrict a plan query to plans with at least one installment possibly within [start, end)."""
+    if start:
+        q = q.filter(InstallmentPlan.last_date >= start)
+    if end:
+        q = q.filter(InstallmentPlan.first_date < end)
+    return q
+
+
+def record_plans(db: Session, plans: Iterable[InstallmentPlan], sign: int = 1):
+    """Reflect added (sign=1) or removed (sign=-1) plans in the monthly rollups, one entry per installment."""
+    apply_deltas(db, collect_deltas(
+        ((p.user_id, i.date, p.category_id, p.type, i.amount) for p in plans for i in expand(p)), sign
+    ))
+
+
+def report_rows(db: Session, user_id: int, start: Optional[date], end: Optional[date]) -> List[Tuple[date, str, Decimal, str, str]]:
+    """(date, type, amount, category name, description) of every installment in [start, end), by date."""
+    names = category_registry.names(db, user_id)
+    plans = overlapping(db.query(InstallmentPlan).filter(InstallmentPlan.user_id == user_id), start, end).all()
+    rows = [
+        (i.date, i.type, i.amount, names.get(plan.category_id, ""), i.description)
+        for plan in plans for i in expand(plan, start, end)
+    ]
+    rows.sort(key=lambda r: r[0])
+    return rows
+
+
+def new_plan(user_id: int, credit_card_id: int, category_id: Optional[int], type_: str,
+             total_amount: Decimal, installments: int, first_date: date,
+             description: Optional[str]) -> InstallmentPlan:
+    return InstallmentPlan(
+        user_id=user_id,
+        credit_card_id=credit_card_id,
+        category_id=category_id,
+        type=type_,
+        total_amount=total_amount,
+        installments=installments,
+        first_date=first_date,
+        last_date=installment_date(first_date, installments),
+        description=description,
+    )
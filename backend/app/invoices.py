@@ -0,0 +1,224 @@
+"""
+Credit card invoices (faturas).
+
+A billing cycle is named after the month its invoice closes (202603 closes in
+March 2026) and covers purchases from the previous closing date (inclusive) up
+to its own closing date (exclusive): a purchase made on the closing day goes to
+the next invoice. The invoice is due on `due_day` of the closing month, or of
+the following month when `due_day` is not after `closing_day`.
+
+Closed cycles are stored in `invoice_snapshots` the first time they are read, so
+only the open cycle is computed on every request. Writes that land in a closed
+cycle (a backdated purchase, a plan change, a new closing day) drop the affected
+snapshots through `invalidate`, and they are rebuilt on the next read.
+"""
+import calendar
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+from .installments import PlanInstallment, expand, overlapping
+from .models import CreditCard, InstallmentPlan, InvoiceSnapshot, Transaction
+
+
+@dataclass
+class Invoice:
+    cycle: int
+    start_date: date
+    closing_date: date
+    due_date: date
+    status: str = "open"  # open, closed or future
+    total: Decimal = Decimal("0")
+    count: int = 0
+
+    @property
+    def label(self) -> str:
+        return format_cycle(self.cycle)
+
+
+def _clamped(year: int, month: int, day: int) -> date:
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def shift_cycle(cycle: int, months: int) -> int:
+    index = (cycle // 100) * 12 + (cycle % 100 - 1) + months
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def format_cycle(cycle: int) -> str:
+    return f"{cycle // 100}-{cycle % 100:02d}"
+
+
+def parse_cycle(label: str) -> int:
+    """'2026-03' -> 202603. Raises ValueError on anything else."""
+    year, month = label.split("-")
+    if len(year) != 4 or not 1 <= int(month) <= 12:
+        raise ValueError(label)
+    return int(year) * 100 + int(month)
+
+
+def cycle_of(card: CreditCard, day: date) -> int:
+    """Cycle whose invoice will contain a purchase made on `day`."""
+    if day < _clamped(day.year, day.month, card.closing_day):
+        return day.year * 100 + day.month
+    return shift_cycle(day.year * 100 + day.month, 1)
+
+
+def cycle_bounds(card: CreditCard, cycle: int) -> Invoice:
+    year, month = divmod(cycle, 100)
+    previous = shift_cycle(cycle, -1)
+    due_cycle = cycle if card.due_day > card.closing_day else shift_cycle(cycle, 1)
+    return Invoice(
+        cycle=cycle,
+        start_date=_clamped(previous // 100, previous % 100, card.closing_day),
+        closing_date=_clamped(year, month, card.closing_day),
+        due_date=_clamped(due_cycle // 100, due_cycle % 100, card.due_day),
+    )
+
+
+def _plans(db: Session, card: CreditCard, start: date, end: Optional[date]):
+    return overlapping(
+        db.query(InstallmentPlan).filter(
+            InstallmentPlan.user_id == card.user_id, InstallmentPlan.credit_card_id == card.id
+        ),
+        start, end,
+    )
+
+
+def _totals(db: Session, card: CreditCard, start: date, end: Optional[date]) -> Tuple[Decimal, int]:
+    """Amount owed (purchases minus refunds) and entry count for purchases in [start, end)."""
+    signed = case((Transaction.type == "income", -Transaction.amount), else_=Transaction.amount)
+    q = db.query(func.coalesce(func.sum(signed), 0), func.count(Transaction.id)).filter(
+        Transaction.user_id == card.user_id,
+        Transaction.credit_card_id == card.id,
+        Transaction.date >= start,
+    )
+    if end:
+        q = q.filter(Transaction.date < end)
+    total, count = q.one()
+    total = Decimal(str(total))
+    for plan in _plans(db, card, start, end).all():
+        for inst in expand(plan, start, end):
+            total += -inst.amount if plan.type == "income" else inst.amount
+            count += 1
+    return total, count
+
+
+def invalidate(db: Session, credit_card_id: int, from_date: Optional[date] = None):
+    """Drop snapshots of cycles that contain `from_date` or come after it (all of them when None).
+
+    Runs in the caller's transaction, together with the write that changed the cycle.
+    """
+    q = db.query(InvoiceSnapshot).filter(InvoiceSnapshot.credit_card_id == credit_card_id)
+    if from_date:
+        q = q.filter(InvoiceSnapshot.closing_date > from_date)
+    q.delete(synchronize_session=False)
+
+
+def list_invoices(db: Session, card: CreditCard, today: date, months: int) -> List[Invoice]:
+    """The open invoice and the `months - 1` closed ones before it, newest first."""
+    open_cycle = cycle_of(card, today)
+    cycles = [shift_cycle(open_cycle, -i) for i in range(months)]
+    snapshots = {
+        s.cycle: s for s in db.query(InvoiceSnapshot).filter(
+            InvoiceSnapshot.credit_card_id == card.id, InvoiceSnapshot.cycle.in_(cycles[1:])
+        )
+    }
+
+    result = []
+    created = False
+    for cycle in cycles:
+        invoice = cycle_bounds(card, cycle)
+        snapshot = snapshots.get(cycle)
+        if snapshot:
+            invoice.status = "closed"
+            invoice.total, invoice.count = Decimal(str(snapshot.total)), snapshot.count
+        else:
+            invoice.total, invoice.count = _totals(db, card, invoice.start_date, invoice.closing_date)
+            if cycle != open_cycle:
+                invoice.status = "closed"
+                try:
+                    # Savepoint: a concurrent request may have stored the same snapshot
+                    with db.begin_nested():
+                        db.add(InvoiceSnapshot(
+                            credit_card_id=card.id, cycle=cycle,
+                            start_date=invoice.start_date, closing_date=invoice.closing_date,
+                            due_date=invoice.due_date, total=invoice.total, count=invoice.count,
+                        ))
+                    created = True
+                except IntegrityError:
+                    pass
+        result.append(invoice)
+    if created:
+        db.commit()
+    return result
+
+
+def get_invoice(db: Session, card: CreditCard, cycle: int, today: date) -> Tuple[Invoice, List[Union[Transaction, PlanInstallment]]]:
+    """One invoice with its entries (purchases and installments), by date."""
+    invoice = cycle_bounds(card, cycle)
+    open_cycle = cycle_of(card, today)
+    invoice.status = "open" if cycle == open_cycle else ("closed" if cycle < open_cycle else "future")
+
+    items: List[Union[Transaction, PlanInstallment]] = (
+        db.query(Transaction)
+        .options(joinedload(Transaction.category), joinedload(Transaction.credit_card))
+        .filter(
+            Transaction.user_id == card.user_id,
+            Transaction.credit_card_id == card.id,
+            Transaction.date >= invoice.start_date,
+            Transaction.date < invoice.closing_date,
+        )
+        .all()
+    )
+    plans = _plans(db, card, invoice.start_date, invoice.closing_date).options(
+        joinedload(InstallmentPlan.category), joinedload(InstallmentPlan.credit_card)
+    )
+    for plan in plans.all():
+        items.extend(expand(plan, invoice.start_date, invoice.closing_date))
+    items.sort(key=lambda i: i.date)
+
+    invoice.count = len(items)
+    for item in items:
+        amount = Decimal(str(item.amount))
+        invoice.total += -amount if item.type == "income" else amount
+    return invoice, items
+
+
+def outstanding(db: Session, cards: List[CreditCard], today: date) -> Dict[int, Decimal]:
+    """Open invoice plus everything billed to future cycles, by card id; two queries for any number of cards."""
+    starts = {card.id: cycle_bounds(card, cycle_of(card, today)).start_date for card in cards}
+    if not starts:
+        return {}
+    owners = {card.id: card.user_id for card in cards}
+    totals = {card_id: Decimal("0") for card_id in starts}
+
+    signed = case((Transaction.type == "income", -Transaction.amount), else_=Transaction.amount)
+    rows = db.query(Transaction.credit_card_id, func.coalesce(func.sum(signed), 0)).filter(or_(*(
+        and_(Transaction.user_id == owners[card_id], Transaction.credit_card_id == card_id, Transaction.date >= start)
+        for card_id, start in starts.items()
+    ))).group_by(Transaction.credit_card_id)
+    for card_id, total in rows:
+        totals[card_id] += Decimal(str(total))
+
+    plans = overlapping(db.query(InstallmentPlan).filter(InstallmentPlan.credit_card_id.in_(starts)),
+                        min(starts.values()), None)
+    for plan in plans:
+        if plan.user_id != owners[plan.credit_card_id]:
+            continue
+        for inst in expand(plan, starts[plan.credit_card_id]):
+            totals[plan.credit_card_id] += -inst.amount if plan.type == "income" else inst.amount
+    return totals
+
+
+def available_limit(db: Session, card: CreditCard, today: date) -> Decimal:
+    """Card limit minus the open invoice and everything already billed to future cycles.
+
+    Invoice payments are not tracked, so closed invoices are taken as paid.
+    """
+    return Decimal(str(card.limit)) - outstanding(db, [card], today)[card.id]
@@ -1,14 +1,20 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 
-from .database import Base, engine, SessionLocal
-from .models import Category
+from .database import DATABASE_MODE, SessionLocal, async_engine, get_db, get_async_db
+from .metrics import METRICS_ENABLED, QUERY_WARN_REPEATS, MetricsMiddleware, install_sql_hooks
+from .auth import get_current_user, get_current_user_id, get_current_user_async, get_current_user_id_async
+from .category_registry import category_registry
+from . import migrations, notifications, recurring_engine, report_jobs
+from .events import bus as event_bus
 from .routers import auth as auth_router
 from .routers import transactions as transactions_router
 from .routers import dashboard as dashboard_router
@@ -18,8 +24,55 @@ from .routers import vaults as vaults_router
 from .routers import categories as categories_router
 from .routers import credit_cards as credit_cards_router
 from .routers import recurring as recurring_router
+from .routers import budgets as budgets_router
+from .routers import notifications as notifications_router
+from .routers import health as health_router
+from .routers import metrics as metrics_router
 
-app = FastAPI(title="SysFinance API", version="0.1.0")
+def load_system_categories():
+    db = SessionLocal()
+    try:
+        category_registry.load_system(db)
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes run from `python migrate.py`; workers only check for pending ones
+    pending = []
+    if migrations.MIGRATE_ON_STARTUP:
+        await run_in_threadpool(migrations.upgrade)
+    else:
+        pending = await run_in_threadpool(migrations.pending_migrations)
+        if pending:
+            print(f"Database schema is {len(pending)} migration(s) behind: run `python migrate.py`")
+    if not pending:
+        await run_in_threadpool(load_system_categories)
+    scheduler = None
+    if recurring_engine.RECURRING_SCHEDULER_ENABLED:
+        scheduler = asyncio.create_task(recurring_engine.scheduler_loop())
+    consumer = None
+    if notifications.NOTIFICATIONS_ENABLED:
+        event_bus.start()
+        consumer = asyncio.create_task(notifications.consumer_loop())
+    yield
+    if scheduler:
+        scheduler.cancel()
+    if consumer:
+        await notifications.stop(consumer)
+    report_jobs.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(title="SysFinance API", version="0.1.0", lifespan=lifespan)
+
+if DATABASE_MODE == "async":
+    # Requests get an AsyncSession; sync endpoints run through it via app.routing.DBRoute
+    app.dependency_overrides[get_db] = get_async_db
+    app.dependency_overrides[get_current_user] = get_current_user_async
+    app.dependency_overrides[get_current_user_id] = get_current_user_id_async
 
 origins = [
     "http://localhost:5173",
@@ -38,6 +91,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED or QUERY_WARN_REPEATS:
+    # Added last so it is the outermost middleware and times the whole request
+    install_sql_hooks()
+    app.add_middleware(MetricsMiddleware)
+
 # Global exception handler to ensure CORS headers are sent on errors
 from fastapi import Request
 from fastapi.responses import JSONResponse
@@ -58,28 +116,6 @@ async def global_exception_handler(request: Request, exc: Exception):
         },
     )
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-# Seed default categories (income/expense)
-def seed_categories():
-    db: Session = SessionLocal()
-    try:
-        names = [("Salário", "income"), ("Investimentos", "income"), ("Alimentação", "expense"), ("Moradia", "expense"), ("Transporte", "expense")]
-        for name, typ in names:
-            exists = db.query(Category).filter(Category.name == name, Category.type == typ, Category.is_system == True).first()
-            if not exists:
-                # Check if old categories exist (without is_system) e update them?
-                # Or just create new ones with is_system=True
-                # For compatibility, let's assume we create new ones or use existing if name/type match
-                # Safe approach: create if not found
-                 db.add(Category(name=name, type=typ, is_system=True))
-        db.commit()
-    finally:
-        db.close()
-
-seed_categories()
-
 # Routers
 app.include_router(auth_router.router)
 app.include_router(transactions_router.router)
@@ -90,6 +126,11 @@ app.include_router(vaults_router.router)
 app.include_router(categories_router.router)
 app.include_router(credit_cards_router.router)
 app.include_router(recurring_router.router)
+app.include_router(budgets_router.router)
+app.include_router(notifications_router.router)
+app.include_router(health_router.router)
+if METRICS_ENABLED:
+    app.include_router(metrics_router.router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,239 @@
+"""
+Request and SQL instrumentation, exported in Prometheus text format at /metrics.
+
+`MetricsMiddleware` times every request and labels it by route template
+(`/transactions/plans/{id}`, not the raw path) and status. SQLAlchemy engine
+events add each statement's duration and row count to the current request's
+`RequestStats`, found through a context variable: it follows the request into
+the threadpool and into `AsyncSession.run_sync`, so every engine is covered.
+
+Rows come from the driver's rowcount, which PostgreSQL reports for SELECTs but
+SQLite only for writes; ORM objects loaded are counted separately, so the N+1
+shape of a route shows on either database.
+
+N+1 detection: the same SQL text run many times in one request is the
+signature of a lazy load inside a loop. With `QUERY_WARN_REPEATS=N` (local
+development) any request that repeats a statement N times or more is logged;
+`tests/test_query_budget.py` asserts per-endpoint limits with the same data.
+
+Metrics are kept in memory per process. With several workers, each one
+exposes its own numbers. They are off unless METRICS_ENABLED=1; set
+METRICS_TOKEN too when the API is reachable from outside.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+# Off by default: /metrics and the pool details of /health/db describe the deployment
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+# When set, /metrics and /health/db require `Authorization: Bearer <METRICS_TOKEN>`
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_MAX_SQL = int(os.getenv("SLOW_REQUEST_MAX_SQL", "5"))
+QUERY_WARN_REPEATS = int(os.getenv("QUERY_WARN_REPEATS", "0"))  # 0 = off
+
+# Upper bounds (seconds) of the latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_STATEMENTS_KEPT = 200
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_time: float = 0.0
+    rows: int = 0
+    objects: int = 0
+    # (duration, statement) of the first MAX_STATEMENTS_KEPT statements, for the slow-request log
+    sql: List[Tuple[float, str]] = field(default_factory=list)
+    executions: Counter = field(default_factory=Counter)  # statement text -> times run
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statements run at least `threshold` times, most repeated first."""
+        return [(sql, n) for sql, n in self.executions.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+@dataclass
+class RouteMetrics:
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    latency_sum: float = 0.0
+    statuses: Dict[int, int] = field(default_factory=dict)
+    statements: int = 0
+    db_time: float = 0.0
+    rows: int = 0
+    objects: int = 0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+    def observe(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+        with self._lock:
+            m = self.routes.get((method, route))
+            if m is None:
+                m = self.routes[(method, route)] = RouteMetrics()
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    m.buckets[i] += 1
+                    break
+            else:
+                m.buckets[-1] += 1
+            m.count += 1
+            m.latency_sum += elapsed
+            m.statuses[status] = m.statuses.get(status, 0) + 1
+            m.statements += stats.statements
+            m.db_time += stats.db_time
+            m.rows += stats.rows
+            m.objects += stats.objects
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            routes = sorted(self.routes.items())
+            lines = [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), m in routes:
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, m.buckets):
+                    cumulative += n
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.latency_sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.count}")
+
+            lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route), m in routes:
+                for status, n in sorted(m.statuses.items()):
+                    lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {n}')
+
+            for name, help_text, attr, fmt in (
+                ("http_request_db_statements_total", "SQL statements executed while serving the route.", "statements", "{}"),
+                ("http_request_db_seconds_total", "Time spent in SQL statements while serving the route.", "db_time", "{:.6f}"),
+                ("http_request_db_rows_total", "Rows reported by the driver (returned or affected).", "rows", "{}"),
+                ("http_request_orm_objects_loaded_total", "ORM objects loaded from query results.", "objects", "{}"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), m in routes:
+                    lines.append(f'{name}{{method="{method}",route="{route}"}} {fmt.format(getattr(m, attr))}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("metrics_query_start")
+    if stats is None or not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats.statements += 1
+    stats.db_time += elapsed
+    stats.executions[statement] += 1
+    # rowcount: rows returned on PostgreSQL; SQLite only reports rows changed by writes
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if len(stats.sql) < MAX_STATEMENTS_KEPT:
+        stats.sql.append((elapsed, statement))
+
+
+def _on_load(target, context):
+    stats = _current.get()
+    if stats is not None:
+        stats.objects += 1
+
+
+def install_sql_hooks():
+    """Listen on every Engine (sync engines and the ones behind AsyncEngine) and every mapper. Idempotent."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Mapper, "load", _on_load)
+
+
+def _short(statement: str, limit: int = 500) -> str:
+    return " ".join(statement.split())[:limit]
+
+
+def _log_slow_request(method: str, path: str, status: int, elapsed: float, stats: RequestStats):
+    print(
+        f"Slow request: {method} {path} -> {status} in {elapsed * 1000:.1f} ms "
+        f"({stats.statements} SQL, {stats.db_time * 1000:.1f} ms in DB, {stats.objects} objects loaded)"
+    )
+    for duration, statement in sorted(stats.sql, key=lambda s: s[0], reverse=True)[:SLOW_REQUEST_MAX_SQL]:
+        print(f"  {duration * 1000:8.1f} ms  {_short(statement)}")
+
+
+def _warn_repeats(method: str, route: str, stats: RequestStats):
+    for statement, n in stats.repeated(QUERY_WARN_REPEATS):
+        print(f"Possible N+1: {method} {route} ran the same statement {n}x: {_short(statement, 200)}")
+
+
+# Called with (method, route, status, elapsed, stats) after every request; used by the query budget harness
+observers: List[Callable[[str, str, int, float, RequestStats], None]] = []
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency, status and SQL totals, plus the slow-request log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            registry.observe(scope["method"], route_path, status_code, elapsed, stats)
+            if elapsed * 1000 >= SLOW_REQUEST_MS:
+                _log_slow_request(scope["method"], scope["path"], status_code, elapsed, stats)
+            if QUERY_WARN_REPEATS:
+                _warn_repeats(scope["method"], route_path, stats)
+            for observer in observers:
+                observer(scope["method"], route_path, status_code, elapsed, stats)
@@ -0,0 +1,528 @@
+"""
+Versioned schema migrations.
+
+Each migration has a number and runs once: the versions applied to a database
+are recorded in `schema_migrations`. They run from `python migrate.py`, or on
+startup with MIGRATE_ON_STARTUP=1 (single-process development only); importing
+the app or starting a worker never changes the schema.
+
+Migration 1 creates the tables of the current models that are missing, so a new
+database is complete after it and the later migrations find nothing to do. The
+others bring databases created by older versions (and by the former
+`update_db_schema.py`) up to date, checking the schema first so they can also
+run on a database that was already upgraded by hand.
+
+Large tables are copied `chunk_size` rows at a time, one transaction per chunk,
+with progress on the log; an interrupted copy resumes after the last copied id.
+
+New schema changes go at the end of MIGRATIONS with the next number. Applied
+migrations are never edited.
+"""
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, exists, inspect, insert, literal, select, text, true, union_all,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from . import database
+from .installments import installment_date
+from .models import Category, InstallmentPlan
+from .rollups import rebuild_rollups
+from .search import SEARCH_CONFIG
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "0") == "1"
+MIGRATION_CHUNK_SIZE = int(os.getenv("MIGRATION_CHUNK_SIZE", "5000"))
+
+SYSTEM_CATEGORIES = [
+    ("Salário", "income"),
+    ("Investimentos", "income"),
+    ("Alimentação", "expense"),
+    ("Moradia", "expense"),
+    ("Transporte", "expense"),
+]
+
+# Not part of Base.metadata: it describes the schema, not the app's data
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+Log = Callable[[str], None]
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    apply: Callable[["Context"], None]
+
+
+@dataclass
+class Context:
+    conn: Connection
+    chunk_size: int
+    log: Log
+
+    @property
+    def dialect(self) -> str:
+        return self.conn.dialect.name
+
+    def columns(self, table: str) -> Dict[str, dict]:
+        return {c["name"]: c for c in inspect(self.conn).get_columns(table)}
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.conn).has_table(table)
+
+    def has_index(self, table: str, index: str) -> bool:
+        return any(i["name"] == index for i in inspect(self.conn).get_indexes(table))
+
+    def add_column(self, table: str, column: str, ddl: str):
+        if column not in self.columns(table):
+            self.conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            self.log(f"  added {table}.{column}")
+
+    def id_ranges(self, table: str, after: int = 0) -> Iterator[Tuple[int, int]]:
+        """Consecutive (after, upper] id ranges holding `chunk_size` rows of `table` each."""
+        while True:
+            upper = self.conn.execute(
+                text(f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > :after ORDER BY id LIMIT :n) AS chunk"),
+                {"after": after, "n": self.chunk_size},
+            ).scalar()
+            if upper is None:
+                return
+            yield after, upper
+            after = upper
+
+    def copy_rows(self, source: str, target: str, columns: List[str]) -> int:
+        """Copy rows from `source` into `target` in id order, committing each chunk."""
+        quote = self.conn.dialect.identifier_preparer.quote
+        names = ", ".join(quote(c) for c in columns)
+        total = self.conn.execute(text(f"SELECT COUNT(*) FROM {source}")).scalar()
+        copied = self.conn.execute(text(f"SELECT COUNT(*) FROM {target}")).scalar()
+        last = self.conn.execute(text(f"SELECT MAX(id) FROM {target}")).scalar() or 0
+        for after, upper in self.id_ranges(source, last):
+            result = self.conn.execute(
+                text(f"INSERT INTO {target} ({names}) SELECT {names} FROM {source} WHERE id > :after AND id <= :upper"),
+                {"after": after, "upper": upper},
+            )
+            self.conn.commit()
+            copied += result.rowcount
+            self.log(f"  {source} -> {target}: {copied}/{total} rows")
+        return copied
+
+
+# --- Migrations -------------------------------------------------------------
+
+def _create_tables(ctx: Context):
+    database.Base.metadata.create_all(ctx.conn)
+
+
+def _transaction_columns(ctx: Context):
+    ctx.add_column("transactions", "credit_card_id", "INTEGER REFERENCES credit_cards(id)")
+    ctx.add_column("transactions", "installment_number", "INTEGER")
+    ctx.add_column("transactions", "total_installments", "INTEGER")
+    ctx.add_column("transactions", "recurring_id", "INTEGER REFERENCES recurring_transactions(id)")
+    ctx.add_column("transactions", "recurring_period", "INTEGER")
+
+
+RECURRING_REBUILD = """
+CREATE TABLE IF NOT EXISTS recurring_transactions_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    category_id INTEGER,
+    bank_id INTEGER,
+    credit_card_id INTEGER,
+    amount NUMERIC(12, 2) NOT NULL,
+    type VARCHAR(20) NOT NULL,
+    day_of_month INTEGER NOT NULL,
+    description VARCHAR(255),
+    is_active BOOLEAN DEFAULT 1,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY(user_id) REFERENCES users(id),
+    FOREIGN KEY(category_id) REFERENCES categories(id),
+    FOREIGN KEY(bank_id) REFERENCES banks(id),
+    FOREIGN KEY(credit_card_id) REFERENCES credit_cards(id)
+)
+"""
+RECURRING_COLUMNS = [
+    "id", "user_id", "category_id", "bank_id", "credit_card_id", "amount", "type",
+    "day_of_month", "description", "is_active", "created_at",
+]
+
+
+def _recurring_optional_bank(ctx: Context):
+    """Recurring entries may charge a credit card instead of a bank: bank_id nullable, credit_card_id added."""
+    if not ctx.has_table("recurring_transactions"):
+        # Interrupted between dropping the old table and renaming the new one
+        ctx.conn.execute(text("ALTER TABLE recurring_transactions_new RENAME TO recurring_transactions"))
+    else:
+        columns = ctx.columns("recurring_transactions")
+        if "credit_card_id" in columns and columns["bank_id"]["nullable"]:
+            return
+        if ctx.dialect != "sqlite":
+            ctx.add_column("recurring_transactions", "credit_card_id", "INTEGER REFERENCES credit_cards(id)")
+            ctx.conn.execute(text("ALTER TABLE recurring_transactions ALTER COLUMN bank_id DROP NOT NULL"))
+            return
+        # SQLite cannot change a column's nullability: copy into a new table and swap
+        ctx.conn.execute(text(RECURRING_REBUILD))
+        ctx.conn.commit()
+        ctx.copy_rows("recurring_transactions", "recurring_transactions_new",
+                      [c for c in RECURRING_COLUMNS if c in columns])
+        ctx.conn.execute(text("DROP TABLE recurring_transactions"))
+        ctx.conn.execute(text("ALTER TABLE recurring_transactions_new RENAME TO recurring_transactions"))
+    ctx.conn.execute(text("CREATE INDEX IF NOT EXISTS ix_recurring_transactions_id ON recurring_transactions (id)"))
+
+
+def _period_indexes(ctx: Context):
+    ctx.conn.execute(text("CREATE INDEX IF NOT EXISTS ix_transactions_user_date ON transactions (user_id, date)"))
+    ctx.conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_card_date ON transactions (user_id, credit_card_id, date)"
+    ))
+
+
+def _recurring_keys(ctx: Context):
+    """Idempotency key of generated recurring entries; legacy ones are matched by their "[Auto] <description>"."""
+    if ctx.has_index("transactions", "uq_transactions_recurring_period"):
+        return
+    if ctx.dialect == "sqlite":
+        period = "CAST(strftime('%Y', date) AS INTEGER) * 100 + CAST(strftime('%m', date) AS INTEGER)"
+    else:
+        period = "CAST(EXTRACT(YEAR FROM date) * 100 + EXTRACT(MONTH FROM date) AS INTEGER)"
+    ctx.conn.execute(text(f"""
+    UPDATE transactions SET
+        recurring_id = (
+            SELECT r.id FROM recurring_transactions r
+            WHERE r.user_id = transactions.user_id AND '[Auto] ' || r.description = transactions.description
+            ORDER BY r.id LIMIT 1
+        ),
+        recurring_period = {period}
+    WHERE recurring_id IS NULL AND description LIKE '[Auto] %'
+    """))
+    ctx.conn.execute(text("UPDATE transactions SET recurring_period = NULL WHERE recurring_id IS NULL"))
+    # Keep only the first entry per (recurring, month) so the unique index can be built
+    ctx.conn.execute(text("""
+    UPDATE transactions SET recurring_id = NULL, recurring_period = NULL
+    WHERE recurring_id IS NOT NULL AND id NOT IN (
+        SELECT MIN(id) FROM transactions WHERE recurring_id IS NOT NULL GROUP BY recurring_id, recurring_period
+    )
+    """))
+    ctx.conn.execute(text(
+        "CREATE UNIQUE INDEX uq_transactions_recurring_period ON transactions (recurring_id, recurring_period)"
+    ))
+
+
+def _bank_balances(ctx: Context):
+    # Bank balance is maintained incrementally from here on; resync it once from the vaults
+    ctx.conn.execute(text("""
+    UPDATE banks SET current_balance = (
+        SELECT COALESCE(SUM(v.balance), 0) FROM vaults v WHERE v.bank_id = banks.id
+    )
+    """))
+
+
+INSTALLMENT_SUFFIX = re.compile(r"\s*\(\d+/\d+\)$")
+
+
+def _month_index(day) -> int:
+    """'YYYY-MM-DD' -> months since year 0, to check installments are in consecutive months."""
+    day = str(day)
+    return int(day[:4]) * 12 + int(day[5:7])
+
+
+def fold_installment_rows(conn: Connection) -> int:
+    """Replace each complete set of per-installment transactions by one installment_plans row.
+
+    Rows of one purchase share card, category, type, amount, installment count and
+    description (minus the " (i/n)" suffix) and sit in consecutive months. Incomplete
+    sets (e.g. an installment was deleted by hand) are left as plain transactions.
+    Monthly rollups are unaffected: the plan expands to the same months and amounts.
+    """
+    rows = conn.execute(text("""
+    SELECT id, user_id, credit_card_id, category_id, type, amount, date, description,
+           installment_number, total_installments
+    FROM transactions
+    WHERE total_installments > 1 AND credit_card_id IS NOT NULL AND installment_number IS NOT NULL
+    """)).fetchall()
+
+    groups = {}
+    for r in rows:
+        base = INSTALLMENT_SUFFIX.sub("", r.description or "").strip()
+        key = (r.user_id, r.credit_card_id, r.category_id, r.type, str(r.amount), r.total_installments, base)
+        groups.setdefault(key, []).append(r)
+
+    folded = 0
+    for (user_id, card_id, category_id, type_, amount, total, base), members in groups.items():
+        members.sort(key=lambda r: (str(r.date), r.installment_number, r.id))
+        runs = []
+        for r in members:
+            if r.installment_number == 1:
+                runs.append([r])
+                continue
+            for run in runs:
+                last = run[-1]
+                if (last.installment_number == r.installment_number - 1
+                        and _month_index(last.date) + 1 == _month_index(r.date)):
+                    run.append(r)
+                    break
+        for run in runs:
+            if len(run) != total:
+                continue
+            first = date.fromisoformat(str(run[0].date)[:10])
+            conn.execute(text("""
+            INSERT INTO installment_plans
+                (user_id, credit_card_id, category_id, type, total_amount, installments,
+                 first_date, last_date, description, created_at)
+            VALUES (:user_id, :card_id, :category_id, :type, :total_amount, :installments,
+                    :first_date, :last_date, :description, CURRENT_TIMESTAMP)
+            """), {
+                "user_id": user_id, "card_id": card_id, "category_id": category_id, "type": type_,
+                "total_amount": str(sum(Decimal(str(r.amount)) for r in run)), "installments": total,
+                "first_date": first.isoformat(), "last_date": installment_date(first, total).isoformat(),
+                "description": base or None,
+            })
+            conn.execute(
+                text(f"DELETE FROM transactions WHERE id IN ({', '.join(str(r.id) for r in run)})")
+            )
+            folded += 1
+    return folded
+
+
+def _installment_plans(ctx: Context):
+    """One row per card purchase instead of one transaction per installment."""
+    InstallmentPlan.__table__.create(ctx.conn, checkfirst=True)
+    ctx.conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_installment_plans_user_dates ON installment_plans (user_id, first_date, last_date)"
+    ))
+    folded = fold_installment_rows(ctx.conn)
+    if folded:
+        ctx.log(f"  {folded} purchases folded into installment plans")
+
+
+def _data_version(ctx: Context):
+    ctx.add_column("users", "data_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+# {table}: the indexed table; its FTS5 index is {table}_fts
+SQLITE_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {table}_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, description) VALUES ('delete', old.id, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF description ON {table} BEGIN
+        INSERT INTO {table}_fts ({table}_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO {table}_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+]
+
+POSTGRES_SEARCH_CONFIG = f"""
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_CONFIG}') THEN
+        CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG}
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END
+$$
+"""
+
+
+def _search_index(ctx: Context, table: str):
+    """Full-text index over `table`.description, see app/search.py."""
+    if ctx.dialect == "sqlite":
+        # External content: the index stores no copy of the text, only the tokens by rowid
+        ctx.conn.execute(text(f"DROP TABLE IF EXISTS {table}_fts"))
+        ctx.conn.execute(text(
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+            f"description, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        total = ctx.conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        indexed = 0
+        for after, upper in ctx.id_ranges(table):
+            indexed += ctx.conn.execute(text(
+                f"INSERT INTO {table}_fts (rowid, description) "
+                f"SELECT id, description FROM {table} WHERE id > :after AND id <= :upper"
+            ), {"after": after, "upper": upper}).rowcount
+            ctx.conn.commit()
+            ctx.log(f"  {table}_fts: {indexed}/{total} rows")
+        for trigger in SQLITE_SEARCH_TRIGGERS:
+            ctx.conn.execute(text(trigger.format(table=table)))
+    elif ctx.dialect == "postgresql":
+        ctx.conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        ctx.conn.execute(text(POSTGRES_SEARCH_CONFIG))
+        ctx.add_column(
+            table, "search_vector",
+            f"tsvector GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', coalesce(description, ''))) STORED",
+        )
+        ctx.conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (search_vector)"
+        ))
+
+
+def _transaction_search(ctx: Context):
+    _search_index(ctx, "transactions")
+
+
+def _installment_plan_search(ctx: Context):
+    _search_index(ctx, "installment_plans")
+
+
+def _budgets_unique(ctx: Context):
+    """One budget per user, month and category; duplicates keep the latest row."""
+    if ctx.has_index("budgets", "uq_budgets_user_period_category"):
+        return
+    ctx.conn.execute(text("""
+    DELETE FROM budgets WHERE id NOT IN (
+        SELECT MAX(id) FROM budgets GROUP BY user_id, year, month, category_id
+    )
+    """))
+    ctx.conn.execute(text(
+        "CREATE UNIQUE INDEX uq_budgets_user_period_category ON budgets (user_id, year, month, category_id)"
+    ))
+
+
+def _notification_keys(ctx: Context):
+    ctx.add_column("notifications", "kind", "VARCHAR(30)")
+    ctx.add_column("notifications", "dedupe_key", "VARCHAR(100)")
+    ctx.conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_notifications_user_key ON notifications (user_id, dedupe_key)"
+    ))
+    ctx.conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_read ON notifications (user_id, read, id)"
+    ))
+
+
+def _fill_rollups(ctx: Context):
+    """Rollups of the data written before monthly_rollups existed (migration 1 creates it empty).
+
+    Rebuilt per user, one commit each; rerunning after an interruption rebuilds
+    the same rows.
+    """
+    user_ids = [row[0] for row in ctx.conn.execute(text(
+        "SELECT user_id FROM transactions UNION SELECT user_id FROM installment_plans ORDER BY 1"
+    ))]
+    for n, user_id in enumerate(user_ids, 1):
+        with Session(bind=ctx.conn) as db:
+            rebuild_rollups(db, user_id)
+        # Conditional GETs cached before the rebuild must not be served again
+        ctx.conn.execute(text("UPDATE users SET data_version = data_version + 1 WHERE id = :id"), {"id": user_id})
+        ctx.conn.commit()
+        if n % 100 == 0 or n == len(user_ids):
+            ctx.log(f"  rollups rebuilt for {n}/{len(user_ids)} users")
+
+
+def _recurring_active_since(ctx: Context):
+    ctx.add_column("recurring_transactions", "active_since", "DATE")
+
+
+def _detach_deleted_recurring(ctx: Context):
+    """Clear the recurring keys of transactions whose entry was deleted (SQLite never ran the SET NULL)."""
+    detached = ctx.conn.execute(text(
+        "UPDATE transactions SET recurring_id = NULL WHERE recurring_id IS NOT NULL "
+        "AND recurring_id NOT IN (SELECT id FROM recurring_transactions)"
+    )).rowcount
+    if detached:
+        ctx.log(f"  {detached} transactions detached from deleted recurring entries")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create_tables", _create_tables),
+    Migration(2, "transaction_card_installment_recurring_columns", _transaction_columns),
+    Migration(3, "recurring_optional_bank", _recurring_optional_bank),
+    Migration(4, "transaction_period_indexes", _period_indexes),
+    Migration(5, "recurring_idempotency_keys", _recurring_keys),
+    Migration(6, "bank_balances_from_vaults", _bank_balances),
+    Migration(7, "installment_plans", _installment_plans),
+    Migration(8, "users_data_version", _data_version),
+    Migration(9, "transaction_search_index", _transaction_search),
+    Migration(10, "budgets_unique_period_category", _budgets_unique),
+    Migration(11, "notification_keys", _notification_keys),
+    Migration(12, "fill_monthly_rollups", _fill_rollups),
+    Migration(13, "recurring_active_since", _recurring_active_since),
+    Migration(14, "installment_plan_search_index", _installment_plan_search),
+    Migration(15, "detach_deleted_recurring", _detach_deleted_recurring),
+]
+
+
+# --- Runner -----------------------------------------------------------------
+
+def seed_categories(conn: Connection) -> int:
+    """Insert the system categories that are missing, in one statement."""
+    wanted = union_all(*(
+        select(literal(name).label("name"), literal(type_).label("type")) for name, type_ in SYSTEM_CATEGORIES
+    )).subquery("wanted")
+    missing = select(wanted.c.name, wanted.c.type, true(), literal(datetime.utcnow())).where(~exists().where(
+        Category.name == wanted.c.name, Category.type == wanted.c.type, Category.is_system == true(),
+    ))
+    stmt = insert(Category).from_select(["name", "type", "is_system", "created_at"], missing)
+    return conn.execute(stmt).rowcount
+
+
+def applied_versions(conn: Connection) -> List[int]:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return []
+    return list(conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(bind: Optional[Engine] = None) -> List[Migration]:
+    """Migrations not yet applied. Read-only: safe to call on worker startup."""
+    with (bind or database.engine).connect() as conn:
+        applied = set(applied_versions(conn))
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def upgrade(
+    bind: Optional[Engine] = None,
+    target: Optional[int] = None,
+    chunk_size: int = MIGRATION_CHUNK_SIZE,
+    log: Log = print,
+) -> List[Migration]:
+    """Apply pending migrations up to `target` (default: all), then seed the system categories."""
+    bind = bind or database.engine
+    schema_migrations.create(bind, checkfirst=True)
+    done = []
+    with bind.connect() as conn:
+        applied = set(applied_versions(conn))
+        ctx = Context(conn, chunk_size, log)
+        for migration in MIGRATIONS:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            log(f"Migration {migration.version}: {migration.name}")
+            started = time.perf_counter()
+            try:
+                migration.apply(ctx)
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version, name=migration.name, applied_at=datetime.utcnow(),
+                ))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                log(f"Migration {migration.version} failed; later migrations were not run")
+                raise
+            log(f"  done in {time.perf_counter() - started:.2f} s")
+            done.append(migration)
+        if inspect(conn).has_table(Category.__tablename__):
+            seeded = seed_categories(conn)
+            conn.commit()
+            if seeded:
+                log(f"{seeded} system categories created")
+    return done
@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import Numeric
 
@@ -14,6 +14,8 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     full_name = Column(String(255), nullable=True)
     monthly_salary = Column(Numeric(12, 2), nullable=True, default=0)
+    # Incremented by every write to the user's data; source of the GET ETags (app/versioning.py)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
 
     transactions = relationship("Transaction", back_populates="user")
@@ -21,6 +23,7 @@ class User(Base):
     vaults = relationship("Vault", back_populates="user")
     credit_cards = relationship("CreditCard", back_populates="user")
     recurring_transactions = relationship("RecurringTransaction", back_populates="user")
+    installment_plans = relationship("InstallmentPlan", back_populates="user")
     # Categories now can be per-user, so we might want a relationship here too, but it's optional if we query directly
 
 
@@ -70,6 +73,7 @@ class CreditCard(Base):
 
     user = relationship("User", back_populates="credit_cards")
     transactions = relationship("Transaction", back_populates="credit_card")
+    installment_plans = relationship("InstallmentPlan", back_populates="credit_card")
 
 
 class Category(Base):
@@ -88,6 +92,12 @@ class Category(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Period queries filter on user + date range (optionally per card)
+        Index("ix_transactions_user_date", "user_id", "date"),
+        Index("ix_transactions_user_card_date", "user_id", "credit_card_id", "date"),
+        Index("uq_transactions_recurring_period", "recurring_id", "recurring_period", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -102,6 +112,9 @@ class Transaction(Base):
     credit_card_id = Column(Integer, ForeignKey("credit_cards.id"), nullable=True)
     installment_number = Column(Integer, nullable=True)  # Current installment number (e.g. 1)
     total_installments = Column(Integer, nullable=True)  # Total installments (e.g. 12)
+    # Set on entries generated from a RecurringTransaction; (recurring_id, recurring_period) is the idempotency key
+    recurring_id = Column(Integer, ForeignKey("recurring_transactions.id", ondelete="SET NULL"), nullable=True)
+    recurring_period = Column(Integer, nullable=True)  # year * 100 + month, e.g. 202603
     # If credit_card_id is present, bank_id and vault_id should be NULL for the purchase itself.
     # The payment of the invoice will be a separate transaction with bank_id.
 
@@ -111,9 +124,97 @@ class Transaction(Base):
     vault = relationship("Vault", back_populates="transactions")
     credit_card = relationship("CreditCard", back_populates="transactions")
 
+    # Related names for listings; load the relationships eagerly to avoid N+1
+    @property
+    def category_name(self):
+        return self.category.name if self.category else None
+
+    @property
+    def bank_name(self):
+        return self.bank.name if self.bank else None
+
+    @property
+    def vault_name(self):
+        return self.vault.name if self.vault else None
+
+    @property
+    def credit_card_name(self):
+        return self.credit_card.name if self.credit_card else None
+
+
+class InstallmentPlan(Base):
+    """A credit card purchase paid in installments: stored once, installments are expanded on read."""
+    __tablename__ = "installment_plans"
+    __table_args__ = (
+        Index("ix_installment_plans_user_dates", "user_id", "first_date", "last_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    credit_card_id = Column(Integer, ForeignKey("credit_cards.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    type = Column(String(20), nullable=False)  # 'income' or 'expense'
+    total_amount = Column(Numeric(12, 2), nullable=False)
+    installments = Column(Integer, nullable=False)
+    first_date = Column(Date, nullable=False)  # Date of the 1st installment
+    last_date = Column(Date, nullable=False)  # Date of the last installment, for range filters
+    description = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User", back_populates="installment_plans")
+    category = relationship("Category")
+    credit_card = relationship("CreditCard", back_populates="installment_plans")
+
+    @property
+    def category_name(self):
+        return self.category.name if self.category else None
+
+    @property
+    def credit_card_name(self):
+        return self.credit_card.name if self.credit_card else None
+
+
+class InvoiceSnapshot(Base):
+    """Totals of a closed credit card billing cycle, computed once and reused."""
+    __tablename__ = "invoice_snapshots"
+    __table_args__ = (
+        UniqueConstraint("credit_card_id", "cycle", name="uq_invoice_snapshots_card_cycle"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    credit_card_id = Column(Integer, ForeignKey("credit_cards.id"), nullable=False)
+    cycle = Column(Integer, nullable=False)  # year * 100 + month of the closing date, e.g. 202603
+    start_date = Column(Date, nullable=False)  # inclusive
+    closing_date = Column(Date, nullable=False)  # exclusive: purchases on the closing day go to the next cycle
+    due_date = Column(Date, nullable=False)
+    total = Column(Numeric(12, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MonthlyRollup(Base):
+    """Per-user monthly totals by category and type, kept in sync with transactions."""
+    __tablename__ = "monthly_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "year", "month", "category_id", "type", name="uq_monthly_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    category_id = Column(Integer, nullable=False, default=0)  # 0 = Sem categoria
+    type = Column(String(20), nullable=False)  # 'income' or 'expense'
+    total = Column(Numeric(14, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
 
 class Budget(Base):
+    """Planned expense for a month, per category (None = all expenses of the month)."""
     __tablename__ = "budgets"
+    __table_args__ = (
+        Index("uq_budgets_user_period_category", "user_id", "year", "month", "category_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -137,6 +238,7 @@ class RecurringTransaction(Base):
     day_of_month = Column(Integer, nullable=False)
     description = Column(String(255), nullable=True)
     is_active = Column(Boolean, default=True)
+    active_since = Column(Date, nullable=True)  # Set on reactivation; periods before it are not generated
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="recurring_transactions")
@@ -145,10 +247,22 @@ class RecurringTransaction(Base):
 
 
 class Notification(Base):
+    """Written by the notification consumer (app/notifications.py), one per rule hit.
+
+    `dedupe_key` identifies what the notification is about (a budget, a card
+    cycle, a transaction), so a rule firing again for it inserts nothing.
+    """
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("uq_notifications_user_key", "user_id", "dedupe_key", unique=True),
+        # Unread counts and listings read only this index
+        Index("ix_notifications_user_read", "user_id", "read", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(30), nullable=True)  # budget_exceeded, card_limit, large_expense, recurring_posted
+    dedupe_key = Column(String(100), nullable=True)
     title = Column(String(120), nullable=False)
     message = Column(String(500), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
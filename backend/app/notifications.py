@@ -0,0 +1,209 @@
+"""
+Notifications from transaction events.
+
+Transaction writes only `emit` a TransactionEvent (app/events.py). The
+background task started in `main.py` takes the events off the bus in batches
+of up to NOTIFY_BATCH_SIZE (waiting NOTIFY_BATCH_WAIT_SECONDS for a batch to
+fill) and runs every rule once per batch, in a worker thread, with queries that
+cover all the batch's users at once. Request latency therefore does not depend
+on the number of rules, and a burst of writes costs a few queries per batch.
+
+Rules return notification rows; they are inserted in one statement that skips
+rows whose (user_id, dedupe_key) already exists, so a budget, a card cycle or a
+transaction is notified once even when events repeat or two workers see them.
+
+- budget_exceeded: the month's expenses in a category (all expenses, for the
+  budget without category) went over its budget; read from the rollups. An
+  installment purchase is checked in the month of its first installment.
+- card_limit: card usage (open invoice plus future installments) reached
+  CARD_LIMIT_WARN_PERCENT of its limit; once per card and invoice cycle.
+- large_expense: a transaction or installment purchase of LARGE_EXPENSE_AMOUNT
+  or more (imports are not checked row by row).
+- recurring_posted: the recurring engine posted a recurring expense.
+
+Events are only consumed while the API runs; `python run_recurring.py` posts
+without notifying.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, List, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session
+
+from .category_registry import category_registry
+from .database import SessionLocal
+from .events import TransactionEvent, bus
+from .invoices import cycle_of, outstanding
+from .models import Budget, CreditCard, MonthlyRollup, Notification
+
+NOTIFICATIONS_ENABLED = os.getenv("NOTIFICATIONS_ENABLED", "1") == "1"
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "500"))
+NOTIFY_BATCH_WAIT_SECONDS = float(os.getenv("NOTIFY_BATCH_WAIT_SECONDS", "0.5"))
+LARGE_EXPENSE_AMOUNT = Decimal(os.getenv("LARGE_EXPENSE_AMOUNT", "1000"))
+CARD_LIMIT_WARN_PERCENT = Decimal(os.getenv("CARD_LIMIT_WARN_PERCENT", "80"))
+
+Rule = Callable[[Session, List[TransactionEvent]], List[dict]]
+
+
+def _money(value: Decimal) -> str:
+    return f"R$ {value:.2f}"
+
+
+def _row(user_id: int, kind: str, key: str, title: str, message: str) -> dict:
+    return {"user_id": user_id, "kind": kind, "dedupe_key": key, "title": title, "message": message[:500]}
+
+
+def budget_exceeded(db: Session, events: List[TransactionEvent]) -> List[dict]:
+    periods: Set[Tuple[int, int, int]] = {
+        (e.user_id, e.date.year, e.date.month) for e in events if e.type == "expense"
+    }
+    if not periods:
+        return []
+    budgets = db.query(
+        Budget.id, Budget.user_id, Budget.year, Budget.month, Budget.category_id, Budget.amount,
+    ).filter(tuple_(Budget.user_id, Budget.year, Budget.month).in_(periods)).all()
+    if not budgets:
+        return []
+
+    # (user_id, year, month, category_id or "all") -> spent
+    spent: Dict[tuple, Decimal] = defaultdict(Decimal)
+    rollups = db.query(
+        MonthlyRollup.user_id, MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.category_id,
+        func.sum(MonthlyRollup.total),
+    ).filter(
+        tuple_(MonthlyRollup.user_id, MonthlyRollup.year, MonthlyRollup.month).in_(periods),
+        MonthlyRollup.type == "expense",
+    ).group_by(MonthlyRollup.user_id, MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.category_id)
+    for user_id, year, month, category_id, total in rollups:
+        total = Decimal(str(total or 0))
+        spent[(user_id, year, month, category_id or None)] += total
+        # The budget without a category covers all expenses of the month
+        spent[(user_id, year, month, "all")] += total
+
+    rows = []
+    for budget_id, user_id, year, month, category_id, amount in budgets:
+        used = spent.get((user_id, year, month, category_id or "all"), Decimal("0"))
+        amount = Decimal(str(amount))
+        if used <= amount:
+            continue
+        name = category_registry.names(db, user_id).get(category_id, "Sem categoria") if category_id else "Total"
+        rows.append(_row(
+            user_id, "budget_exceeded", f"budget:{budget_id}", "Orçamento estourado",
+            f"{name} em {month:02d}/{year}: {_money(used)} gastos de {_money(amount)} planejados.",
+        ))
+    return rows
+
+
+def card_limit(db: Session, events: List[TransactionEvent]) -> List[dict]:
+    # Only the cards the batch's expenses were charged to, all in the same two queries
+    card_ids = {e.credit_card_id for e in events if e.credit_card_id and e.type == "expense"}
+    if not card_ids:
+        return []
+    today = date.today()
+    cards = [card for card in db.query(CreditCard).filter(CreditCard.id.in_(card_ids)) if card.limit and card.limit > 0]
+    used_by_card = outstanding(db, cards, today)
+    rows = []
+    for card in cards:
+        limit = Decimal(str(card.limit))
+        used = used_by_card[card.id]
+        percent = used / limit * 100
+        if percent >= CARD_LIMIT_WARN_PERCENT:
+            rows.append(_row(
+                card.user_id, "card_limit", f"card_limit:{card.id}:{cycle_of(card, today)}", "Limite do cartão",
+                f"{card.name}: {_money(used)} usados de {_money(limit)} ({percent:.0f}% do limite).",
+            ))
+    return rows
+
+
+def large_expense(db: Session, events: List[TransactionEvent]) -> List[dict]:
+    rows = []
+    for e in events:
+        if e.kind not in ("created", "plan_created") or e.type != "expense" or e.amount < LARGE_EXPENSE_AMOUNT:
+            continue
+        what = e.description or "Despesa"
+        if e.kind == "plan_created":
+            what = f"{what} (parcelado)"
+        rows.append(_row(
+            e.user_id, "large_expense", f"large_expense:{e.kind}:{e.source_id}", "Despesa alta",
+            f"{what}: {_money(e.amount)} em {e.date.strftime('%d/%m/%Y')}.",
+        ))
+    return rows
+
+
+def recurring_posted(db: Session, events: List[TransactionEvent]) -> List[dict]:
+    return [
+        _row(
+            e.user_id, "recurring_posted", f"recurring:{e.source_id}", "Despesa fixa lançada",
+            f"{e.description or 'Despesa fixa'}: {_money(e.amount)} em {e.date.strftime('%d/%m/%Y')}.",
+        )
+        for e in events if e.kind == "recurring_posted" and e.type == "expense"
+    ]
+
+
+RULES: List[Rule] = [budget_exceeded, card_limit, large_expense, recurring_posted]
+
+
+def insert_notifications(db: Session, rows: List[dict]) -> int:
+    """Insert the rows whose (user_id, dedupe_key) is new, in one statement."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(Notification).on_conflict_do_nothing(index_elements=["user_id", "dedupe_key"])
+        return db.connection().execute(stmt, rows).rowcount
+    existing = set(db.query(Notification.user_id, Notification.dedupe_key).filter(
+        tuple_(Notification.user_id, Notification.dedupe_key).in_([(r["user_id"], r["dedupe_key"]) for r in rows])
+    ).all())
+    rows = [r for r in rows if (r["user_id"], r["dedupe_key"]) not in existing]
+    if rows:
+        db.connection().execute(insert(Notification), rows)
+    return len(rows)
+
+
+def process_events(events: List[TransactionEvent], session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """Run every rule over the batch and store the resulting notifications."""
+    db = session_factory()
+    try:
+        rows: Dict[Tuple[int, str], dict] = {}
+        for rule in RULES:
+            for row in rule(db, events):
+                rows.setdefault((row["user_id"], row["dedupe_key"]), row)
+        created = insert_notifications(db, list(rows.values())) if rows else 0
+        db.commit()
+        return created
+    finally:
+        db.close()
+
+
+async def consumer_loop():
+    """Background task: process event batches until cancelled."""
+    while True:
+        events = await bus.next_batch(NOTIFY_BATCH_SIZE, NOTIFY_BATCH_WAIT_SECONDS)
+        try:
+            await run_in_threadpool(process_events, events)
+        except Exception as e:
+            print(f"Error processing {len(events)} notification events: {e}")
+
+
+async def stop(consumer: asyncio.Task):
+    """Cancel the consumer and process the events still queued."""
+    consumer.cancel()
+    try:
+        await consumer
+    except asyncio.CancelledError:
+        pass
+    pending = bus.stop()
+    if pending:
+        try:
+            await run_in_threadpool(process_events, pending)
+        except Exception as e:
+            print(f"Error processing {len(pending)} notification events: {e}")
+    if bus.dropped:
+        print(f"Notifications: {bus.dropped} events dropped (queue full)")
@@ -0,0 +1,21 @@
+from datetime import date
+from typing import Tuple
+
+from sqlalchemy import and_
+
+
+def month_bounds(month: int, year: int) -> Tuple[date, date]:
+    """Return the half-open [start, end) date range covering a month."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def in_month(column, month: int, year: int):
+    """Index-friendly month filter: `column >= start AND column < end`.
+
+    Unlike extract('month', ...) == m, a plain range predicate can be served
+    by the (user_id, date) composite indexes on transactions.
+    """
+    start, end = month_bounds(month, year)
+    return and_(column >= start, column < end)
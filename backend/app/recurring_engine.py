@@ -0,0 +1,168 @@
+"""
+Batch generation of transactions from RecurringTransaction entries.
+
+Runs for all users, outside of any request: from the CLI (`python run_recurring.py`)
+or from the in-process background task started in `main.py`. Every generated
+transaction carries (recurring_id, recurring_period), which has a unique index,
+so running the engine twice (or from two workers at once) never duplicates an entry.
+Months missed while the scheduler was not running are backfilled; months an
+entry spent paused are not (generation resumes from `active_since`).
+"""
+import asyncio
+import calendar
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .events import TransactionEvent, emit
+from .models import RecurringTransaction, Transaction
+from .invoices import invalidate as invalidate_invoices
+from .rollups import record_transactions
+from .versioning import bump_data_version
+
+RECURRING_BATCH_SIZE = int(os.getenv("RECURRING_BATCH_SIZE", "500"))
+RECURRING_INTERVAL_SECONDS = float(os.getenv("RECURRING_INTERVAL_SECONDS", "3600"))
+RECURRING_SCHEDULER_ENABLED = os.getenv("RECURRING_SCHEDULER_ENABLED", "1") == "1"
+
+
+@dataclass
+class RunStats:
+    recurring_processed: int = 0
+    transactions_created: int = 0
+    batches: int = 0
+
+
+def period_of(d: date) -> int:
+    return d.year * 100 + d.month
+
+
+def due_date(year: int, month: int, day_of_month: int) -> date:
+    """Day of month clamped to the month's last day (e.g. 31 -> Feb 28/29)."""
+    return date(year, month, min(max(day_of_month, 1), calendar.monthrange(year, month)[1]))
+
+
+def pending_periods(first: date, today: date) -> List[int]:
+    """All periods from `first`'s month through `today`'s month, inclusive."""
+    periods = []
+    year, month = first.year, first.month
+    while (year, month) <= (today.year, today.month):
+        periods.append(year * 100 + month)
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+    return periods
+
+
+def _start_date(r: RecurringTransaction, today: date) -> date:
+    """First day to generate from: the last reactivation, else the creation."""
+    if r.active_since:
+        return r.active_since
+    return r.created_at.date() if r.created_at else today
+
+
+def _process_batch(db: Session, batch: List[RecurringTransaction], today: date) -> int:
+    ids = [r.id for r in batch]
+    first_period = min(period_of(_start_date(r, today)) for r in batch)
+    existing = set(
+        db.query(Transaction.recurring_id, Transaction.recurring_period)
+        .filter(Transaction.recurring_id.in_(ids))
+        .filter(Transaction.recurring_period >= first_period)
+        .all()
+    )
+
+    created = []
+    for r in batch:
+        for period in pending_periods(_start_date(r, today), today):
+            if (r.id, period) in existing:
+                continue
+            tx = Transaction(
+                user_id=r.user_id,
+                amount=r.amount,
+                type=r.type,
+                category_id=r.category_id,
+                bank_id=r.bank_id,
+                credit_card_id=r.credit_card_id,
+                date=due_date(period // 100, period % 100, r.day_of_month),
+                description=f"[Auto] {r.description}",
+                recurring_id=r.id,
+                recurring_period=period,
+            )
+            db.add(tx)
+            created.append(tx)
+
+    record_transactions(db, created)
+    # Backfilled card entries can land in already closed invoices
+    first_by_card = {}
+    for tx in created:
+        if tx.credit_card_id and (tx.credit_card_id not in first_by_card or tx.date < first_by_card[tx.credit_card_id]):
+            first_by_card[tx.credit_card_id] = tx.date
+    for card_id, first_date in first_by_card.items():
+        invalidate_invoices(db, card_id, first_date)
+    for user_id in {tx.user_id for tx in created}:
+        bump_data_version(db, user_id)
+    db.flush()
+    events = [
+        TransactionEvent("recurring_posted", tx.user_id, tx.type, tx.amount, tx.date, tx.category_id,
+                         tx.credit_card_id, tx.id, tx.description)
+        for tx in created
+    ]
+    db.commit()
+    emit(*events)
+    return len(created)
+
+
+def run_recurring(
+    session_factory: Callable[[], Session] = SessionLocal,
+    today: Optional[date] = None,
+    batch_size: int = RECURRING_BATCH_SIZE,
+) -> RunStats:
+    """Generate every missing recurring transaction up to `today`, in batches of recurring entries."""
+    today = today or date.today()
+    stats = RunStats()
+    last_id = 0
+    db = session_factory()
+    try:
+        while True:
+            batch = (
+                db.query(RecurringTransaction)
+                .filter(RecurringTransaction.is_active == True)
+                .filter(RecurringTransaction.id > last_id)
+                .order_by(RecurringTransaction.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            batch_ids = [r.id for r in batch]
+            last_id = batch_ids[-1]
+            try:
+                stats.transactions_created += _process_batch(db, batch, today)
+            except IntegrityError:
+                # Another worker generated part of this batch concurrently; re-read and fill the rest
+                db.rollback()
+                batch = db.query(RecurringTransaction).filter(RecurringTransaction.id.in_(batch_ids)).all()
+                stats.transactions_created += _process_batch(db, batch, today)
+            stats.recurring_processed += len(batch)
+            stats.batches += 1
+    finally:
+        db.close()
+    return stats
+
+
+async def scheduler_loop(interval: float = RECURRING_INTERVAL_SECONDS):
+    """Background task: run the engine now and then every `interval` seconds."""
+    while True:
+        try:
+            stats = await run_in_threadpool(run_recurring)
+            if stats.transactions_created:
+                print(f"Recurring engine: {stats.transactions_created} transactions created")
+        except Exception as e:
+            print(f"Error generating recurring transactions: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,294 @@
+"""
+PDF report jobs rendered off the request path.
+
+Reports are rendered by a bounded ProcessPoolExecutor and stored on disk under
+REPORTS_DIR/<user_id>/<period>/<data_version>-<job_id>.pdf. The job id is
+derived from the user, the period and the user's data version (bumped by every
+write), so a repeated request for unchanged data is served straight from disk,
+and any worker process can answer for a finished job. When a job finishes, the
+period's files from older data versions are deleted.
+"""
+import asyncio
+import glob
+import hashlib
+import heapq
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .category_registry import category_registry
+from .models import Transaction, User
+from .installments import report_rows as installment_rows
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(os.getcwd(), "reports_cache"))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+JOB_RETENTION_SECONDS = 3600
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{20}")
+
+MONTH_NAMES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# (date iso, type, amount, category name, description)
+ReportRow = Tuple[str, str, float, str, str]
+
+
+@dataclass
+class ReportPeriod:
+    kind: str  # 'monthly', 'range' or 'yearly'
+    start: date  # inclusive
+    end: date  # exclusive
+    label: str
+    slug: str
+
+
+@dataclass
+class ReportJob:
+    id: str
+    user_id: int
+    period: ReportPeriod
+    path: str
+    version: int = 0
+    status: str = "pending"  # pending, running, done, failed
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def filename(self) -> str:
+        slug = self.period.slug if self.period else self.id
+        return f"sysfinance_{slug}.pdf"
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_jobs: Dict[str, ReportJob] = {}
+_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def build_period(kind: str, year: int, month: Optional[int] = None,
+                 end_year: Optional[int] = None, end_month: Optional[int] = None) -> ReportPeriod:
+    """Build the date range for a report. Raises ValueError on an invalid combination."""
+    if kind == "yearly":
+        return ReportPeriod(kind, date(year, 1, 1), date(year + 1, 1, 1), f"{year}", f"{year}")
+    if not month:
+        raise ValueError("Mês é obrigatório para este tipo de relatório")
+    start = date(year, month, 1)
+    if kind == "monthly":
+        end_year, end_month = year, month
+    elif kind == "range":
+        if not end_year or not end_month:
+            raise ValueError("Mês e ano finais são obrigatórios para relatórios por período")
+        if (end_year, end_month) < (year, month):
+            raise ValueError("O período final deve ser posterior ao inicial")
+    else:
+        raise ValueError("Tipo de relatório inválido")
+    end = date(end_year + 1, 1, 1) if end_month == 12 else date(end_year, end_month + 1, 1)
+    if kind == "monthly":
+        return ReportPeriod(kind, start, end, f"{month:02d}/{year}", f"{year}_{month:02d}")
+    return ReportPeriod(
+        kind, start, end,
+        f"{month:02d}/{year} a {end_month:02d}/{end_year}",
+        f"{year}_{month:02d}_{end_year}_{end_month:02d}",
+    )
+
+
+def data_version(db: Session, user_id: int) -> int:
+    """The user's data version: changes with every write, including edits and category renames."""
+    return db.query(User.data_version).filter(User.id == user_id).scalar() or 0
+
+
+def load_rows(db: Session, user_id: int, period: ReportPeriod) -> List[ReportRow]:
+    names = category_registry.names(db, user_id)
+    rows = (
+        db.query(Transaction.date, Transaction.type, Transaction.amount, Transaction.category_id, Transaction.description)
+        .filter(Transaction.user_id == user_id)
+        .filter(Transaction.date >= period.start, Transaction.date < period.end)
+        .order_by(Transaction.date.asc(), Transaction.id.asc())
+        .all()
+    )
+    rows = ((d, typ, amount, names.get(category_id), desc) for d, typ, amount, category_id, desc in rows)
+    rows = heapq.merge(rows, installment_rows(db, user_id, period.start, period.end), key=lambda r: r[0])
+    return [(d.isoformat(), typ, float(amount), name or "", desc or "") for d, typ, amount, name, desc in rows]
+
+
+def render_pdf(path: str, title: str, rows: List[ReportRow], monthly_totals: bool):
+    """Render the report to `path`. Runs inside a worker process, so it only takes plain data."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    c = canvas.Canvas(tmp_path, pagesize=A4)
+    width, height = A4
+
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, height - 50, f"Relatório - {title}")
+    c.setFont("Helvetica", 10)
+
+    y = height - 80
+    total_income = 0.0
+    total_expense = 0.0
+    by_month: Dict[str, List[float]] = {}
+
+    def next_line(step: float = 15):
+        nonlocal y
+        y -= step
+        if y < 50:
+            c.showPage()
+            c.setFont("Helvetica", 10)
+            y = height - 50
+
+    for day, typ, amount, category_name, description in rows:
+        month_totals = by_month.setdefault(day[:7], [0.0, 0.0])
+        if typ == "income":
+            total_income += amount
+            month_totals[0] += amount
+        else:
+            total_expense += amount
+            month_totals[1] += amount
+        line = f"{day} | {typ:<7} | R$ {amount:>8.2f} | {category_name:<15} | {description}"
+        c.drawString(50, y, line[:95])
+        next_line()
+
+    if monthly_totals and by_month:
+        next_line(10)
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(50, y, "Resumo mensal")
+        c.setFont("Helvetica", 10)
+        next_line()
+        for key in sorted(by_month):
+            income, expense = by_month[key]
+            label = f"{MONTH_NAMES[int(key[5:7]) - 1]}/{key[:4]}"
+            c.drawString(50, y, f"{label:<10} | Receitas R$ {income:>10.2f} | Despesas R$ {expense:>10.2f} | Saldo R$ {income - expense:>10.2f}")
+            next_line()
+
+    net = total_income - total_expense
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y - 10, f"Receitas: R$ {total_income:.2f}")
+    c.drawString(250, y - 10, f"Despesas: R$ {total_expense:.2f}")
+    c.drawString(450, y - 10, f"Saldo: R$ {net:.2f}")
+
+    c.showPage()
+    c.save()
+    # Atomic publish: readers never see a half-written file
+    os.replace(tmp_path, path)
+
+
+def _period_dir(user_id: int, period: ReportPeriod) -> str:
+    return os.path.join(REPORTS_DIR, str(user_id), period.slug)
+
+
+def _file_version(path: str) -> int:
+    return int(os.path.basename(path).split("-", 1)[0])
+
+
+def _remove_superseded(job: ReportJob):
+    """Delete the period's reports rendered from older data versions."""
+    for path in glob.glob(os.path.join(os.path.dirname(job.path), "*-*.pdf")):
+        try:
+            if _file_version(path) < job.version:
+                os.remove(path)
+        except (ValueError, OSError):
+            pass
+
+
+def _prune_jobs():
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    for job_id in [k for k, job in _jobs.items() if job.created_at < cutoff and job.status in ("done", "failed")]:
+        del _jobs[job_id]
+
+
+def submit(db: Session, user_id: int, period: ReportPeriod) -> ReportJob:
+    """Enqueue a report, or return the existing job / cached file for the same data."""
+    version = data_version(db, user_id)
+    job_id = hashlib.sha1(f"{user_id}:{period.slug}:{version}".encode()).hexdigest()[:20]
+    period_dir = _period_dir(user_id, period)
+    path = os.path.join(period_dir, f"{version}-{job_id}.pdf")
+
+    with _lock:
+        _prune_jobs()
+        job = _jobs.get(job_id)
+        if job and (job.status in ("pending", "running") or (job.status == "done" and os.path.exists(job.path))):
+            return job
+        job = ReportJob(id=job_id, user_id=user_id, period=period, path=path, version=version)
+        _jobs[job_id] = job
+        if os.path.exists(path):
+            job.status = "done"
+            job.finished.set()
+            return job
+
+    try:
+        os.makedirs(period_dir, exist_ok=True)
+        rows = load_rows(db, user_id, period)
+        job.status = "running"
+        future = _get_executor().submit(render_pdf, path, period.label, rows, period.kind != "monthly")
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        job.finished.set()
+        raise
+
+    def _done(f):
+        error = f.exception()
+        with _lock:
+            if error:
+                job.status = "failed"
+                job.error = str(error)
+            else:
+                job.status = "done"
+        job.finished.set()
+        if not error:
+            _remove_superseded(job)
+
+    future.add_done_callback(_done)
+    return job
+
+
+async def wait_async(job: ReportJob, timeout: float, poll: float = 0.05) -> bool:
+    """Await a job without blocking the event loop or a thread. Returns whether it finished."""
+    deadline = time.monotonic() + timeout
+    while not job.finished.is_set():
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll)
+    return True
+
+
+def get_job(user_id: int, job_id: str) -> Optional[ReportJob]:
+    """Look up a job, falling back to the disk cache when another worker rendered it."""
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+    with _lock:
+        job = _jobs.get(job_id)
+    if job:
+        if job.user_id != user_id:
+            return None
+        # A finished report whose data changed since may have been removed
+        if job.status != "done" or os.path.exists(job.path):
+            return job
+    for path in glob.glob(os.path.join(REPORTS_DIR, str(user_id), "*", f"*-{job_id}.pdf")):
+        job = ReportJob(id=job_id, user_id=user_id, period=None, path=path, status="done")
+        job.finished.set()
+        return job
+    return None
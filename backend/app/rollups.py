@@ -0,0 +1,127 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, extract, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import InstallmentPlan, MonthlyRollup, Transaction
+
+CENT = Decimal("0.01")
+
+# (user_id, year, month, category_id, type)
+RollupKey = Tuple[int, int, int, int, str]
+# key -> (amount, count)
+Deltas = Dict[RollupKey, Tuple[Decimal, int]]
+
+
+def rollup_key(user_id: int, tx_date: date, category_id: Optional[int], type_: str) -> RollupKey:
+    return (user_id, tx_date.year, tx_date.month, category_id or 0, type_)
+
+
+def apply_deltas(db: Session, deltas: Deltas):
+    """Add (amount, count) deltas to the rollup rows, creating missing rows.
+
+    Runs inside the caller's transaction, so the rollup changes are committed
+    (or rolled back) together with the transactions that produced them.
+    """
+    for (user_id, year, month, category_id, type_), (amount, count) in deltas.items():
+        key_filter = (
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.year == year,
+            MonthlyRollup.month == month,
+            MonthlyRollup.category_id == category_id,
+            MonthlyRollup.type == type_,
+        )
+        values = {
+            MonthlyRollup.total: MonthlyRollup.total + amount,
+            MonthlyRollup.count: MonthlyRollup.count + count,
+        }
+        updated = db.query(MonthlyRollup).filter(*key_filter).update(values, synchronize_session=False)
+        if updated:
+            if count < 0:
+                # Drop rows whose last transaction was removed, so they stop showing up
+                db.query(MonthlyRollup).filter(*key_filter, MonthlyRollup.count <= 0).delete(synchronize_session=False)
+            continue
+        # Flush the caller's pending rows first: their errors (e.g. a duplicate recurring
+        # period) must reach the caller, not be taken for the rollup insert race below
+        db.flush()
+        try:
+            # Savepoint so a concurrent insert of the same key doesn't abort the whole transaction
+            with db.begin_nested():
+                db.add(MonthlyRollup(
+                    user_id=user_id, year=year, month=month, category_id=category_id,
+                    type=type_, total=amount, count=count,
+                ))
+        except IntegrityError:
+            db.query(MonthlyRollup).filter(*key_filter).update(values, synchronize_session=False)
+
+
+def new_deltas() -> Deltas:
+    return defaultdict(lambda: (Decimal("0"), 0))
+
+
+def add_delta(deltas: Deltas, user_id: int, tx_date: date, category_id: Optional[int], type_: str,
+              amount: Decimal, sign: int = 1):
+    """Add one entry to a running group of deltas (see `new_deltas`)."""
+    key = rollup_key(user_id, tx_date, category_id, type_)
+    total, count = deltas[key]
+    # Quantize like the Numeric(12, 2) column so incremental totals match a rebuild
+    amount = Decimal(str(amount)).quantize(CENT)
+    deltas[key] = (total + sign * amount, count + sign)
+
+
+def collect_deltas(entries: Iterable[Tuple[int, date, Optional[int], str, Decimal]], sign: int = 1) -> Deltas:
+    """Group (user_id, date, category_id, type, amount) entries by rollup key."""
+    deltas = new_deltas()
+    for user_id, tx_date, category_id, type_, amount in entries:
+        add_delta(deltas, user_id, tx_date, category_id, type_, amount, sign)
+    return deltas
+
+
+def record_transactions(db: Session, transactions: Iterable[Transaction], sign: int = 1):
+    """Reflect added (sign=1) or removed (sign=-1) transactions in the rollups."""
+    apply_deltas(db, collect_deltas(
+        ((t.user_id, t.date, t.category_id, t.type, t.amount) for t in transactions), sign
+    ))
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """Regenerate the rollup table from raw transactions and installment plans.
+
+    Returns the number of rows written from transactions.
+    """
+    stmt = delete(MonthlyRollup)
+    if user_id is not None:
+        stmt = stmt.where(MonthlyRollup.user_id == user_id)
+    db.execute(stmt)
+
+    year = extract("year", Transaction.date)
+    month = extract("month", Transaction.date)
+    category_id = func.coalesce(Transaction.category_id, 0)
+    source = select(
+        Transaction.user_id,
+        year,
+        month,
+        category_id,
+        Transaction.type,
+        func.sum(Transaction.amount),
+        func.count(Transaction.id),
+    ).group_by(Transaction.user_id, year, month, category_id, Transaction.type)
+    if user_id is not None:
+        source = source.where(Transaction.user_id == user_id)
+
+    result = db.execute(insert(MonthlyRollup).from_select(
+        ["user_id", "year", "month", "category_id", "type", "total", "count"], source
+    ))
+
+    # Installment plans have no rows to aggregate in SQL; add their expanded installments
+    from .installments import record_plans
+    plans = db.query(InstallmentPlan)
+    if user_id is not None:
+        plans = plans.filter(InstallmentPlan.user_id == user_id)
+    record_plans(db, plans.yield_per(1000))
+    db.commit()
+    return result.rowcount
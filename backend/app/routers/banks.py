@@ -1,35 +1,19 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from ..database import get_db
-from ..auth import get_current_user
+from ..routing import DBRoute
+from ..auth import get_current_user, get_current_user_id
+from ..versioning import bump_data_version, etag
 from ..models import Bank, Vault, User
 from ..schemas import BankCreate, BankUpdate, BankOut
 
-router = APIRouter(prefix="/banks", tags=["banks"])
+router = APIRouter(prefix="/banks", tags=["banks"], route_class=DBRoute)
 
-def calculate_bank_balance(db: Session, bank_id: int) -> float:
-    """Calculate bank balance as sum of all linked vault balances"""
-    result = db.query(func.coalesce(func.sum(Vault.balance), 0)).filter(
-        Vault.bank_id == bank_id
-    ).scalar()
-    return float(result)
-
-def update_bank_balance(db: Session, bank_id: int):
-    """Recalculate and update bank current_balance"""
-    bank = db.query(Bank).filter(Bank.id == bank_id).first()
-    if bank:
-        bank.current_balance = calculate_bank_balance(db, bank_id)
-        db.commit()
-
-@router.get("/", response_model=List[BankOut])
-def list_banks(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    banks = db.query(Bank).filter(Bank.user_id == user.id).all()
-    # Recalculate balances for accuracy
-    for bank in banks:
-        bank.current_balance = calculate_bank_balance(db, bank.id)
-    return banks
+@router.get("/", response_model=List[BankOut], dependencies=[Depends(etag)])
+def list_banks(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    # current_balance is kept equal to the sum of the bank's vaults by every vault balance change
+    return db.query(Bank).filter(Bank.user_id == user_id).all()
 
 @router.post("/", response_model=BankOut)
 def create_bank(payload: BankCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
@@ -41,17 +25,16 @@ def create_bank(payload: BankCreate, db: Session = Depends(get_db), user: User =
         icon_color=payload.icon_color
     )
     db.add(bank)
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(bank)
     return bank
 
-@router.get("/{id}", response_model=BankOut)
+@router.get("/{id}", response_model=BankOut, dependencies=[Depends(etag)])
 def get_bank(id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     bank = db.query(Bank).filter(Bank.id == id, Bank.user_id == user.id).first()
     if not bank:
         raise HTTPException(status_code=404, detail="Banco não encontrado")
-    # Recalculate balance
-    bank.current_balance = calculate_bank_balance(db, bank.id)
     return bank
 
 @router.put("/{id}", response_model=BankOut)
@@ -65,10 +48,9 @@ def update_bank(id: int, payload: BankUpdate, db: Session = Depends(get_db), use
     if payload.icon_color is not None:
         bank.icon_color = payload.icon_color
     
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(bank)
-    # Recalculate balance
-    bank.current_balance = calculate_bank_balance(db, bank.id)
     return bank
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -83,5 +65,6 @@ def delete_bank(id: int, db: Session = Depends(get_db), user: User = Depends(get
         raise HTTPException(status_code=400, detail="Não é possível excluir banco com cofres vinculados")
     
     db.delete(bank)
+    bump_data_version(db, user.id)
     db.commit()
     return None
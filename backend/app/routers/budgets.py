@@ -0,0 +1,197 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, func, insert, literal, select
+from sqlalchemy.orm import Session, aliased
+
+from ..database import get_db
+from ..routing import DBRoute
+from ..auth import get_current_user, get_current_user_id
+from ..category_registry import category_registry
+from ..versioning import bump_data_version, etag
+from ..models import Budget, MonthlyRollup, User
+from ..schemas import BudgetCopyResult, BudgetCreate, BudgetOut, BudgetProgress, BudgetProgressItem, BudgetUpdate
+
+router = APIRouter(prefix="/budgets", tags=["budgets"], route_class=DBRoute)
+
+
+def _period(month: Optional[int], year: Optional[int]):
+    today = date.today()
+    return month or today.month, year or today.year
+
+
+def _check_amount(amount: float):
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="O valor do orçamento deve ser maior que zero")
+
+
+@router.get("/", response_model=List[BudgetOut], dependencies=[Depends(etag)])
+def list_budgets(
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1970, le=2100),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    month, year = _period(month, year)
+    return (
+        db.query(Budget)
+        .filter(Budget.user_id == user_id, Budget.year == year, Budget.month == month)
+        .order_by(Budget.category_id.is_(None).desc(), Budget.category_id)
+        .all()
+    )
+
+
+@router.post("/", response_model=BudgetOut)
+def create_budget(payload: BudgetCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    if not 1 <= payload.month <= 12 or not 1970 <= payload.year <= 2100:
+        raise HTTPException(status_code=400, detail="Mês ou ano inválido")
+    _check_amount(payload.amount)
+    if payload.category_id:
+        category = category_registry.get(db, user.id, payload.category_id)
+        if not category:
+            raise HTTPException(status_code=404, detail="Categoria não encontrada")
+        if category.type != "expense":
+            raise HTTPException(status_code=400, detail="Orçamentos são definidos para categorias de despesa")
+    exists = db.query(Budget.id).filter(
+        Budget.user_id == user.id, Budget.year == payload.year, Budget.month == payload.month,
+        Budget.category_id.is_not_distinct_from(payload.category_id or None),
+    ).first()
+    if exists:
+        raise HTTPException(status_code=409, detail="Já existe um orçamento para esta categoria neste mês")
+
+    budget = Budget(
+        user_id=user.id,
+        category_id=payload.category_id or None,
+        month=payload.month,
+        year=payload.year,
+        amount=Decimal(str(payload.amount)),
+    )
+    db.add(budget)
+    bump_data_version(db, user.id)
+    db.commit()
+    db.refresh(budget)
+    return budget
+
+
+@router.get("/progress", response_model=BudgetProgress, dependencies=[Depends(etag)])
+def budget_progress(
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1970, le=2100),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """Planned vs spent for every budgeted category and every category with expenses in the month."""
+    month, year = _period(month, year)
+    budgets = db.query(Budget.id, Budget.category_id, Budget.amount).filter(
+        Budget.user_id == user_id, Budget.year == year, Budget.month == month,
+    ).all()
+    # Spent amounts come from the rollups maintained with every transaction write
+    spent_rows = (
+        db.query(MonthlyRollup.category_id, func.sum(MonthlyRollup.total))
+        .filter(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.year == year,
+            MonthlyRollup.month == month,
+            MonthlyRollup.type == "expense",
+        )
+        .group_by(MonthlyRollup.category_id)
+        .all()
+    )
+    spent: Dict[Optional[int], Decimal] = {category_id or None: Decimal(str(total or 0)) for category_id, total in spent_rows}
+    total_spent = sum(spent.values(), Decimal("0"))
+    names = category_registry.names(db, user_id)
+
+    def item(category_id: Optional[int], budget_id: Optional[int], planned: Decimal, used: Decimal) -> BudgetProgressItem:
+        if category_id is None:
+            name = "Total" if budget_id else "Sem categoria"
+        else:
+            name = names.get(category_id, "Sem categoria")
+        return BudgetProgressItem(
+            category_id=category_id,
+            category_name=name,
+            budget_id=budget_id,
+            planned=float(planned),
+            spent=float(used),
+            remaining=float(planned - used),
+            percent=round(float(used / planned * 100), 1) if planned else None,
+        )
+
+    items = []
+    budgeted = set()
+    for budget_id, category_id, amount in budgets:
+        # The budget without a category covers all expenses of the month
+        used = spent.get(category_id, Decimal("0")) if category_id else total_spent
+        items.append(item(category_id, budget_id, Decimal(str(amount)), used))
+        if category_id:
+            budgeted.add(category_id)
+    for category_id, used in spent.items():
+        if category_id not in budgeted:
+            items.append(item(category_id, None, Decimal("0"), used))
+    items.sort(key=lambda i: (i.budget_id is None, i.category_id is not None, -i.spent))
+
+    return BudgetProgress(
+        month=month,
+        year=year,
+        planned=float(sum((Decimal(str(amount)) for _, category_id, amount in budgets if category_id), Decimal("0"))),
+        spent=float(total_spent),
+        items=items,
+    )
+
+
+@router.post("/copy-forward", response_model=BudgetCopyResult)
+def copy_budgets_forward(
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1970, le=2100),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Copy the month's budgets into the next month, skipping categories that already have one there."""
+    month, year = _period(month, year)
+    target_month, target_year = (1, year + 1) if month == 12 else (month + 1, year)
+
+    existing = aliased(Budget)
+    source = select(
+        Budget.user_id, Budget.category_id, literal(target_month), literal(target_year), Budget.amount,
+        literal(datetime.utcnow()),
+    ).where(
+        Budget.user_id == user.id, Budget.year == year, Budget.month == month,
+        ~select(existing.id).where(and_(
+            existing.user_id == Budget.user_id,
+            existing.year == target_year,
+            existing.month == target_month,
+            existing.category_id.is_not_distinct_from(Budget.category_id),
+        )).exists(),
+    )
+    created = db.execute(
+        insert(Budget).from_select(["user_id", "category_id", "month", "year", "amount", "created_at"], source)
+    ).rowcount
+    if created:
+        bump_data_version(db, user.id)
+    db.commit()
+    return BudgetCopyResult(month=target_month, year=target_year, created=created)
+
+
+@router.put("/{id}", response_model=BudgetOut)
+def update_budget(id: int, payload: BudgetUpdate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    budget = db.query(Budget).filter(Budget.id == id, Budget.user_id == user.id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Orçamento não encontrado")
+    _check_amount(payload.amount)
+    budget.amount = Decimal(str(payload.amount))
+    bump_data_version(db, user.id)
+    db.commit()
+    db.refresh(budget)
+    return budget
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_budget(id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    budget = db.query(Budget).filter(Budget.id == id, Budget.user_id == user.id).first()
+    if not budget:
+        raise HTTPException(status_code=404, detail="Orçamento não encontrado")
+    db.delete(budget)
+    bump_data_version(db, user.id)
+    db.commit()
+    return None
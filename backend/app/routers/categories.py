@@ -2,21 +2,19 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from ..database import get_db
-from ..auth import get_current_user
+from ..routing import DBRoute
+from ..auth import get_current_user, get_current_user_id
+from ..category_registry import category_registry
+from ..versioning import bump_data_version, etag
 from ..models import Category, User
 from ..schemas import CategoryCreate, CategoryUpdate, CategoryOut
 
-router = APIRouter(prefix="/categories", tags=["categories"])
+router = APIRouter(prefix="/categories", tags=["categories"], route_class=DBRoute)
 
-@router.get("/", response_model=List[CategoryOut])
-def list_categories(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    # Return system categories OR user's own categories
-    # Use distinct or union logic? Or just simple OR filter
-    # Check if SQLAlchemy can handle OR easily
-    from sqlalchemy import or_
-    return db.query(Category).filter(
-        or_(Category.is_system == True, Category.user_id == user.id)
-    ).all()
+@router.get("/", response_model=List[CategoryOut], dependencies=[Depends(etag)])
+def list_categories(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    # System categories plus the user's own, from the in-process registry
+    return category_registry.for_user(db, user_id)
 
 @router.post("/", response_model=CategoryOut)
 def create_category(payload: CategoryCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
@@ -28,7 +26,9 @@ def create_category(payload: CategoryCreate, db: Session = Depends(get_db), user
         is_system=False
     )
     db.add(category)
+    bump_data_version(db, user.id)
     db.commit()
+    category_registry.invalidate(user.id)
     db.refresh(category)
     return category
 
@@ -51,7 +51,9 @@ def update_category(id: int, payload: CategoryUpdate, db: Session = Depends(get_
     if payload.icon is not None:
         category.icon = payload.icon
         
+    bump_data_version(db, user.id)
     db.commit()
+    category_registry.invalidate(user.id)
     db.refresh(category)
     return category
 
@@ -67,5 +69,7 @@ def delete_category(id: int, db: Session = Depends(get_db), user: User = Depends
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     db.delete(category)
+    bump_data_version(db, user.id)
     db.commit()
+    category_registry.invalidate(user.id)
     return None
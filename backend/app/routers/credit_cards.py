@@ -1,19 +1,22 @@
 from datetime import date
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..auth import get_current_user
-from ..models import CreditCard, User, Transaction
-from ..schemas import CreditCardCreate, CreditCardUpdate, CreditCardOut
+from ..routing import DBRoute
+from ..auth import get_current_user, get_current_user_id
+from ..versioning import bump_data_version, etag
+from ..models import CreditCard, User, Transaction, InstallmentPlan
+from ..schemas import CreditCardCreate, CreditCardUpdate, CreditCardOut, InvoiceDetail, InvoiceList, InvoiceOut
+from .. import invoices
 
-router = APIRouter(prefix="/credit-cards", tags=["credit-cards"])
+router = APIRouter(prefix="/credit-cards", tags=["credit-cards"], route_class=DBRoute)
 
-@router.get("/", response_model=List[CreditCardOut])
-def get_credit_cards(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return db.query(CreditCard).filter(CreditCard.user_id == user.id).all()
+@router.get("/", response_model=List[CreditCardOut], dependencies=[Depends(etag)])
+def get_credit_cards(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    return db.query(CreditCard).filter(CreditCard.user_id == user_id).all()
 
 @router.post("/", response_model=CreditCardOut, status_code=status.HTTP_201_CREATED)
 def create_credit_card(payload: CreditCardCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
@@ -26,6 +29,7 @@ def create_credit_card(payload: CreditCardCreate, db: Session = Depends(get_db),
         color=payload.color
     )
     db.add(cc)
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(cc)
     return cc
@@ -46,7 +50,12 @@ def update_credit_card(id: int, payload: CreditCardUpdate, db: Session = Depends
         cc.due_day = payload.due_day
     if payload.color is not None:
         cc.color = payload.color
+
+    # New cycle boundaries or due dates: every stored invoice is stale
+    if payload.closing_day is not None or payload.due_day is not None:
+        invoices.invalidate(db, cc.id)
         
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(cc)
     return cc
@@ -59,8 +68,60 @@ def delete_credit_card(id: int, db: Session = Depends(get_db), user: User = Depe
     
     # Check if there are transactions
     tx_count = db.query(Transaction).filter(Transaction.credit_card_id == id).count()
-    if tx_count > 0:
+    plan_count = db.query(InstallmentPlan).filter(InstallmentPlan.credit_card_id == id).count()
+    if tx_count > 0 or plan_count > 0:
         raise HTTPException(status_code=400, detail="Não é possível excluir cartão com transações vinculadas")
         
+    invoices.invalidate(db, cc.id)
     db.delete(cc)
+    bump_data_version(db, user.id)
     db.commit()
+
+
+def _invoice_out(invoice: invoices.Invoice) -> dict:
+    return dict(
+        cycle=invoice.label,
+        status=invoice.status,
+        start_date=invoice.start_date,
+        closing_date=invoice.closing_date,
+        due_date=invoice.due_date,
+        total=invoice.total,
+        count=invoice.count,
+    )
+
+@router.get("/{id}/invoices", response_model=InvoiceList, dependencies=[Depends(etag)])
+def get_invoices(
+    id: int,
+    months: int = Query(6, ge=1, le=24),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    cc = db.query(CreditCard).filter(CreditCard.id == id, CreditCard.user_id == user_id).first()
+    if not cc:
+        raise HTTPException(status_code=404, detail="Cartão de crédito não encontrado")
+
+    today = date.today()
+    return InvoiceList(
+        credit_card_id=cc.id,
+        limit=cc.limit,
+        available_limit=invoices.available_limit(db, cc, today),
+        invoices=[InvoiceOut(**_invoice_out(i)) for i in invoices.list_invoices(db, cc, today, months)],
+    )
+
+@router.get("/{id}/invoices/{cycle}", response_model=InvoiceDetail, dependencies=[Depends(etag)])
+def get_invoice(
+    id: int,
+    cycle: str = Path(..., pattern=r"^\d{4}-\d{2}$"),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    cc = db.query(CreditCard).filter(CreditCard.id == id, CreditCard.user_id == user_id).first()
+    if not cc:
+        raise HTTPException(status_code=404, detail="Cartão de crédito não encontrado")
+    try:
+        cycle_key = invoices.parse_cycle(cycle)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ciclo inválido, use AAAA-MM")
+
+    invoice, items = invoices.get_invoice(db, cc, cycle_key, date.today())
+    return InvoiceDetail(**_invoice_out(invoice), items=items)
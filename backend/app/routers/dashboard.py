@@ -1,16 +1,19 @@
 from typing import Dict, List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 from datetime import date
 import calendar
 from pydantic import BaseModel
 
 from ..database import get_db
-from ..auth import get_current_user
-from ..models import Transaction, Category, User, RecurringTransaction
+from ..routing import DBRoute
+from ..auth import get_current_user_id
+from ..versioning import etag
+from .. import fastjson
+from ..models import Category, RecurringTransaction, MonthlyRollup
 from ..schemas import DashboardSummary, RecurringTransactionOut
 
-router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/dashboard", tags=["dashboard"], route_class=DBRoute)
 
 
 class EvolutionItem(BaseModel):
@@ -30,31 +33,37 @@ def subtract_months(d: date, months: int) -> date:
     return date(year, month, day)
 
 
-@router.get("/summary", response_model=DashboardSummary)
+@router.get("/summary", response_model=DashboardSummary, dependencies=[Depends(etag)])
 def summary(
     month: int = Query(..., ge=1, le=12),
     year: int = Query(..., ge=1970, le=2100),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
-    from sqlalchemy import extract
-
-    txs = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == user.id)
-        .filter(extract('month', Transaction.date) == month)
-        .filter(extract('year', Transaction.date) == year)
+    from sqlalchemy import func
+
+    rows = (
+        db.query(MonthlyRollup.type, Category.name, func.sum(MonthlyRollup.total))
+        .outerjoin(Category, Category.id == MonthlyRollup.category_id)
+        .filter(MonthlyRollup.user_id == user_id)
+        .filter(MonthlyRollup.year == year)
+        .filter(MonthlyRollup.month == month)
+        .group_by(MonthlyRollup.type, Category.name)
         .all()
     )
 
-    total_income = sum(float(t.amount) for t in txs if t.type == "income")
-    total_expense = sum(float(t.amount) for t in txs if t.type == "expense")
-    net = total_income - total_expense
-
+    total_income = 0.0
+    total_expense = 0.0
     by_category: Dict[str, float] = {}
-    for t in txs:
-        name = t.category.name if t.category else "Sem categoria"
-        by_category[name] = by_category.get(name, 0.0) + float(t.amount) * (1 if t.type == "income" else -1)
+    for typ, category_name, total in rows:
+        amount = float(total or 0)
+        if typ == "income":
+            total_income += amount
+        else:
+            total_expense += amount
+        name = category_name or "Sem categoria"
+        by_category[name] = by_category.get(name, 0.0) + amount * (1 if typ == "income" else -1)
+    net = total_income - total_expense
 
     return DashboardSummary(
         month=month,
@@ -66,51 +75,60 @@ def summary(
     )
 
 
-@router.get("/evolution", response_model=List[EvolutionItem])
+@router.get("/evolution", response_model=List[EvolutionItem], dependencies=[Depends(etag)])
 def evolution(
-    months: int = Query(6, ge=1, le=12),
+    request: Request,
+    months: int = Query(6, ge=1, le=60),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
-    from sqlalchemy import extract
-    
-    result = []
+    from sqlalchemy import func
+
     today = date.today()
-    
-    for i in range(months - 1, -1, -1):
-        target_date = subtract_months(today, i)
-        target_month = target_date.month
-        target_year = target_date.year
-        
-        txs = (
-            db.query(Transaction)
-            .filter(Transaction.user_id == user.id)
-            .filter(extract('month', Transaction.date) == target_month)
-            .filter(extract('year', Transaction.date) == target_year)
-            .all()
-        )
-        
-        income = sum(float(t.amount) for t in txs if t.type == "income")
-        expense = sum(float(t.amount) for t in txs if t.type == "expense")
-        
-        month_names = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-        month_label = f"{month_names[target_month - 1]}/{str(target_year)[2:]}"
-        
-        result.append(EvolutionItem(month=month_label, income=income, expense=expense))
-    
+    first = subtract_months(today, months - 1)
+    window = [subtract_months(today, i) for i in range(months - 1, -1, -1)]
+
+    # One grouped query over the monthly rollups: at most 2 rows (income/expense) per month
+    period = MonthlyRollup.year * 12 + MonthlyRollup.month
+    rows = (
+        db.query(MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.type, func.sum(MonthlyRollup.total))
+        .filter(MonthlyRollup.user_id == user_id)
+        .filter(MonthlyRollup.year >= first.year, MonthlyRollup.year <= today.year)
+        .filter(period >= first.year * 12 + first.month, period <= today.year * 12 + today.month)
+        .group_by(MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.type)
+        .all()
+    )
+    totals: Dict[tuple, float] = {(y, m, typ): float(total or 0) for y, m, typ, total in rows}
+
+    month_names = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+    result = []
+    for target_date in window:
+        key = (target_date.year, target_date.month)
+        month_label = f"{month_names[target_date.month - 1]}/{str(target_date.year)[2:]}"
+        result.append(dict(
+            month=month_label,
+            income=totals.get(key + ("income",), 0.0),
+            expense=totals.get(key + ("expense",), 0.0),
+        ))
+
+    if fastjson.enabled():
+        return fastjson.json_response(request, result)
     return result
 
 
-@router.get("/recurring", response_model=List[RecurringTransactionOut])
+@router.get("/recurring", response_model=List[RecurringTransactionOut], dependencies=[Depends(etag)])
 def get_recurring(
+    request: Request,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
-    recurring = (
+    q = (
         db.query(RecurringTransaction)
-        .filter(RecurringTransaction.user_id == user.id)
+        .filter(RecurringTransaction.user_id == user_id)
         .filter(RecurringTransaction.is_active == True)
         .order_by(RecurringTransaction.day_of_month)
-        .all()
     )
-    return recurring
\ No newline at end of file
+    if fastjson.enabled():
+        columns = fastjson.model_columns(RecurringTransaction, RecurringTransactionOut)
+        return fastjson.json_response(request, fastjson.row_dicts(q.with_entities(*columns)))
+    return q.all()
\ No newline at end of file
@@ -0,0 +1,29 @@
+import time
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..database import get_db, pool_status, DATABASE_MODE
+from ..routing import DBRoute
+from .metrics import require_metrics_token
+
+router = APIRouter(
+    prefix="/health", tags=["health"], route_class=DBRoute, dependencies=[Depends(require_metrics_token)]
+)
+
+
+@router.get("/db")
+def health_db(db: Session = Depends(get_db)):
+    """Database round trip, plus pool occupancy and checkout wait statistics (METRICS_ENABLED) for sizing the pool."""
+    started = time.perf_counter()
+    db.execute(text("SELECT 1"))
+    result = {
+        "status": "ok",
+        "mode": DATABASE_MODE,
+        "ping_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    if metrics.METRICS_ENABLED:
+        result["pools"] = pool_status()
+    return result
@@ -0,0 +1,55 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from .. import metrics as metrics_config
+from ..database import pool_status
+from ..metrics import registry
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    """Operational routes: open without METRICS_TOKEN, otherwise only with that bearer token."""
+    token = metrics_config.METRICS_TOKEN
+    if not token:
+        return
+    scheme, _, value = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(value.encode(), token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(tags=["metrics"], dependencies=[Depends(require_metrics_token)])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+POOL_GAUGES = (
+    ("size", "db_pool_size", "gauge", "Configured pool size."),
+    ("checked_out", "db_pool_checked_out", "gauge", "Connections currently in use."),
+    ("overflow", "db_pool_overflow", "gauge", "Connections open beyond the pool size."),
+    ("checkouts", "db_pool_checkouts_total", "counter", "Connections handed out."),
+    ("timeouts", "db_pool_timeouts_total", "counter", "Checkouts that gave up after DB_POOL_TIMEOUT."),
+    ("wait_max_ms", "db_pool_wait_max_ms", "gauge", "Longest checkout wait since startup."),
+)
+
+
+def _pool_metrics() -> str:
+    pools = pool_status()
+    lines = []
+    for key, name, kind, help_text in POOL_GAUGES:
+        samples = [(engine, info[key]) for engine, info in pools.items() if key in info]
+        if not samples:
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{engine="{engine}"}} {value}' for engine, value in samples]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Request, SQL and pool metrics in Prometheus text format (per process)."""
+    return PlainTextResponse(registry.render() + _pool_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,69 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..routing import DBRoute
+from ..auth import get_current_user_id
+from ..models import Notification
+from ..schemas import NotificationCount, NotificationOut
+
+# No ETags here: notifications are written by the background consumer, which does
+# not bump users.data_version (that would revalidate every cached page of the user)
+router = APIRouter(prefix="/notifications", tags=["notifications"], route_class=DBRoute)
+
+
+@router.get("/", response_model=List[NotificationOut])
+def list_notifications(
+    unread: bool = False,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    q = db.query(Notification).filter(Notification.user_id == user_id)
+    if unread:
+        q = q.filter(Notification.read == False)
+    return q.order_by(Notification.id.desc()).limit(limit).offset(offset).all()
+
+
+@router.get("/unread-count", response_model=NotificationCount)
+def unread_count(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    """Answered from ix_notifications_user_read alone; cheap enough to poll."""
+    count = db.query(func.count(Notification.id)).filter(
+        Notification.user_id == user_id, Notification.read == False,
+    ).scalar()
+    return NotificationCount(unread=count)
+
+
+@router.post("/read-all", response_model=NotificationCount)
+def mark_all_read(db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    db.query(Notification).filter(Notification.user_id == user_id, Notification.read == False).update(
+        {Notification.read: True}, synchronize_session=False,
+    )
+    db.commit()
+    return NotificationCount(unread=0)
+
+
+@router.post("/{id}/read", response_model=NotificationOut)
+def mark_read(id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    notification = db.query(Notification).filter(Notification.id == id, Notification.user_id == user_id).first()
+    if not notification:
+        raise HTTPException(status_code=404, detail="Notificação não encontrada")
+    notification.read = True
+    db.commit()
+    db.refresh(notification)
+    return notification
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_notification(id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    deleted = db.query(Notification).filter(Notification.id == id, Notification.user_id == user_id).delete(
+        synchronize_session=False,
+    )
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Notificação não encontrada")
+    db.commit()
+    return None
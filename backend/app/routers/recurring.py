@@ -1,18 +1,26 @@
+from datetime import date
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..auth import get_current_user
-from ..models import RecurringTransaction, User, Bank, Category, CreditCard
+from ..routing import DBRoute
+from ..auth import get_current_user, get_current_user_id
+from ..versioning import bump_data_version, etag
+from .. import fastjson
+from ..models import RecurringTransaction, Transaction, User, Bank, Category, CreditCard
 from ..schemas import RecurringTransactionCreate, RecurringTransactionUpdate, RecurringTransactionOut
 
-router = APIRouter(prefix="/recurring", tags=["recurring"])
+router = APIRouter(prefix="/recurring", tags=["recurring"], route_class=DBRoute)
 
-@router.get("/", response_model=List[RecurringTransactionOut])
-def get_recurring(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return db.query(RecurringTransaction).filter(RecurringTransaction.user_id == user.id).all()
+@router.get("/", response_model=List[RecurringTransactionOut], dependencies=[Depends(etag)])
+def get_recurring(request: Request, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    q = db.query(RecurringTransaction).filter(RecurringTransaction.user_id == user_id)
+    if fastjson.enabled():
+        columns = fastjson.model_columns(RecurringTransaction, RecurringTransactionOut)
+        return fastjson.json_response(request, fastjson.row_dicts(q.with_entities(*columns)))
+    return q.all()
 
 @router.post("/", response_model=RecurringTransactionOut, status_code=status.HTTP_201_CREATED)
 def create_recurring(payload: RecurringTransactionCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
@@ -34,6 +42,7 @@ def create_recurring(payload: RecurringTransactionCreate, db: Session = Depends(
         description=payload.description
     )
     db.add(rt)
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(rt)
     return rt
@@ -51,8 +60,12 @@ def update_recurring(id: int, payload: RecurringTransactionUpdate, db: Session =
     if payload.description is not None:
         rt.description = payload.description
     if payload.is_active is not None:
+        if payload.is_active and not rt.is_active:
+            # Resume from today: the months it was paused are not backfilled
+            rt.active_since = date.today()
         rt.is_active = payload.is_active
         
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(rt)
     return rt
@@ -63,5 +76,11 @@ def delete_recurring(id: int, db: Session = Depends(get_db), user: User = Depend
     if not rt:
         raise HTTPException(status_code=404, detail="Despesa fixa não encontrada")
         
+    # Detach the posted transactions explicitly: SQLite does not enforce ON DELETE SET NULL,
+    # and a new entry reusing this id would find their keys and skip those months
+    db.query(Transaction).filter(Transaction.recurring_id == rt.id).update(
+        {Transaction.recurring_id: None}, synchronize_session=False
+    )
     db.delete(rt)
+    bump_data_version(db, user.id)
     db.commit()
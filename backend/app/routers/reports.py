@@ -1,108 +1,163 @@
 import io
 import csv
-from datetime import datetime
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
+import heapq
+from datetime import date, datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import get_db, run_db, SessionLocal
+from ..routing import DBRoute
 from ..auth import get_current_user
+from ..category_registry import category_registry
+from .. import report_jobs
+from ..installments import report_rows as installment_rows
 from ..models import Transaction, User
-
-router = APIRouter(prefix="/reports", tags=["reports"])
+from ..periods import month_bounds
+from ..schemas import ReportJobCreate, ReportJobOut
+
+router = APIRouter(prefix="/reports", tags=["reports"], route_class=DBRoute)
+
+
+CSV_BATCH_SIZE = 1000
+
+
+def _resolve_range(month: Optional[int], year: Optional[int], start: Optional[date], end: Optional[date]):
+    """Pick the [start, end) export range from month/year or explicit dates (None = unbounded)."""
+    if month and year:
+        return month_bounds(month, year)
+    if start and end and end < start:
+        raise HTTPException(status_code=400, detail="A data final deve ser posterior à inicial")
+    # `end` is inclusive for callers; keep the range half-open internally
+    return start, (end + timedelta(days=1)) if end else None
+
+
+def _iter_csv(user_id: int, start: Optional[date], end: Optional[date]):
+    """Stream the CSV in batches so memory stays flat regardless of the range size."""
+    # The request-scoped session is closed once the response starts, so the generator owns its session
+    db = SessionLocal()
+    try:
+        stmt = (
+            select(Transaction.date, Transaction.type, Transaction.amount, Transaction.category_id, Transaction.description)
+            .where(Transaction.user_id == user_id)
+        )
+        if start:
+            stmt = stmt.where(Transaction.date >= start)
+        if end:
+            stmt = stmt.where(Transaction.date < end)
+        # yield_per streams from a server-side cursor where the driver supports it
+        stmt = stmt.order_by(Transaction.date.asc(), Transaction.id.asc()).execution_options(yield_per=CSV_BATCH_SIZE)
+
+        # Installments are few compared to transactions: expand them up front and merge by date
+        names = category_registry.names(db, user_id)
+        plan_rows = installment_rows(db, user_id, start, end)
+        tx_rows = (
+            (day, typ, amount, names.get(category_id), description)
+            for batch in db.execute(stmt).partitions() for day, typ, amount, category_id, description in batch
+        )
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["date", "type", "amount", "category", "description"])
+        yield output.getvalue().encode("utf-8")
+
+        pending = 0
+        output.seek(0)
+        output.truncate(0)
+        for tx_date, typ, amount, category_name, description in heapq.merge(tx_rows, plan_rows, key=lambda r: r[0]):
+            writer.writerow([
+                tx_date.isoformat(),
+                typ,
+                f"{float(amount):.2f}",
+                category_name or "",
+                description or "",
+            ])
+            pending += 1
+            if pending >= CSV_BATCH_SIZE:
+                yield output.getvalue().encode("utf-8")
+                output.seek(0)
+                output.truncate(0)
+                pending = 0
+        if pending:
+            yield output.getvalue().encode("utf-8")
+    finally:
+        db.close()
 
 
 @router.get("/export/csv")
 def export_csv(
-    month: int = Query(..., ge=1, le=12),
-    year: int = Query(..., ge=1970, le=2100),
-    db: Session = Depends(get_db),
+    month: Optional[int] = Query(None, ge=1, le=12),
+    year: Optional[int] = Query(None, ge=1970, le=2100),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
     user: User = Depends(get_current_user),
 ):
-    from sqlalchemy import extract
-
-    txs = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == user.id)
-        .filter(extract('month', Transaction.date) == month)
-        .filter(extract('year', Transaction.date) == year)
-        .order_by(Transaction.date.asc())
-        .all()
+    range_start, range_end = _resolve_range(month, year, start, end)
+
+    if month and year:
+        filename = f"sysfinance_{year}_{month:02d}.csv"
+    else:
+        filename = f"sysfinance_{start.isoformat() if start else 'inicio'}_{end.isoformat() if end else 'hoje'}.csv"
+    return StreamingResponse(
+        _iter_csv(user.id, range_start, range_end),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["date", "type", "amount", "category", "description"]) 
-    for t in txs:
-        writer.writerow([
-            t.date.isoformat(),
-            t.type,
-            f"{float(t.amount):.2f}",
-            t.category.name if t.category else "",
-            t.description or "",
-        ])
-    output.seek(0)
 
-    filename = f"sysfinance_{year}_{month:02d}.csv"
-    return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": f"attachment; filename={filename}"})
+def _job_out(job: report_jobs.ReportJob) -> ReportJobOut:
+    return ReportJobOut(
+        id=job.id,
+        status=job.status,
+        error=job.error,
+        download_url=f"/reports/jobs/{job.id}/download" if job.status == "done" else None,
+    )
+
+
+@router.post("/jobs", response_model=ReportJobOut, status_code=status.HTTP_202_ACCEPTED)
+def create_report_job(
+    payload: ReportJobCreate,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    try:
+        period = report_jobs.build_period(payload.kind, payload.year, payload.month, payload.end_year, payload.end_month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _job_out(report_jobs.submit(db, user.id, period))
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobOut)
+def get_report_job(job_id: str, user: User = Depends(get_current_user)):
+    job = report_jobs.get_job(user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Relatório não encontrado")
+    return _job_out(job)
+
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(job_id: str, user: User = Depends(get_current_user)):
+    job = report_jobs.get_job(user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Relatório não encontrado")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Relatório ainda não está pronto")
+    return FileResponse(job.path, media_type="application/pdf", filename=job.filename)
 
 
 @router.get("/export/pdf")
-def export_pdf(
+async def export_pdf(
     month: int = Query(..., ge=1, le=12),
     year: int = Query(..., ge=1970, le=2100),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    from sqlalchemy import extract
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-
-    txs = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == user.id)
-        .filter(extract('month', Transaction.date) == month)
-        .filter(extract('year', Transaction.date) == year)
-        .order_by(Transaction.date.asc())
-        .all()
-    )
-
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, height - 50, f"Relatório - {month:02d}/{year}")
-    c.setFont("Helvetica", 10)
-
-    y = height - 80
-    total_income = 0.0
-    total_expense = 0.0
-
-    for t in txs:
-        amount = float(t.amount)
-        if t.type == "income":
-            total_income += amount
-        else:
-            total_expense += amount
-        line = f"{t.date.isoformat()} | {t.type:<7} | R$ {amount:>8.2f} | {(t.category.name if t.category else ''):<15} | {t.description or ''}"
-        c.drawString(50, y, line[:95])
-        y -= 15
-        if y < 50:
-            c.showPage()
-            c.setFont("Helvetica", 10)
-            y = height - 50
-
-    net = total_income - total_expense
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y - 10, f"Receitas: R$ {total_income:.2f}")
-    c.drawString(250, y - 10, f"Despesas: R$ {total_expense:.2f}")
-    c.drawString(450, y - 10, f"Saldo: R$ {net:.2f}")
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-
-    filename = f"sysfinance_{year}_{month:02d}.pdf"
-    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
\ No newline at end of file
+    # Kept for direct links: goes through the job pipeline (and its disk cache) and waits for the result
+    # Async so the wait for the render worker holds neither a threadpool thread nor the event loop
+    period = report_jobs.build_period("monthly", year, month)
+    job = await run_db(db, lambda s: report_jobs.submit(s, user.id, period))
+    if not await report_jobs.wait_async(job, timeout=60) or job.status != "done":
+        raise HTTPException(status_code=503, detail="Não foi possível gerar o relatório")
+    return FileResponse(job.path, media_type="application/pdf", filename=job.filename)
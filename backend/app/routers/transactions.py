@@ -1,16 +1,31 @@
-from datetime import date
+import base64
+from datetime import date, timedelta
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy import and_, null, or_
+from sqlalchemy.orm import Session, joinedload
 
 from ..database import get_db
-from ..auth import get_current_user
-from ..models import Transaction, Category, User, Bank, Vault
-from ..schemas import TransactionCreate, TransactionOut
+from ..routing import DBRoute
+from ..auth import get_current_user, get_current_user_id
+from ..category_registry import category_registry
+from ..versioning import bump_data_version, etag
+from ..models import Transaction, Category, CreditCard, User, Bank, Vault, InstallmentPlan
+from .. import fastjson, importer, invoices
+from ..schemas import (
+    TransactionCreate, TransactionOut, TransactionPage, ImportResult, ImportRowError,
+    InstallmentPlanOut, InstallmentPlanUpdate,
+)
+from ..rollups import record_transactions
+from ..search import ranked, search_terms
+from ..periods import in_month, month_bounds
+from ..installments import PlanInstallment, expand, new_plan, overlapping, record_plans
+from ..balances import adjust_vault_balance
+from ..events import TransactionEvent, emit
 
-router = APIRouter(prefix="/transactions", tags=["transactions"])
+router = APIRouter(prefix="/transactions", tags=["transactions"], route_class=DBRoute)
 
 
 @router.post("/", response_model=TransactionOut)
@@ -19,10 +34,9 @@ def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db)
         if payload.type not in ("income", "expense"):
             raise HTTPException(status_code=400, detail="O tipo deve ser 'receita' (income) ou 'despesa' (expense)")
         
-        # Validate category if provided
+        # Validate category if provided: a system category or one of the user's
         if payload.category_id:
-            cat = db.query(Category).filter(Category.id == payload.category_id).first()
-            if not cat:
+            if not category_registry.get(db, user.id, payload.category_id):
                 raise HTTPException(status_code=404, detail="Categoria não encontrada")
 
         bank = None
@@ -31,57 +45,35 @@ def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db)
 
         # Validate Credit Card
         if payload.credit_card_id:
-            from ..models import CreditCard
             credit_card = db.query(CreditCard).filter(CreditCard.id == payload.credit_card_id, CreditCard.user_id == user.id).first()
             if not credit_card:
                 raise HTTPException(status_code=404, detail="Cartão de crédito não encontrado")
             
             # If credit card, ignore bank/vault for initial balance update (only update limit later if we want)
             if payload.installments and payload.installments > 1:
-                # INSTALLMENTS LOGIC
-                import calendar
-                from datetime import timedelta
-
-                total_amount = Decimal(str(payload.amount))
-                installments = payload.installments
-                installment_amount = total_amount / installments
-                
-                # Create N transactions
-                created_trans = []
-                current_date = payload.date
-                
-                for i in range(1, installments + 1):
-                    tr = Transaction(
-                        user_id=user.id,
-                        amount=installment_amount,
-                        type=payload.type,
-                        category_id=payload.category_id,
-                        credit_card_id=credit_card.id,
-                        installment_number=i,
-                        total_installments=installments,
-                        date=current_date,
-                        description=f"{payload.description or ''} ({i}/{installments})".strip(),
-                    )
-                    db.add(tr)
-                    created_trans.append(tr)
-                    
-                    # Move to next month (approximated logic: add 30 days or using relativedelta if available, otherwise manual)
-                    # Simple manual month increment
-                    year = current_date.year
-                    month = current_date.month + 1
-                    if month > 12:
-                        month = 1
-                        year += 1
-                        
-                    # Handle end of month (e.g. if started on 31st, next month 31st might not exist)
-                    last_day_next_month = calendar.monthrange(year, month)[1]
-                    day = min(current_date.day, last_day_next_month)
-                    current_date = date(year, month, day)
-
+                # Stored once as a plan; the monthly installments are expanded when read
+                plan = new_plan(
+                    user_id=user.id,
+                    credit_card_id=credit_card.id,
+                    category_id=payload.category_id,
+                    type_=payload.type,
+                    total_amount=Decimal(str(payload.amount)),
+                    installments=payload.installments,
+                    first_date=payload.date,
+                    description=payload.description,
+                )
+                db.add(plan)
+                record_plans(db, [plan])
+                invoices.invalidate(db, credit_card.id, payload.date)
+                bump_data_version(db, user.id)
                 db.commit()
-                # Refresh the first one to return (or last? API returns only one)
-                db.refresh(created_trans[0])
-                return created_trans[0]
+                db.refresh(plan)
+                emit(TransactionEvent(
+                    "plan_created", user.id, plan.type, plan.total_amount, plan.first_date,
+                    plan.category_id, plan.credit_card_id, plan.id, plan.description,
+                ))
+                # API returns a single entry: the first installment
+                return expand(plan)[0]
                 
         # If NOT credit card, proceed with normal Bank/Vault logic
         if not payload.credit_card_id:
@@ -110,17 +102,22 @@ def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db)
             description=payload.description if payload.description else None,
         )
         db.add(tr)
+        record_transactions(db, [tr])
+        if credit_card:
+            invoices.invalidate(db, credit_card.id, payload.date)
         
-        # Update Balance - new logic: if vault selected, update vault (bank balance = sum of vaults)
+        # Update Balance - if vault selected, update vault and its bank (bank balance = sum of vaults)
         if vault:
             amount_decimal = Decimal(str(payload.amount))
-            if payload.type == "income":
-                vault.balance = Decimal(str(vault.balance)) + amount_decimal
-            else:
-                vault.balance = Decimal(str(vault.balance)) - amount_decimal
+            adjust_vault_balance(db, vault, amount_decimal if payload.type == "income" else -amount_decimal)
 
+        bump_data_version(db, user.id)
         db.commit()
         db.refresh(tr)
+        # Notification rules run in the background consumer, off the request path
+        emit(TransactionEvent(
+            "created", user.id, tr.type, tr.amount, tr.date, tr.category_id, tr.credit_card_id, tr.id, tr.description,
+        ))
         return tr
     except HTTPException:
         raise
@@ -132,19 +129,336 @@ def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/", response_model=List[TransactionOut])
+# TransactionOut as columns, for the FAST_JSON path of the listing
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.amount,
+    Transaction.type,
+    Transaction.category_id,
+    Transaction.bank_id,
+    Transaction.vault_id,
+    Transaction.credit_card_id,
+    Transaction.installment_number,
+    Transaction.total_installments,
+    Transaction.date,
+    Transaction.description,
+    Category.name.label("category_name"),
+    Bank.name.label("bank_name"),
+    Vault.name.label("vault_name"),
+    CreditCard.name.label("credit_card_name"),
+    null().label("installment_plan_id"),
+)
+
+
+# Listing order is (date, kind, id...) descending: on the same day, transactions (kind 1)
+# come before plan installments (kind 0), which are ordered by (plan id, number)
+SortKey = Tuple[date, int, int, int]
+
+
+def _sort_key(item: Union[Transaction, PlanInstallment]) -> SortKey:
+    if isinstance(item, PlanInstallment):
+        return (item.date, 0, item.installment_plan_id, item.installment_number)
+    return (item.date, 1, item.id, 0)
+
+
+def _encode_cursor(item: Union[Transaction, PlanInstallment]) -> str:
+    day, kind, item_id, number = _sort_key(item)
+    raw = f"{day.isoformat()}:p:{item_id}:{number}" if kind == 0 else f"{day.isoformat()}:t:{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> SortKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        parts = raw.split(":")
+        if len(parts) == 2:
+            # "date:id", issued before installment plans existed
+            return date.fromisoformat(parts[0]), 1, int(parts[1]), 0
+        if len(parts) == 3 and parts[1] == "t":
+            return date.fromisoformat(parts[0]), 1, int(parts[2]), 0
+        if len(parts) == 4 and parts[1] == "p":
+            return date.fromisoformat(parts[0]), 0, int(parts[2]), int(parts[3])
+        raise ValueError(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+@router.get("/", response_model=TransactionPage, dependencies=[Depends(etag)])
 def list_transactions(
+    request: Request,
     month: Optional[int] = Query(None, ge=1, le=12),
     year: Optional[int] = Query(None, ge=1970, le=2100),
+    bank_id: Optional[int] = None,
+    vault_id: Optional[int] = None,
+    credit_card_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    type: Optional[str] = Query(None, pattern="^(income|expense)$"),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
 ):
-    q = db.query(Transaction).filter(Transaction.user_id == user.id)
+    fast = fastjson.enabled()
+    q = db.query(Transaction).filter(Transaction.user_id == user_id)
+    start = end = None
     if month and year:
-        # filter by month/year
-        from sqlalchemy import extract
-        q = q.filter(extract('month', Transaction.date) == month).filter(extract('year', Transaction.date) == year)
-    return q.order_by(Transaction.date.desc()).all()
+        start, end = month_bounds(month, year)
+        q = q.filter(in_month(Transaction.date, month, year))
+    if bank_id:
+        q = q.filter(Transaction.bank_id == bank_id)
+    if vault_id:
+        q = q.filter(Transaction.vault_id == vault_id)
+    if credit_card_id:
+        q = q.filter(Transaction.credit_card_id == credit_card_id)
+    if category_id:
+        q = q.filter(Transaction.category_id == category_id)
+    if type:
+        q = q.filter(Transaction.type == type)
+    if min_amount is not None:
+        q = q.filter(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        q = q.filter(Transaction.amount <= max_amount)
+
+    # Keyset pagination on the sort key, newest first
+    cursor_key = _decode_cursor(cursor) if cursor else None
+    if cursor_key:
+        cursor_date, cursor_kind, cursor_id, _ = cursor_key
+        if cursor_kind == 1:
+            q = q.filter(or_(
+                Transaction.date < cursor_date,
+                and_(Transaction.date == cursor_date, Transaction.id < cursor_id),
+            ))
+        else:
+            q = q.filter(Transaction.date < cursor_date)
+
+    if fast:
+        # Row tuples instead of ORM objects; related names come from outer joins
+        q = (
+            q.outerjoin(Category, Category.id == Transaction.category_id)
+            .outerjoin(Bank, Bank.id == Transaction.bank_id)
+            .outerjoin(Vault, Vault.id == Transaction.vault_id)
+            .outerjoin(CreditCard, CreditCard.id == Transaction.credit_card_id)
+            .with_entities(*TRANSACTION_COLUMNS)
+        )
+    else:
+        q = q.options(
+            joinedload(Transaction.category),
+            joinedload(Transaction.bank),
+            joinedload(Transaction.vault),
+            joinedload(Transaction.credit_card),
+        )
+    items = q.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1).all()
+
+    # Installment plans have no bank/vault; their installments are merged into the page
+    if not bank_id and not vault_id:
+        # A full page of transactions bounds how far back installments can still make the page
+        if len(items) > limit:
+            start = max(start, items[-1].date) if start else items[-1].date
+        pq = overlapping(
+            db.query(InstallmentPlan)
+            .options(joinedload(InstallmentPlan.category), joinedload(InstallmentPlan.credit_card))
+            .filter(InstallmentPlan.user_id == user_id),
+            start, end,
+        )
+        if cursor_key:
+            pq = pq.filter(InstallmentPlan.first_date <= cursor_key[0])
+        if credit_card_id:
+            pq = pq.filter(InstallmentPlan.credit_card_id == credit_card_id)
+        if category_id:
+            pq = pq.filter(InstallmentPlan.category_id == category_id)
+        if type:
+            pq = pq.filter(InstallmentPlan.type == type)
+        for plan in pq.all():
+            for inst in expand(plan, start, end):
+                if min_amount is not None and inst.amount < Decimal(str(min_amount)):
+                    continue
+                if max_amount is not None and inst.amount > Decimal(str(max_amount)):
+                    continue
+                if cursor_key and _sort_key(inst) >= cursor_key:
+                    continue
+                items.append(inst)
+        items.sort(key=_sort_key, reverse=True)
+
+    page = items[:limit]
+    next_cursor = _encode_cursor(page[-1]) if len(items) > limit else None
+    if fast:
+        fields = TransactionOut.model_fields
+        return fastjson.json_response(request, {
+            "items": [
+                {f: getattr(i, f) for f in fields} if isinstance(i, PlanInstallment) else i._asdict()
+                for i in page
+            ],
+            "next_cursor": next_cursor,
+        })
+    return TransactionPage(items=page, next_cursor=next_cursor)
+
+
+@router.get("/search", response_model=List[TransactionOut], dependencies=[Depends(etag)])
+def search_transactions(
+    q: str = Query(..., min_length=1, max_length=200),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category_id: Optional[int] = None,
+    type: Optional[str] = Query(None, pattern="^(income|expense)$"),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """Transactions and plan installments whose description matches every word of `q`, best match first.
+
+    Installments take the rank of their plan and are filtered like the listing
+    (see app/search.py).
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Informe ao menos uma palavra para buscar")
+    criteria = []
+    plan_criteria = []
+    if start:
+        criteria.append(Transaction.date >= start)
+        plan_criteria.append(InstallmentPlan.last_date >= start)
+    if end:
+        criteria.append(Transaction.date <= end)
+        plan_criteria.append(InstallmentPlan.first_date <= end)
+    if category_id:
+        criteria.append(Transaction.category_id == category_id)
+        plan_criteria.append(InstallmentPlan.category_id == category_id)
+    if type:
+        criteria.append(Transaction.type == type)
+        plan_criteria.append(InstallmentPlan.type == type)
+    if min_amount is not None:
+        criteria.append(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        criteria.append(Transaction.amount <= max_amount)
+
+    # Each side's best offset + limit matches are enough to fill the merged page;
+    # amount filters apply per installment, so a matching plan may yield none
+    wanted = offset + limit
+    tx_scores = dict(ranked(db, Transaction, user_id, terms, criteria, wanted))
+    amount_filtered = min_amount is not None or max_amount is not None
+    plan_scores = dict(ranked(db, InstallmentPlan, user_id, terms, plan_criteria, None if amount_filtered else wanted))
+
+    items: List[Tuple[float, Union[Transaction, PlanInstallment]]] = []
+    if tx_scores:
+        items += [(tx_scores[t.id], t) for t in db.query(Transaction).options(
+            joinedload(Transaction.category),
+            joinedload(Transaction.bank),
+            joinedload(Transaction.vault),
+            joinedload(Transaction.credit_card),
+        ).filter(Transaction.id.in_(tx_scores))]
+    if plan_scores:
+        plans = db.query(InstallmentPlan).options(
+            joinedload(InstallmentPlan.category), joinedload(InstallmentPlan.credit_card),
+        ).filter(InstallmentPlan.id.in_(plan_scores))
+        for plan in plans:
+            for inst in expand(plan, start, end + timedelta(days=1) if end else None):
+                if min_amount is not None and inst.amount < Decimal(str(min_amount)):
+                    continue
+                if max_amount is not None and inst.amount > Decimal(str(max_amount)):
+                    continue
+                items.append((plan_scores[plan.id], inst))
+    # Best score first; ties in listing order, newest first
+    items.sort(key=lambda item: _sort_key(item[1]), reverse=True)
+    items.sort(key=lambda item: item[0])
+    return [item for _, item in items[offset:offset + limit]]
+
+
+@router.get("/plans", response_model=List[InstallmentPlanOut], dependencies=[Depends(etag)])
+def list_installment_plans(
+    credit_card_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    q = (
+        db.query(InstallmentPlan)
+        .options(joinedload(InstallmentPlan.category), joinedload(InstallmentPlan.credit_card))
+        .filter(InstallmentPlan.user_id == user_id)
+    )
+    if credit_card_id:
+        q = q.filter(InstallmentPlan.credit_card_id == credit_card_id)
+    return q.order_by(InstallmentPlan.first_date.desc(), InstallmentPlan.id.desc()).all()
+
+
+@router.put("/plans/{id}", response_model=InstallmentPlanOut)
+def update_installment_plan(id: int, payload: InstallmentPlanUpdate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    plan = db.query(InstallmentPlan).filter(InstallmentPlan.id == id, InstallmentPlan.user_id == user.id).first()
+    if not plan:
+        raise HTTPException(status_code=404, detail="Parcelamento não encontrado")
+    if payload.category_id:
+        if not category_registry.get(db, user.id, payload.category_id):
+            raise HTTPException(status_code=404, detail="Categoria não encontrada")
+
+    # All installments change together: swap the plan's contribution to the rollups
+    record_plans(db, [plan], sign=-1)
+    invoices.invalidate(db, plan.credit_card_id, plan.first_date)
+    if payload.description is not None:
+        plan.description = payload.description
+    if payload.category_id is not None:
+        plan.category_id = payload.category_id or None
+    if payload.total_amount is not None:
+        plan.total_amount = Decimal(str(payload.total_amount))
+    record_plans(db, [plan])
+    bump_data_version(db, user.id)
+    db.commit()
+    db.refresh(plan)
+    return plan
+
+
+@router.delete("/plans/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_installment_plan(id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    plan = db.query(InstallmentPlan).filter(InstallmentPlan.id == id, InstallmentPlan.user_id == user.id).first()
+    if not plan:
+        raise HTTPException(status_code=404, detail="Parcelamento não encontrado")
+    record_plans(db, [plan], sign=-1)
+    invoices.invalidate(db, plan.credit_card_id, plan.first_date)
+    db.delete(plan)
+    bump_data_version(db, user.id)
+    db.commit()
+    return None
+
+
+@router.post("/import", response_model=ImportResult)
+def import_transactions(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ofx)$"),
+    bank_id: Optional[int] = None,
+    vault_id: Optional[int] = None,
+    credit_card_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    # Statement format from the parameter or the file extension
+    fmt = format or ("ofx" if (file.filename or "").lower().endswith(".ofx") else "csv")
+
+    vault = None
+    if credit_card_id:
+        if not db.query(CreditCard.id).filter(CreditCard.id == credit_card_id, CreditCard.user_id == user.id).first():
+            raise HTTPException(status_code=404, detail="Cartão de crédito não encontrado")
+        bank_id = vault_id = None
+    else:
+        if bank_id and not db.query(Bank.id).filter(Bank.id == bank_id, Bank.user_id == user.id).first():
+            raise HTTPException(status_code=404, detail="Banco não encontrado")
+        if vault_id:
+            vault = db.query(Vault).filter(Vault.id == vault_id, Vault.user_id == user.id).first()
+            if not vault:
+                raise HTTPException(status_code=404, detail="Cofre não encontrado")
+
+    rows = importer.iter_ofx(file.file) if fmt == "ofx" else importer.iter_csv(file.file)
+    try:
+        report = importer.import_statement(db, user.id, rows, vault=vault, bank_id=bank_id, credit_card_id=credit_card_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Não foi possível importar o arquivo: {e}")
+    return ImportResult(
+        imported=report.imported,
+        error_count=report.error_count,
+        errors=[ImportRowError(line=line, error=error) for line, error in report.errors],
+    )
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -157,11 +471,12 @@ def delete_transaction(id: int, db: Session = Depends(get_db), user: User = Depe
     if tr.vault_id:
         vault = db.query(Vault).filter(Vault.id == tr.vault_id).first()
         if vault:
-            if tr.type == "income":
-                vault.balance -= tr.amount
-            else:
-                vault.balance += tr.amount
+            adjust_vault_balance(db, vault, -tr.amount if tr.type == "income" else tr.amount)
 
+    record_transactions(db, [tr], sign=-1)
+    if tr.credit_card_id:
+        invoices.invalidate(db, tr.credit_card_id, tr.date)
     db.delete(tr)
+    bump_data_version(db, user.id)
     db.commit()
     return None
\ No newline at end of file
@@ -1,16 +1,24 @@
+from decimal import Decimal
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from ..database import get_db
-from ..auth import get_current_user
+from ..routing import DBRoute
+from ..auth import get_current_user, get_current_user_id
+from ..versioning import bump_data_version, etag
 from ..models import Vault, Bank, User
 from ..schemas import VaultCreate, VaultUpdate, VaultOut
+from ..balances import adjust_bank_balance, adjust_vault_balance, move_vault_balance
+from .. import fastjson
 
-router = APIRouter(prefix="/vaults", tags=["vaults"])
+router = APIRouter(prefix="/vaults", tags=["vaults"], route_class=DBRoute)
 
-@router.get("/", response_model=List[VaultOut])
-def list_vaults(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return db.query(Vault).filter(Vault.user_id == user.id).all()
+@router.get("/", response_model=List[VaultOut], dependencies=[Depends(etag)])
+def list_vaults(request: Request, db: Session = Depends(get_db), user_id: int = Depends(get_current_user_id)):
+    q = db.query(Vault).filter(Vault.user_id == user_id)
+    if fastjson.enabled():
+        return fastjson.json_response(request, fastjson.row_dicts(q.with_entities(*fastjson.model_columns(Vault, VaultOut))))
+    return q.all()
 
 @router.post("/", response_model=VaultOut)
 def create_vault(payload: VaultCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
@@ -27,11 +35,13 @@ def create_vault(payload: VaultCreate, db: Session = Depends(get_db), user: User
         balance=payload.initial_balance
     )
     db.add(vault)
+    adjust_bank_balance(db, payload.bank_id, Decimal(str(payload.initial_balance)))
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(vault)
     return vault
 
-@router.get("/{id}", response_model=VaultOut)
+@router.get("/{id}", response_model=VaultOut, dependencies=[Depends(etag)])
 def get_vault(id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     vault = db.query(Vault).filter(Vault.id == id, Vault.user_id == user.id).first()
     if not vault:
@@ -40,32 +50,40 @@ def get_vault(id: int, db: Session = Depends(get_db), user: User = Depends(get_c
 
 @router.put("/{id}", response_model=VaultOut)
 def update_vault(id: int, payload: VaultUpdate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    vault = db.query(Vault).filter(Vault.id == id, Vault.user_id == user.id).first()
+    # Row lock (PostgreSQL) so the balance read below is still current at commit
+    vault = db.query(Vault).filter(Vault.id == id, Vault.user_id == user.id).with_for_update().first()
     if not vault:
         raise HTTPException(status_code=404, detail="Cofre não encontrado")
     
-    if payload.name is not None:
-        vault.name = payload.name
-    if payload.balance is not None:
-        vault.balance = payload.balance
-    if payload.bank_id is not None:
+    if payload.bank_id is not None and payload.bank_id != vault.bank_id:
         # Validate new bank belongs to user
         bank = db.query(Bank).filter(Bank.id == payload.bank_id, Bank.user_id == user.id).first()
         if not bank:
             raise HTTPException(status_code=400, detail="Banco não encontrado ou não pertence ao usuário")
+    if payload.name is not None:
+        vault.name = payload.name
+
+    # Balances change by SQL deltas, like transactions do, so the bank stays the sum of its vaults
+    if payload.balance is not None:
+        adjust_vault_balance(db, vault, Decimal(str(payload.balance)) - Decimal(str(vault.balance)))
+    if payload.bank_id is not None and payload.bank_id != vault.bank_id:
+        move_vault_balance(db, vault.id, vault.bank_id, payload.bank_id)
         vault.bank_id = payload.bank_id
     
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(vault)
     return vault
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_vault(id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    vault = db.query(Vault).filter(Vault.id == id, Vault.user_id == user.id).first()
+    vault = db.query(Vault).filter(Vault.id == id, Vault.user_id == user.id).with_for_update().first()
     if not vault:
         raise HTTPException(status_code=404, detail="Cofre não encontrado")
     
+    move_vault_balance(db, vault.id, vault.bank_id, None)
     db.delete(vault)
+    bump_data_version(db, user.id)
     db.commit()
     return None
 
@@ -0,0 +1,62 @@
+"""
+Route class shared by the routers so the same endpoints run on either database stack.
+
+With DATABASE_MODE=sync (the default) it is a plain APIRoute: sync endpoints run
+in the threadpool with a Session, one thread per in-flight request.
+
+With DATABASE_MODE=async, `get_db` yields an AsyncSession and every sync endpoint
+that depends on it is turned into a coroutine that runs its body through
+`AsyncSession.run_sync`. The ORM code is unchanged, but waiting on the database
+yields to the event loop instead of holding a threadpool thread. The response
+model is validated inside the same call, so relationships loaded lazily while
+serializing still have a connection.
+"""
+import asyncio
+import functools
+import inspect
+from typing import Any, Callable, Optional
+
+from fastapi import params
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from .database import DATABASE_MODE, get_db
+
+
+def _db_param(endpoint: Callable) -> Optional[str]:
+    for name, param in inspect.signature(endpoint).parameters.items():
+        if isinstance(param.default, params.Depends) and param.default.dependency is get_db:
+            return name
+    return None
+
+
+def _run_sync_endpoint(endpoint: Callable, db_param: str, response_model: Any) -> Callable:
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        adb = kwargs[db_param]
+
+        def call(session):
+            result = endpoint(**{**kwargs, db_param: session})
+            if adapter is not None and not isinstance(result, Response):
+                result = adapter.validate_python(result, from_attributes=True)
+            return result
+
+        return await adb.run_sync(call)
+
+    return wrapper
+
+
+class DBRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        if DATABASE_MODE == "async" and not asyncio.iscoroutinefunction(endpoint):
+            db_param = _db_param(endpoint)
+            if db_param:
+                response_model = kwargs.get("response_model")
+                if isinstance(response_model, DefaultPlaceholder):
+                    response_model = None
+                endpoint = _run_sync_endpoint(endpoint, db_param, response_model)
+        super().__init__(path, endpoint, **kwargs)
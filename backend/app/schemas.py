@@ -154,7 +154,7 @@ class TransactionCreate(BaseModel):
     installments: Optional[int] = 1 # Number of installments (1 = one time)
 
 class TransactionOut(BaseModel):
-    id: int
+    id: Optional[int]  # None for installments of an installment plan
     amount: float
     type: str
     category_id: Optional[int]
@@ -165,10 +165,68 @@ class TransactionOut(BaseModel):
     total_installments: Optional[int]
     date: date
     description: Optional[str]
+    category_name: Optional[str] = None
+    bank_name: Optional[str] = None
+    vault_name: Optional[str] = None
+    credit_card_name: Optional[str] = None
+    installment_plan_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class TransactionPage(BaseModel):
+    items: List[TransactionOut]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
+
+class InvoiceOut(BaseModel):
+    cycle: str  # YYYY-MM of the closing date
+    status: str  # open, closed or future
+    start_date: date
+    closing_date: date
+    due_date: date
+    total: float
+    count: int
+
+class InvoiceList(BaseModel):
+    credit_card_id: int
+    limit: float
+    available_limit: float
+    invoices: List[InvoiceOut]  # Open invoice first, then closed ones
+
+class InvoiceDetail(InvoiceOut):
+    items: List[TransactionOut]
+
+class InstallmentPlanUpdate(BaseModel):
+    description: Optional[str] = None
+    category_id: Optional[int] = None
+    total_amount: Optional[float] = Field(None, gt=0)
+
+class InstallmentPlanOut(BaseModel):
+    id: int
+    credit_card_id: int
+    category_id: Optional[int]
+    type: str
+    total_amount: float
+    installments: int
+    first_date: date
+    last_date: date
+    description: Optional[str]
+    category_name: Optional[str] = None
+    credit_card_name: Optional[str] = None
+    created_at: datetime
 
     class Config:
         from_attributes = True
 
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    error_count: int
+    errors: List[ImportRowError]  # Per-row report (capped); nothing is imported for these rows
+
 # Recurring Transactions
 class RecurringTransactionCreate(BaseModel):
     amount: float
@@ -202,11 +260,14 @@ class RecurringTransactionOut(BaseModel):
 
 # Budgets
 class BudgetCreate(BaseModel):
-    category_id: Optional[int]
+    category_id: Optional[int] = None  # None = all expenses of the month
     month: int
     year: int
     amount: float
 
+class BudgetUpdate(BaseModel):
+    amount: float
+
 class BudgetOut(BaseModel):
     id: int
     category_id: Optional[int]
@@ -218,6 +279,27 @@ class BudgetOut(BaseModel):
     class Config:
         from_attributes = True
 
+class BudgetProgressItem(BaseModel):
+    category_id: Optional[int]  # None = budget for all expenses of the month
+    category_name: str
+    budget_id: Optional[int]  # None = spending in a category without a budget
+    planned: float
+    spent: float
+    remaining: float
+    percent: Optional[float]  # spent / planned * 100; None without a budget
+
+class BudgetProgress(BaseModel):
+    month: int
+    year: int
+    planned: float  # Sum of the category budgets (the overall budget, if any, is an item of its own)
+    spent: float  # All expenses of the month
+    items: List[BudgetProgressItem]
+
+class BudgetCopyResult(BaseModel):
+    month: int  # Month the budgets were copied into
+    year: int
+    created: int
+
 # Notifications
 class NotificationCreate(BaseModel):
     title: str
@@ -225,6 +307,7 @@ class NotificationCreate(BaseModel):
 
 class NotificationOut(BaseModel):
     id: int
+    kind: Optional[str] = None
     title: str
     message: str
     created_at: datetime
@@ -233,6 +316,23 @@ class NotificationOut(BaseModel):
     class Config:
         from_attributes = True
 
+class NotificationCount(BaseModel):
+    unread: int
+
+# Report jobs
+class ReportJobCreate(BaseModel):
+    kind: str = Field("monthly", pattern="^(monthly|range|yearly)$")
+    year: int = Field(..., ge=1970, le=2100)
+    month: Optional[int] = Field(None, ge=1, le=12)
+    end_year: Optional[int] = Field(None, ge=1970, le=2100)  # 'range' only
+    end_month: Optional[int] = Field(None, ge=1, le=12)  # 'range' only
+
+class ReportJobOut(BaseModel):
+    id: str
+    status: str
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+
 # Dashboard
 class DashboardSummary(BaseModel):
     month: int
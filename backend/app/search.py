@@ -0,0 +1,79 @@
+"""
+Full-text search over the descriptions of transactions and installment plans.
+
+Each table has its own index, created by migrations 9 and 14 and kept in sync
+by the database itself:
+
+- SQLite: FTS5 tables `transactions_fts` and `installment_plans_fts` with
+  external content (tokens only, by row id), `unicode61 remove_diacritics 2`
+  tokenizer, maintained by triggers; ranked by bm25.
+- PostgreSQL: stored generated columns `search_vector` built with the
+  `sisfinance_pt` text search configuration (Portuguese stemming over
+  `unaccent`), with GIN indexes; ranked by ts_rank_cd.
+
+Every word of the query must match the start of a word of the description,
+ignoring case and accents: "alimenta merc" finds "Alimentação - Mercado".
+
+Other databases have no index: each word must appear anywhere in the
+description (LIKE, case-insensitive, accents significant), newest first.
+"""
+import re
+from typing import List, Optional, Tuple, Type, Union
+
+from sqlalchemy import Select, column, func, literal, literal_column, select, table
+from sqlalchemy.orm import Session
+
+from .models import InstallmentPlan, Transaction
+
+SEARCH_CONFIG = "sisfinance_pt"
+
+_WORD = re.compile(r"\w+")
+
+
+def search_terms(query: str) -> List[str]:
+    return _WORD.findall(query.lower())
+
+
+# The two searchable tables, each with its own index
+Searchable = Union[Type[Transaction], Type[InstallmentPlan]]
+
+
+def search_statement(model: Searchable, dialect: str, user_id: int, terms: List[str], criteria: list, limit: Optional[int]) -> Select:
+    """Select (id, score) of `model` rows matching every term and `criteria`; lower scores rank first."""
+    name = model.__tablename__
+    newest = model.date if model is Transaction else model.first_date
+    if dialect == "sqlite":
+        fts = table(f"{name}_fts", column("rowid"))
+        index = literal_column(f"{name}_fts")
+        # Quoted terms are taken literally by FTS5; * makes each one a prefix
+        match = " ".join(f'"{term}"*' for term in terms)
+        score = func.bm25(index)
+        stmt = (
+            select(model.id, score.label("score"))
+            .join_from(fts, model, model.id == fts.c.rowid)
+            .where(index.op("MATCH")(match))
+        )
+    elif dialect == "postgresql":
+        vector = literal_column(f"{name}.search_vector")
+        query = func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), " & ".join(f"{term}:*" for term in terms))
+        score = -func.ts_rank_cd(vector, query)
+        stmt = select(model.id, score.label("score")).where(vector.op("@@")(query))
+    else:
+        description = func.lower(model.description)
+        score = None
+        stmt = select(model.id, literal(0).label("score")).where(*(
+            description.like(f"%{term.replace('_', '/_')}%", escape="/") for term in terms
+        ))
+    if score is not None:
+        stmt = stmt.order_by(score)
+    return (
+        stmt.where(model.user_id == user_id, *criteria)
+        .order_by(newest.desc(), model.id.desc())
+        .limit(limit)
+    )
+
+
+def ranked(db: Session, model: Searchable, user_id: int, terms: List[str], criteria: list, limit: Optional[int]) -> List[Tuple[int, float]]:
+    """(id, score) of the best `limit` matches (None = all) among the user's `model` rows, best first."""
+    dialect = db.get_bind().dialect.name
+    return [tuple(row) for row in db.execute(search_statement(model, dialect, user_id, terms, criteria, limit))]
@@ -0,0 +1,60 @@
+"""
+Per-user data version and conditional GETs.
+
+`users.data_version` is incremented in the same transaction as every write to
+a user's data (`bump_data_version`). GET routes that declare the `etag`
+dependency send a weak ETag built from it and answer `304 Not Modified` to a
+matching `If-None-Match` after a single primary-key lookup, before the
+endpoint's own queries run.
+
+The ETag also carries today's date, since dashboards and invoices depend on
+the current month. Responses are marked `private, no-cache`: the browser keeps
+them and revalidates on every use, so React Query refetches of unchanged data
+cost one small query and an empty 304.
+"""
+from datetime import date
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+
+from .auth import get_current_user_id
+from .database import get_db, run_db
+from .models import User
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump_data_version(db: Session, user_id: Optional[int]):
+    """Mark the user's data as changed (every user when None). Runs in the caller's transaction."""
+    q = db.query(User)
+    if user_id is not None:
+        q = q.filter(User.id == user_id)
+    q.update({User.data_version: User.data_version + 1}, synchronize_session=False)
+
+
+def _matches(if_none_match: str, tag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    opaque = tag.removeprefix("W/")
+    return any(
+        candidate == "*" or candidate.removeprefix("W/") == opaque
+        for candidate in (c.strip() for c in if_none_match.split(","))
+    )
+
+
+async def etag(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id),
+):
+    """Route dependency: ETag / If-None-Match handling for per-user GET endpoints."""
+    version = await run_db(db, lambda s: s.query(User.data_version).filter(User.id == user_id).scalar())
+    tag = f'W/"{user_id}.{version or 0}.{date.today():%Y%m%d}"'
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, tag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    # Routes that return a Response themselves (app/fastjson.py) copy them from here
+    request.state.cache_headers = headers
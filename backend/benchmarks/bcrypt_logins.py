@@ -0,0 +1,50 @@
+"""
+Microbenchmark: password verifications (logins) per second at different bcrypt costs.
+
+Runs the same verify path as /auth/login through a PasswordHashPool of the
+given size, so the numbers reflect the configured PASSWORD_HASH_WORKERS.
+
+Usage:
+    python benchmarks/bcrypt_logins.py
+    python benchmarks/bcrypt_logins.py --rounds 10 11 12 --workers 4 --logins 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passlib.context import CryptContext
+
+from app.auth import PasswordHashPool
+
+
+async def run(rounds: int, workers: int, logins: int) -> float:
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = context.hash("benchmark-password")
+    pool = PasswordHashPool(workers, logins)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(pool.run(context.verify, "benchmark-password", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt logins/s per work factor")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[8, 10, 11, 12, 13])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PASSWORD_HASH_WORKERS", "4")))
+    parser.add_argument("--logins", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"workers={args.workers} logins={args.logins}")
+    print(f"{'rounds':>6} | {'logins/s':>10} | {'ms/login':>9}")
+    for rounds in args.rounds:
+        rate = asyncio.run(run(rounds, args.workers, args.logins))
+        print(f"{rounds:>6} | {rate:>10.1f} | {1000 * args.workers / rate:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
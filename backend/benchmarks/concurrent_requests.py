@@ -0,0 +1,72 @@
+"""
+Load benchmark: authenticated GET throughput at a given concurrency against a running API.
+
+Needs httpx (`pip install httpx`). Start the server in the mode to measure, then
+point the benchmark at it:
+
+    DATABASE_MODE=sync  uvicorn app.main:app --port 8000
+    DATABASE_MODE=async uvicorn app.main:app --port 8000
+
+Usage:
+    python benchmarks/concurrent_requests.py --email a@b.com --password secret
+    python benchmarks/concurrent_requests.py --concurrency 50 200 --requests 2000 --path /dashboard/summary?month=3&year=2026
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def run(client: httpx.AsyncClient, path: str, headers: dict, concurrency: int, requests: int):
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                r = await client.get(path, headers=headers)
+                if r.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1], errors
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        r = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        print(f"{args.url}{args.path} requests={args.requests}")
+        print(f"{'conc':>5} | {'req/s':>8} | {'p50 ms':>7} | {'p99 ms':>7} | {'errors':>6}")
+        for concurrency in args.concurrency:
+            rate, p50, p99, errors = await run(client, args.path, headers, concurrency, args.requests)
+            print(f"{concurrency:>5} | {rate:>8.1f} | {p50 * 1000:>7.1f} | {p99 * 1000:>7.1f} | {errors:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Authenticated GET throughput per concurrency level")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/transactions/?limit=50")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 40, 100, 200])
+    parser.add_argument("--requests", type=int, default=1000)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Deterministic synthetic dataset for benchmarks and query budgets.
+
+Each user gets banks with vaults, credit cards, their own categories next to
+the system ones, recurring entries, installment plans, monthly budgets and a
+spread of transactions over the last `months` months. Rollups and bank balances are
+written the same way the API writes them, so every endpoint sees a consistent
+database.
+
+    from dataset import seed
+    emails = seed(SessionLocal(), users=1, months=12, transactions_per_month=120)
+
+or from the command line, into the database in DATABASE_URL:
+
+    python benchmarks/dataset.py --users 5 --months 36 --transactions 150
+
+The same arguments always produce the same data. All generated users share the
+password `PASSWORD`.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+load_dotenv()
+
+from app.auth import get_password_hash
+from app.balances import sync_bank_balances
+from app.installments import new_plan, record_plans
+from app.models import Bank, Budget, Category, CreditCard, RecurringTransaction, Transaction, User, Vault
+from app.periods import month_bounds
+from app.rollups import record_transactions
+
+PASSWORD = "benchmark-password"
+
+EXPENSE_CATEGORIES = ["Lazer", "Saúde", "Educação", "Mercado", "Assinaturas", "Viagem", "Pets"]
+INCOME_CATEGORIES = ["Freelance", "Reembolsos"]
+DESCRIPTIONS = ["Padaria", "Uber", "Farmácia", "Supermercado", "Restaurante", "Cinema", "Posto", "Livraria"]
+
+
+def _month_start(today: date, back: int) -> date:
+    index = today.year * 12 + today.month - 1 - back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _amount(rng: random.Random, low: float, high: float) -> Decimal:
+    return Decimal(str(round(rng.uniform(low, high), 2)))
+
+
+def seed(db: Session, users: int = 1, months: int = 12, transactions_per_month: int = 120,
+         rng_seed: int = 42, today: date = None, email_prefix: str = "bench") -> List[str]:
+    """Create `users` users with their data and return their emails ({email_prefix}{n}@example.com)."""
+    rng = random.Random(rng_seed)
+    today = today or date.today()
+    hashed = get_password_hash(PASSWORD)
+    system = db.query(Category).filter(Category.is_system == True).all()
+    emails = []
+
+    for n in range(users):
+        user = User(email=f"{email_prefix}{n}@example.com", hashed_password=hashed, full_name=f"Bench {n}",
+                    monthly_salary=Decimal("8500.00"))
+        db.add(user)
+        db.flush()
+        emails.append(user.email)
+
+        categories = list(system)
+        for name in EXPENSE_CATEGORIES:
+            categories.append(Category(user_id=user.id, name=name, type="expense"))
+        for name in INCOME_CATEGORIES:
+            categories.append(Category(user_id=user.id, name=name, type="income"))
+        db.add_all(c for c in categories if c.id is None)
+
+        banks = [Bank(user_id=user.id, name=name, initial_balance=0, current_balance=0)
+                 for name in ("Nubank", "Itaú", "Inter")]
+        db.add_all(banks)
+        db.flush()
+        vaults = [Vault(user_id=user.id, bank_id=bank.id, name=f"{bank.name} {kind}", balance=Decimal("0"))
+                  for bank in banks for kind in ("Conta", "Reserva")]
+        cards = [CreditCard(user_id=user.id, name=name, limit=Decimal("6000.00"), closing_day=closing, due_day=due)
+                 for name, closing, due in (("Visa", 3, 10), ("Master", 25, 5))]
+        db.add_all(vaults + cards)
+        db.flush()
+
+        expense = [c for c in categories if c.type == "expense"]
+        income = [c for c in categories if c.type == "income"]
+
+        db.add_all([
+            RecurringTransaction(user_id=user.id, category_id=income[0].id, bank_id=banks[0].id,
+                                 amount=Decimal("8500.00"), type="income", day_of_month=5, description="Salário"),
+            RecurringTransaction(user_id=user.id, category_id=expense[0].id, bank_id=banks[0].id,
+                                 amount=Decimal("1800.00"), type="expense", day_of_month=10, description="Aluguel"),
+            RecurringTransaction(user_id=user.id, category_id=expense[-1].id, credit_card_id=cards[0].id,
+                                 amount=Decimal("39.90"), type="expense", day_of_month=15, description="Streaming"),
+        ])
+
+        transactions = []
+        balances = {vault.id: Decimal("0") for vault in vaults}
+        for back in range(months - 1, -1, -1):
+            first_day = _month_start(today, back)
+            start, end = month_bounds(first_day.month, first_day.year)
+            days = (min(end, today) - start).days if back == 0 else (end - start).days
+            if days <= 0:
+                continue
+            db.add_all(
+                [Budget(user_id=user.id, category_id=c.id, month=start.month, year=start.year, amount=Decimal("900.00"))
+                 for c in expense]
+                + [Budget(user_id=user.id, category_id=None, month=start.month, year=start.year, amount=Decimal("7000.00"))]
+            )
+            salary = Transaction(user_id=user.id, amount=Decimal("8500.00"), type="income",
+                                 category_id=income[0].id, bank_id=banks[0].id, vault_id=vaults[0].id,
+                                 date=start.replace(day=5) if days > 4 else start, description="Salário")
+            transactions.append(salary)
+            balances[vaults[0].id] += salary.amount
+            for _ in range(transactions_per_month - 1):
+                day = date.fromordinal(start.toordinal() + rng.randrange(days))
+                if rng.random() < 0.4:
+                    card = rng.choice(cards)
+                    transactions.append(Transaction(
+                        user_id=user.id, amount=_amount(rng, 10, 400), type="expense",
+                        category_id=rng.choice(expense).id, credit_card_id=card.id,
+                        installment_number=1, total_installments=1, date=day,
+                        description=rng.choice(DESCRIPTIONS),
+                    ))
+                    continue
+                vault = rng.choice(vaults)
+                type_ = "income" if rng.random() < 0.08 else "expense"
+                tx = Transaction(
+                    user_id=user.id, amount=_amount(rng, 5, 300), type=type_,
+                    category_id=rng.choice(income if type_ == "income" else expense).id,
+                    bank_id=vault.bank_id, vault_id=vault.id, date=day,
+                    description=rng.choice(DESCRIPTIONS),
+                )
+                transactions.append(tx)
+                balances[vault.id] += tx.amount if type_ == "income" else -tx.amount
+            if rng.random() < 0.5:
+                first = date.fromordinal(start.toordinal() + rng.randrange(days))
+                plan = new_plan(user.id, rng.choice(cards).id, rng.choice(expense).id, "expense",
+                                _amount(rng, 300, 3000), rng.choice((3, 6, 10, 12)), first,
+                                rng.choice(("Notebook", "Geladeira", "Passagens", "Celular")))
+                db.add(plan)
+                record_plans(db, [plan])
+
+        db.add_all(transactions)
+        record_transactions(db, transactions)
+        for vault in vaults:
+            vault.balance = balances[vault.id]
+        db.commit()
+
+    sync_bank_balances(db)
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset in DATABASE_URL")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--transactions", type=int, default=120, help="Transactions per month per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--email-prefix", default="bench")
+    args = parser.parse_args()
+
+    from app.database import SessionLocal
+    from app.migrations import pending_migrations
+
+    if pending_migrations():
+        sys.exit("Database schema is not up to date: run `python migrate.py` first")
+    db = SessionLocal()
+    try:
+        if db.query(User).filter(User.email.like(f"{args.email_prefix}%@example.com")).first():
+            sys.exit(f"Users {args.email_prefix}N@example.com already exist; use another --email-prefix")
+        emails = seed(db, args.users, args.months, args.transactions, args.seed, email_prefix=args.email_prefix)
+    finally:
+        db.close()
+    print(f"{len(emails)} users created ({emails[0]} ... {emails[-1]}), password: {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Search benchmark: GET /transactions/search latency over a large table.
+
+Fills a temporary SQLite database (or a scratch PostgreSQL one with
+`--database-url`: its tables are dropped) with `--rows` transactions spread over
+`--users` users, descriptions drawn from a small Portuguese vocabulary, builds
+the search index through the migrations, and times a few queries through the
+app for the first user, with and without filters.
+
+Usage:
+    python benchmarks/search.py
+    python benchmarks/search.py --rows 1000000 --users 100
+"""
+import argparse
+import atexit
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = [
+    "Mercado", "Supermercado", "Padaria", "Farmácia", "Drogaria", "Posto", "Combustível", "Aluguel",
+    "Condomínio", "Energia", "Água", "Internet", "Telefone", "Restaurante", "Lanchonete", "Cinema",
+    "Academia", "Escola", "Faculdade", "Livraria", "Uber", "Ônibus", "Metrô", "Estacionamento",
+    "Pedágio", "Salário", "Freelance", "Dividendos", "Reembolso", "Presente", "Viagem", "Hotel",
+    "Passagem", "Seguro", "Médico", "Dentista", "Pet", "Açougue", "Feira", "Hortifruti",
+    "São", "João", "Paulo", "Extra", "Pão", "Açúcar", "Carrefour", "Atacadão", "Magazine", "Americanas",
+]
+
+QUERIES = [
+    ("one word", {"q": "mercado"}),
+    ("accents", {"q": "farmacia sao joao"}),
+    ("prefix", {"q": "combust"}),
+    ("rare", {"q": "dentista hotel"}),
+    ("date range", {"q": "mercado", "start": "{start}", "end": "{end}"}),
+    ("amount", {"q": "padaria", "min_amount": 50, "max_amount": 150}),
+    ("category", {"q": "posto", "category_id": "{category}"}),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Full-text search latency")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="Default: a temporary SQLite file")
+    return parser.parse_args()
+
+
+def fill(engine, rows: int, users: int, rng: random.Random) -> int:
+    """Bulk insert users and transactions; returns the first user's id."""
+    from sqlalchemy import insert
+
+    from app.auth import get_password_hash
+    from app.models import Category, Transaction, User
+
+    with engine.begin() as conn:
+        password = get_password_hash("benchmark-password")
+        conn.execute(insert(User), [
+            {"email": f"search{i}@example.com", "hashed_password": password, "full_name": f"Search {i}"}
+            for i in range(users)
+        ])
+        user_ids = [row.id for row in conn.execute(User.__table__.select().order_by(User.id))]
+        category_ids = [row.id for row in conn.execute(Category.__table__.select())]
+
+    today = date.today()
+    batch = []
+    for n in range(rows):
+        batch.append({
+            "user_id": user_ids[n % users],
+            "amount": round(rng.uniform(1, 500), 2),
+            "type": "expense",
+            "category_id": rng.choice(category_ids),
+            "date": today - timedelta(days=rng.randrange(5 * 365)),
+            "description": " ".join(rng.sample(WORDS, rng.randint(1, 4))),
+        })
+        if len(batch) == 50_000 or n == rows - 1:
+            with engine.begin() as conn:
+                conn.execute(insert(Transaction), batch)
+            batch.clear()
+            print(f"  {n + 1}/{rows} transactions", end="\r")
+    print()
+    return user_ids[0]
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="sysfinance-search-")
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'search.db')}"
+    os.environ["DATABASE_MODE"] = "sync"
+    os.environ["RECURRING_SCHEDULER_ENABLED"] = "0"
+    os.environ["METRICS_ENABLED"] = "0"
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+    from fastapi.testclient import TestClient
+
+    from app import migrations
+    from app.database import Base, engine
+    from app.main import app
+
+    Base.metadata.drop_all(bind=engine)
+    migrations.schema_migrations.drop(engine, checkfirst=True)
+    migrations.upgrade(engine, log=lambda message: None)
+
+    started = time.perf_counter()
+    fill(engine, args.rows, args.users, random.Random(42))
+    print(f"Inserted {args.rows} transactions for {args.users} users in {time.perf_counter() - started:.1f} s "
+          f"(index kept in sync on insert)")
+
+    client = TestClient(app)
+    r = client.post("/auth/login", json={"email": "search0@example.com", "password": "benchmark-password"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    today = date.today()
+    values = dict(start=(today - timedelta(days=90)).isoformat(), end=today.isoformat(),
+                  category=client.get("/categories/", headers=headers).json()[0]["id"])
+
+    print(f"\n{'query':<12} | {'results':>7} | {'first':>8} | {'median':>8} | {'p95':>8}  (ms)")
+    for label, params in QUERIES:
+        params = {k: v.format(**values) if isinstance(v, str) else v for k, v in params.items()}
+        timings = []
+        for _ in range(args.iterations + 1):
+            started = time.perf_counter()
+            r = client.get("/transactions/search", params=params, headers=headers)
+            timings.append((time.perf_counter() - started) * 1000)
+            r.raise_for_status()
+        first, timings = timings[0], sorted(timings[1:])
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{label:<12} | {len(r.json()):>7} | {first:>8.1f} | {statistics.median(timings):>8.1f} | {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Serialization benchmark: the default pydantic path against the FAST_JSON path
+(column tuples + orjson, see app/fastjson.py).
+
+Two measurements on an in-memory SQLite database seeded with `dataset.seed`:
+
+- rows: query + validation + JSON encoding of `--rows` transactions, the work
+  behind one listing response, outside HTTP;
+- endpoints: the list routes through the app (TestClient) with FAST_JSON off
+  and on. Every endpoint's JSON is compared between the two paths first.
+
+Usage:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --rows 10000 --iterations 10
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DATABASE_MODE"] = "sync"
+os.environ["RECURRING_SCHEDULER_ENABLED"] = "0"
+os.environ["METRICS_ENABLED"] = "0"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from typing import List
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy.orm import joinedload
+
+from app import fastjson, migrations
+from app.database import SessionLocal
+from app.main import app
+from app.models import Bank, Category, CreditCard, Transaction, Vault
+from app.routers.transactions import TRANSACTION_COLUMNS
+from app.schemas import TransactionOut
+
+from dataset import PASSWORD, seed
+
+ENDPOINTS = [
+    "/transactions/?limit=500",
+    "/vaults/",
+    "/recurring/",
+    "/dashboard/recurring",
+    "/dashboard/evolution?months=24",
+]
+
+
+def timed(fn, iterations: int) -> float:
+    """Median wall time of `fn` in ms."""
+    fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def pydantic_path(db, user_id: int, rows: int) -> bytes:
+    # What FastAPI does for response_model=List[TransactionOut]: validate, dump to JSON types, json.dumps
+    items = (
+        db.query(Transaction)
+        .options(joinedload(Transaction.category), joinedload(Transaction.bank),
+                 joinedload(Transaction.vault), joinedload(Transaction.credit_card))
+        .filter(Transaction.user_id == user_id)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(rows)
+        .all()
+    )
+    adapter = TypeAdapter(List[TransactionOut])
+    content = adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+    db.expunge_all()
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(db, user_id: int, rows: int) -> bytes:
+    q = (
+        db.query(Transaction)
+        .filter(Transaction.user_id == user_id)
+        .outerjoin(Category, Category.id == Transaction.category_id)
+        .outerjoin(Bank, Bank.id == Transaction.bank_id)
+        .outerjoin(Vault, Vault.id == Transaction.vault_id)
+        .outerjoin(CreditCard, CreditCard.id == Transaction.credit_card_id)
+        .with_entities(*TRANSACTION_COLUMNS)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(rows)
+    )
+    return fastjson.dumps(fastjson.row_dicts(q))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pydantic vs FAST_JSON serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+    if fastjson.orjson is None:
+        sys.exit("orjson is not installed (pip install orjson)")
+
+    per_month = 120
+    migrations.upgrade(log=lambda message: None)
+    db = SessionLocal()
+    try:
+        email = seed(db, users=1, months=math.ceil(args.rows / per_month) + 1, transactions_per_month=per_month)[0]
+        user_id = db.query(Transaction.user_id).first()[0]
+
+        slow, fast = pydantic_path(db, user_id, args.rows), fast_path(db, user_id, args.rows)
+        if json.loads(slow) != json.loads(fast):
+            sys.exit("FAST_JSON output differs from the response model output")
+        rows = len(json.loads(fast))
+        slow_ms = timed(lambda: pydantic_path(db, user_id, args.rows), args.iterations)
+        fast_ms = timed(lambda: fast_path(db, user_id, args.rows), args.iterations)
+    finally:
+        db.close()
+
+    print(f"{rows} transactions, {len(slow) / 1024:.0f} KiB of JSON")
+    print(f"{'path':<10} | {'median ms':>9}")
+    print(f"{'pydantic':<10} | {slow_ms:>9.1f}")
+    print(f"{'fast':<10} | {fast_ms:>9.1f}   x{slow_ms / fast_ms:.1f}")
+
+    client = TestClient(app)
+    r = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    print(f"\n{'endpoint':<32} | {'pydantic':>9} | {'fast':>9} | speedup")
+    for path in ENDPOINTS:
+        results = {}
+        for enabled in (False, True):
+            fastjson.FAST_JSON = enabled
+            body = client.get(path, headers=headers).json()
+            results[enabled] = (body, timed(lambda: client.get(path, headers=headers), args.iterations))
+        if results[False][0] != results[True][0]:
+            sys.exit(f"{path}: FAST_JSON output differs from the response model output")
+        slow_ms, fast_ms = results[False][1], results[True][1]
+        print(f"{path:<32} | {slow_ms:>9.2f} | {fast_ms:>9.2f} | x{slow_ms / fast_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
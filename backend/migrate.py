@@ -0,0 +1,44 @@
+"""
+Apply the versioned schema migrations (app/migrations.py) to DATABASE_URL and
+seed the system categories. Run it before starting the API after an update.
+
+Usage:
+    python migrate.py                   # apply all pending migrations
+    python migrate.py --status          # list applied and pending migrations
+    python migrate.py --to 5            # stop after migration 5
+    python migrate.py --chunk-size 1000 # rows per transaction when copying tables
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import engine
+from app.migrations import MIGRATION_CHUNK_SIZE, MIGRATIONS, applied_versions, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    parser.add_argument("--to", type=int, default=None, help="Last migration version to apply")
+    parser.add_argument("--chunk-size", type=int, default=MIGRATION_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.status:
+        with engine.connect() as conn:
+            applied = set(applied_versions(conn))
+        for migration in MIGRATIONS:
+            print(f"{'applied' if migration.version in applied else 'pending':>8}  {migration.version:>3}  {migration.name}")
+        return
+
+    try:
+        done = upgrade(engine, target=args.to, chunk_size=args.chunk_size)
+    except Exception as e:
+        sys.exit(f"Migration failed: {e}")
+    print(f"{len(done)} migration(s) applied" if done else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
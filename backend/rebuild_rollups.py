@@ -0,0 +1,40 @@
+"""
+Regenerate the monthly_rollups table from raw transactions and resync
+bank balances from their vaults.
+
+Usage:
+    python rebuild_rollups.py            # all users
+    python rebuild_rollups.py --user 3   # a single user
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import SessionLocal
+from app.balances import sync_bank_balances
+from app.rollups import rebuild_rollups
+from app.versioning import bump_data_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild monthly rollups from transactions")
+    parser.add_argument("--user", type=int, default=None, help="Only rebuild this user id")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_rollups(db, user_id=args.user)
+        print(f"Rollups rebuilt: {rows} rows written")
+        banks = sync_bank_balances(db, user_id=args.user)
+        print(f"Bank balances synced: {banks} banks")
+        # Cached GET responses (ETags) must not outlive the rebuilt data
+        bump_data_version(db, args.user)
+        db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
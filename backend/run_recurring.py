@@ -0,0 +1,32 @@
+"""
+Generate pending recurring transactions for all users (backfilling missed months).
+
+Usage:
+    python run_recurring.py
+    python run_recurring.py --date 2026-03-31 --batch-size 200
+"""
+import argparse
+from datetime import date
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.recurring_engine import RECURRING_BATCH_SIZE, run_recurring
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the recurring transactions engine once")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Generate up to this date's month (default: today)")
+    parser.add_argument("--batch-size", type=int, default=RECURRING_BATCH_SIZE)
+    args = parser.parse_args()
+
+    stats = run_recurring(today=args.date, batch_size=args.batch_size)
+    print(
+        f"Recurring engine: {stats.recurring_processed} recurring entries in {stats.batches} batches, "
+        f"{stats.transactions_created} transactions created"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Test setup: every test gets a fresh SQLite file database, built by the
+migrations like a real one, and the in-process caches are emptied.
+
+    cd backend && python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_workdir = tempfile.mkdtemp(prefix="sysfinance-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ["DATABASE_MODE"] = "sync"
+os.environ["RECURRING_SCHEDULER_ENABLED"] = "0"
+os.environ["NOTIFICATIONS_ENABLED"] = "0"
+os.environ["METRICS_ENABLED"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["REPORTS_DIR"] = os.path.join(_workdir, "reports")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import migrations
+from app.auth import user_cache
+from app.category_registry import category_registry
+from app.database import Base, SessionLocal, engine
+from app.main import app
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture(autouse=True)
+def database():
+    Base.metadata.drop_all(bind=engine)
+    migrations.schema_migrations.drop(engine, checkfirst=True)
+    migrations.upgrade(engine, log=lambda message: None)
+    category_registry.clear()
+    user_cache.clear()
+    yield engine
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def login(client):
+    """login(email) -> auth headers of a newly registered user."""
+    def _login(email: str = "user@example.com"):
+        client.post("/auth/register", json={"email": email, "password": PASSWORD, "full_name": "Test"})
+        r = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        assert r.status_code == 200, r.text
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+    return _login
+
+
+@pytest.fixture
+def count_statements():
+    """with count_statements() as statements: SQL statements run on the engine inside the block."""
+    @contextmanager
+    def _count():
+        statements = []
+
+        def before(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before)
+    return _count
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import auth
+from app.models import User
+
+
+def _token(headers) -> str:
+    return headers["Authorization"].split(" ", 1)[1]
+
+
+def _user_lookups(statements):
+    return [s for s in statements if "FROM users" in s]
+
+
+def test_token_carries_the_user_id(client, login, db, count_statements):
+    headers = login()
+    payload = jwt.decode(_token(headers), auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    assert payload["uid"] == db.query(User.id).filter(User.email == "user@example.com").scalar()
+
+    # Id-only routes read the id from the token and never load the user
+    with count_statements() as statements:
+        assert client.get("/budgets/", headers=headers).status_code == 200
+    assert not [s for s in _user_lookups(statements) if "users.email" in s]
+
+
+def test_resolved_user_is_cached_until_the_profile_changes(client, login, count_statements):
+    headers = login()
+    with count_statements() as first:
+        assert client.get("/auth/me", headers=headers).json()["full_name"] == "Test"
+    with count_statements() as second:
+        client.get("/auth/me", headers=headers)
+    assert _user_lookups(first) and not _user_lookups(second)
+
+    r = client.put("/auth/profile", json={"full_name": "Renamed"}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert client.get("/auth/me", headers=headers).json()["full_name"] == "Renamed"
+
+
+def test_tokens_without_user_id_still_work(client, login):
+    login()
+    legacy = {"Authorization": f"Bearer {auth.create_access_token('user@example.com')}"}
+    assert client.get("/budgets/", headers=legacy).status_code == 200
+    assert client.get("/auth/me", headers=legacy).json()["email"] == "user@example.com"
+
+    unknown = {"Authorization": f"Bearer {auth.create_access_token('nobody@example.com')}"}
+    assert client.get("/budgets/", headers=unknown).status_code == 401
+
+
+def test_cache_expires_and_evicts(monkeypatch):
+    cache = auth.UserCache(max_size=2, ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr(auth.time, "monotonic", lambda: clock[0])
+    for email in ("a", "b", "c"):
+        cache.put(email, User(email=email))
+    assert cache.get("a") is None and cache.get("b").email == "b"
+
+    clock[0] += 61
+    assert cache.get("b") is None
+    cache.put("d", User(email="d"))
+    cache.invalidate("d")
+    assert cache.get("d") is None
+
+
+def test_cancelled_hash_keeps_its_slot_until_the_job_ends():
+    pool = auth.PasswordHashPool(workers=1, max_pending=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    async def scenario():
+        request = asyncio.ensure_future(pool.run(slow_hash))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        request.cancel()  # client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+        # The bcrypt job is still running: no room for another one
+        with pytest.raises(HTTPException) as busy:
+            await pool.run(lambda: "other")
+        assert busy.value.status_code == 503
+
+        release.set()
+        for _ in range(100):
+            try:
+                return await pool.run(lambda: "other")
+            except HTTPException:
+                await asyncio.sleep(0.01)
+
+    assert asyncio.run(scenario()) == "other"
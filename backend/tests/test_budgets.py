@@ -0,0 +1,74 @@
+import pytest
+
+
+@pytest.fixture
+def headers(login):
+    return login()
+
+
+def _post(client, headers, path, payload):
+    r = client.post(path, json=payload, headers=headers)
+    assert r.status_code in (200, 201), r.text
+    return r.json()
+
+
+def _expense(client, headers, amount, day, **extra):
+    return _post(client, headers, "/transactions/", {"amount": amount, "type": "expense", "date": day, **extra})
+
+
+def _progress(client, headers, month=4, year=2026):
+    r = client.get(f"/budgets/progress?month={month}&year={year}", headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    return body, {(i["category_id"], i["budget_id"] is not None): i for i in body["items"]}
+
+
+def test_progress_follows_transaction_writes(client, headers):
+    food = _post(client, headers, "/categories/", {"name": "Mercado", "type": "expense"})["id"]
+    fun = _post(client, headers, "/categories/", {"name": "Lazer", "type": "expense"})["id"]
+    card = _post(client, headers, "/credit-cards/", {"name": "Nu", "limit": 5000, "closing_day": 5, "due_day": 12})
+    _post(client, headers, "/budgets/", {"category_id": food, "month": 4, "year": 2026, "amount": 500})
+    _post(client, headers, "/budgets/", {"month": 4, "year": 2026, "amount": 1000})
+
+    groceries = _expense(client, headers, 200, "2026-04-03", category_id=food)
+    _expense(client, headers, 150, "2026-04-20", category_id=food)
+    _expense(client, headers, 80, "2026-04-10", category_id=fun)
+    _expense(client, headers, 40, "2026-04-11")
+    _expense(client, headers, 999, "2026-05-01", category_id=food)
+    _post(client, headers, "/transactions/", {"amount": 5000, "type": "income", "date": "2026-04-05"})
+    # 3 x 100: only the April installment counts
+    _expense(client, headers, 300, "2026-04-15", category_id=fun, credit_card_id=card["id"], installments=3)
+
+    body, items = _progress(client, headers)
+    assert (body["planned"], body["spent"]) == (500, 570)
+    assert (items[food, True]["spent"], items[food, True]["remaining"], items[food, True]["percent"]) == (350, 150, 70)
+    assert items[None, True]["category_name"] == "Total" and items[None, True]["spent"] == 570
+    assert (items[fun, False]["spent"], items[fun, False]["planned"]) == (180, 0)
+    assert items[None, False]["category_name"] == "Sem categoria" and items[None, False]["spent"] == 40
+
+    # Creating and deleting transactions updates the rollups the progress reads
+    client.delete(f"/transactions/{groceries['id']}", headers=headers)
+    _expense(client, headers, 250, "2026-04-25", category_id=fun)
+    body, items = _progress(client, headers)
+    assert (items[food, True]["spent"], items[fun, False]["spent"], body["spent"]) == (150, 430, 620)
+    assert _progress(client, headers, month=5)[0]["spent"] == 1099
+
+
+def test_copy_forward_skips_existing_budgets_and_is_idempotent(client, headers, login):
+    food = _post(client, headers, "/categories/", {"name": "Mercado", "type": "expense"})["id"]
+    fun = _post(client, headers, "/categories/", {"name": "Lazer", "type": "expense"})["id"]
+    _post(client, headers, "/budgets/", {"category_id": food, "month": 12, "year": 2025, "amount": 500})
+    _post(client, headers, "/budgets/", {"category_id": fun, "month": 12, "year": 2025, "amount": 200})
+    _post(client, headers, "/budgets/", {"month": 12, "year": 2025, "amount": 900})
+    _post(client, headers, "/budgets/", {"category_id": fun, "month": 1, "year": 2026, "amount": 250})
+    other = login("other@example.com")
+    _post(client, other, "/budgets/", {"month": 12, "year": 2025, "amount": 100})
+
+    copied = _post(client, headers, "/budgets/copy-forward?month=12&year=2025", {})
+    assert copied == {"month": 1, "year": 2026, "created": 2}
+    january = client.get("/budgets/?month=1&year=2026", headers=headers).json()
+    assert {(b["category_id"], b["amount"]) for b in january} == {(None, 900), (food, 500), (fun, 250)}
+
+    assert _post(client, headers, "/budgets/copy-forward?month=12&year=2025", {})["created"] == 0
+    assert len(client.get("/budgets/?month=1&year=2026", headers=headers).json()) == 3
+    assert client.get("/budgets/?month=1&year=2026", headers=other).json() == []
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import database, metrics
+from app.database import PoolStats, TimedQueuePool, engine
+
+
+def test_sqlite_connections_get_the_pragma_profile():
+    engine.dispose()
+    with engine.connect() as conn:
+        pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 5000
+        assert pragma("cache_size") == -20000
+
+
+def test_pool_records_checkout_waits_and_timeouts(tmp_path):
+    class Pool(TimedQueuePool):
+        stats = PoolStats()
+
+    small = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=Pool, pool_size=1, max_overflow=0,
+                          pool_timeout=0.2, connect_args={"check_same_thread": False})
+    held = small.connect()
+    released = threading.Timer(0.05, held.close)
+    released.start()
+    with small.connect():
+        pass  # waited for the held connection
+    released.join()
+
+    held = small.connect()
+    with pytest.raises(exc.TimeoutError):
+        small.connect()
+    held.close()
+
+    stats = Pool.stats.snapshot()
+    assert (stats["checkouts"], stats["timeouts"]) == (3, 1)
+    assert stats["wait_max_ms"] >= 150
+    assert sum(stats["wait_buckets_ms"].values()) == 4
+    small.dispose()
+
+
+def test_health_reports_the_pool_only_with_metrics_enabled(client, monkeypatch):
+    assert set(client.get("/health/db").json()) == {"status", "mode", "ping_ms"}
+
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    with database.SessionLocal() as session:
+        session.execute(text("SELECT 1"))
+        body = client.get("/health/db").json()
+    assert body["status"] == "ok" and body["mode"] == "sync"
+    pool = body["pools"]["sync"]
+    assert pool["class"] == "TimedQueuePool"
+    assert pool["size"] == database.DB_POOL_SIZE
+    assert pool["checked_out"] >= 1 and pool["checkouts"] >= 1
+
+
+def test_metrics_token_protects_the_operational_routes(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert client.get("/health/db").status_code == 401
+    assert client.get("/health/db", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/health/db", headers={"Authorization": "Bearer s3cret"}).status_code == 200
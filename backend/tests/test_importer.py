@@ -0,0 +1,60 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+from app.importer import parse_amount
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("1234.56", "1234.56"),
+    ("1234,56", "1234.56"),
+    ("1,234.56", "1234.56"),
+    ("1.234,56", "1234.56"),
+    ("R$ 1.234.567,89", "1234567.89"),
+    ("1,234,567.89", "1234567.89"),
+    ("1.234.567", "1234567"),
+    ("-45,90", "-45.90"),
+    ("+12.5", "12.5"),
+    ("0.500", "0.500"),
+    ("300", "300"),
+])
+def test_parse_amount(raw, expected):
+    assert parse_amount(raw) == Decimal(expected)
+
+
+@pytest.mark.parametrize("raw", [
+    "NaN", "Infinity", "-inf", "sNaN", "1e3", "", "abc", "12.", "1..2", "1,23,456.00", "1.234,56.78", "12,34.5,6",
+])
+def test_parse_amount_rejects_invalid(raw):
+    with pytest.raises(ValueError, match="Valor inválido"):
+        parse_amount(raw)
+
+
+@pytest.mark.parametrize("raw", ["1.234", "1,234", "-12,500"])
+def test_parse_amount_rejects_ambiguous(raw):
+    with pytest.raises(ValueError, match="ambíguo"):
+        parse_amount(raw)
+
+
+def test_bad_amounts_fail_only_their_row(client, login):
+    headers = login()
+    csv = "\n".join([
+        "date,amount,description",
+        "2026-04-01,\"-1,234.56\",Notebook",
+        "2026-04-02,NaN,Broken",
+        "2026-04-03,Infinity,Broken",
+        "2026-04-04,\"1.234\",Ambiguous",
+        "2026-04-05,\"-50,00\",Padaria",
+    ])
+    r = client.post("/transactions/import", files={"file": ("extrato.csv", io.BytesIO(csv.encode()), "text/csv")},
+                    headers=headers)
+    assert r.status_code == 200, r.text
+    result = r.json()
+    assert result["imported"] == 2
+    assert [e["line"] for e in result["errors"]] == [3, 4, 5]
+    assert result["errors"][0]["error"] == "Valor inválido: NaN"
+    assert result["errors"][2]["error"] == "Valor ambíguo (separador de milhar ou decimal?): 1.234"
+
+    amounts = sorted(t["amount"] for t in client.get("/transactions/?month=4&year=2026", headers=headers).json()["items"])
+    assert amounts == [50.0, 1234.56]
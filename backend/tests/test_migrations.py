@@ -0,0 +1,67 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import delete
+
+from app import migrations
+from app.installments import new_plan
+from app.models import CreditCard, MonthlyRollup, RecurringTransaction, Transaction, User
+
+
+def test_upgrade_is_idempotent(database):
+    assert migrations.pending_migrations(database) == []
+    migrations.upgrade(database, log=lambda message: None)
+    assert migrations.pending_migrations(database) == []
+
+
+def test_rollups_are_filled_for_data_written_before_them(database, db, client, login):
+    """A database upgraded from before the rollups gets them from its transactions and plans."""
+    headers = login("legacy@example.com")
+    user = db.query(User).filter(User.email == "legacy@example.com").one()
+    card = CreditCard(user_id=user.id, name="Visa", limit=Decimal("5000"), closing_day=1, due_day=10)
+    db.add(card)
+    db.flush()
+    # Rows as an older version wrote them: no rollups
+    db.add_all([
+        Transaction(user_id=user.id, amount=Decimal("2500"), type="income", date=date(2026, 3, 5)),
+        Transaction(user_id=user.id, amount=Decimal("50"), type="expense", date=date(2026, 3, 9)),
+        new_plan(user.id, card.id, None, "expense", Decimal("300"), 3, date(2026, 3, 12), "Notebook"),
+    ])
+    db.commit()
+    with database.begin() as conn:
+        conn.execute(delete(MonthlyRollup))
+        conn.execute(delete(migrations.schema_migrations).where(migrations.schema_migrations.c.version == 12))
+
+    migrations.upgrade(database, log=lambda message: None)
+
+    summary = client.get("/dashboard/summary?month=3&year=2026", headers=headers).json()
+    assert summary["total_income"] == 2500
+    assert summary["total_expense"] == 150
+    april = client.get("/dashboard/summary?month=4&year=2026", headers=headers).json()
+    assert april["total_expense"] == 100
+
+
+def test_transactions_of_deleted_recurring_entries_are_detached(database, db):
+    user = User(email="orphan@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    entry = RecurringTransaction(user_id=user.id, amount=Decimal("50"), type="expense", day_of_month=1)
+    db.add(entry)
+    db.flush()
+    db.add_all([
+        Transaction(user_id=user.id, amount=Decimal("50"), type="expense", date=date(2026, 3, 1),
+                    recurring_id=entry.id, recurring_period=202603),
+        # Left behind by a delete that SQLite did not cascade
+        Transaction(user_id=user.id, amount=Decimal("50"), type="expense", date=date(2026, 2, 1),
+                    recurring_id=entry.id + 1, recurring_period=202602),
+    ])
+    db.commit()
+    with database.begin() as conn:
+        conn.execute(delete(migrations.schema_migrations).where(migrations.schema_migrations.c.version == 15))
+
+    migrations.upgrade(database, log=lambda message: None)
+
+    db.expire_all()
+    assert sorted((t.recurring_period, t.recurring_id) for t in db.query(Transaction)) == [
+        (202602, None), (202603, entry.id),
+    ]
@@ -0,0 +1,97 @@
+from datetime import date
+from decimal import Decimal
+
+from app import invoices, notifications
+from app.events import TransactionEvent
+from app.installments import new_plan
+from app.models import Budget, CreditCard, Notification, Transaction, User
+from app.rollups import record_transactions
+
+
+def _user(db) -> User:
+    user = User(email="notify@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _cards(db, user, count: int):
+    cards = [CreditCard(user_id=user.id, name=f"Card {n}", limit=Decimal("1000"), closing_day=1, due_day=10)
+             for n in range(count)]
+    db.add_all(cards)
+    db.commit()
+    return cards
+
+
+def _spend(db, user, card, amount: str, day: date):
+    tx = Transaction(user_id=user.id, amount=Decimal(amount), type="expense", date=day, credit_card_id=card.id)
+    db.add(tx)
+    record_transactions(db, [tx])
+    db.commit()
+    return TransactionEvent("created", user.id, "expense", tx.amount, tx.date, None, card.id, tx.id, "Compra")
+
+
+def test_outstanding_matches_each_card_invoice(db):
+    user = _user(db)
+    cards = _cards(db, user, 3)
+    today = date.today()
+    _spend(db, user, cards[0], "120", today)
+    _spend(db, user, cards[1], "40", today)
+    db.add(new_plan(user.id, cards[1].id, None, "expense", Decimal("300"), 3, today, "Notebook"))
+    db.commit()
+
+    totals = invoices.outstanding(db, cards, today)
+    for card in cards:
+        start = invoices.cycle_bounds(card, invoices.cycle_of(card, today)).start_date
+        assert totals[card.id] == invoices._totals(db, card, start, None)[0]
+    assert totals[cards[1].id] == Decimal("340")
+
+
+def test_card_limit_checks_only_the_cards_in_the_events(db, count_statements):
+    user = _user(db)
+    cards = _cards(db, user, 6)
+    today = date.today()
+    for card in cards:
+        _spend(db, user, card, "900", today)
+    event_for_one = _spend(db, user, cards[0], "1", today)
+
+    with count_statements() as statements:
+        rows = notifications.card_limit(db, [event_for_one])
+    assert [r["dedupe_key"].split(":")[1] for r in rows] == [str(cards[0].id)]
+
+    events = [_spend(db, user, card, "1", today) for card in cards]
+    with count_statements() as batched:
+        rows = notifications.card_limit(db, events)
+    assert len(rows) == len(cards)
+    # Cards, transactions, plans: the same for one card or six
+    assert len(statements) == len(batched) == 3
+
+
+def test_rules_notify_once(db):
+    user = _user(db)
+    card = _cards(db, user, 1)[0]
+    today = date.today()
+    db.add(Budget(user_id=user.id, category_id=None, month=today.month, year=today.year, amount=Decimal("500")))
+    db.commit()
+    events = [_spend(db, user, card, "1200", today)]
+
+    assert notifications.process_events(events) == 3
+    assert notifications.process_events(events) == 0
+    kinds = sorted(n.kind for n in db.query(Notification).filter(Notification.user_id == user.id))
+    assert kinds == ["budget_exceeded", "card_limit", "large_expense"]
+
+
+def test_unread_count_and_mark_read(client, login, db):
+    headers = login()
+    user_id = db.query(User.id).filter(User.email == "user@example.com").scalar()
+    db.add_all([Notification(user_id=user_id, kind="large_expense", dedupe_key=f"k{n}", title="t", message="m")
+                for n in range(3)])
+    db.commit()
+
+    assert client.get("/notifications/unread-count", headers=headers).json() == {"unread": 3}
+    first = client.get("/notifications/", headers=headers).json()[0]["id"]
+    assert client.post(f"/notifications/{first}/read", headers=headers).json()["read"] is True
+    assert client.get("/notifications/unread-count", headers=headers).json() == {"unread": 2}
+    assert client.post(f"/notifications/{first}/read", headers=login("other@example.com")).status_code == 404
+    client.post("/notifications/read-all", headers=headers)
+    assert client.get("/notifications/?unread=true", headers=headers).json() == []
@@ -0,0 +1,99 @@
+"""
+Query budget: SQL statements per endpoint against data seeded with
+`benchmarks/dataset.py`, checked against fixed upper bounds.
+
+Statements are counted by the same engine hooks and request observer that feed
+/metrics. An endpoint fails when it runs more statements than its budget, or
+when one statement text runs more than `repeats` times (a lazy load in a loop:
+N+1). Changing a route on purpose means adjusting its line in `BUDGETS`.
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.main import app, load_system_categories
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from dataset import PASSWORD, seed  # noqa: E402
+
+# (method, path, max statements, max runs of one statement)
+# Paths are formatted with: card, bank, month, year, cycle. JSON GETs include the ETag version lookup.
+BUDGETS = [
+    ("GET", "/auth/me", 0, 0),  # user served from the auth cache
+    ("GET", "/banks/", 2, 1),
+    ("GET", "/banks/{bank}", 2, 1),
+    ("GET", "/vaults/", 2, 1),
+    ("GET", "/categories/", 2, 1),
+    ("GET", "/credit-cards/", 2, 1),
+    ("GET", "/credit-cards/{card}/invoices", 32, 6),  # computes and stores 5 closed cycles
+    ("GET", "/credit-cards/{card}/invoices", 7, 1),  # closed cycles now cached
+    ("GET", "/credit-cards/{card}/invoices/{cycle}", 4, 1),
+    ("GET", "/recurring/", 2, 1),
+    ("GET", "/dashboard/summary?month={month}&year={year}", 2, 1),
+    ("GET", "/dashboard/evolution", 2, 1),
+    ("GET", "/dashboard/recurring", 2, 1),
+    ("GET", "/transactions/?limit=50", 3, 1),
+    ("GET", "/transactions/?limit=50&month={month}&year={year}", 3, 1),
+    ("GET", "/transactions/plans", 2, 1),
+    ("GET", "/budgets/?month={month}&year={year}", 2, 1),
+    ("GET", "/budgets/progress?month={month}&year={year}", 3, 1),
+    ("GET", "/notifications/", 1, 1),
+    ("GET", "/notifications/unread-count", 1, 1),
+    ("GET", "/reports/export/csv?month={month}&year={year}", 2, 1),
+    ("POST", "/transactions/", 11, 1),  # category checked in the registry; its name is loaded for the response
+]
+
+
+@pytest.fixture
+def observed():
+    """Requests through the metrics middleware, whatever METRICS_ENABLED says: (client, [(status, stats)])."""
+    seen = []
+
+    def observer(method, route, status, elapsed, stats):
+        seen.append((status, stats))
+
+    metrics.install_sql_hooks()
+    metrics.observers.append(observer)
+    yield TestClient(metrics.MetricsMiddleware(app)), seen
+    metrics.observers.remove(observer)
+
+
+# Budgets must not grow with the data
+@pytest.mark.parametrize("months, transactions", [(7, 20), (13, 80)])
+def test_endpoints_stay_within_their_query_budget(db, observed, months, transactions):
+    client, seen = observed
+    load_system_categories()  # as the app's startup does
+    email = seed(db, users=1, months=months, transactions_per_month=transactions)[0]
+
+    r = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    assert r.status_code == 200, r.text
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    client.get("/auth/me", headers=headers)  # fill the user cache, as any session after login would
+
+    card = client.get("/credit-cards/", headers=headers).json()[0]["id"]
+    bank = client.get("/banks/", headers=headers).json()[0]["id"]
+    category = client.get("/categories/", headers=headers).json()[-1]["id"]
+    today = date.today()
+    values = dict(card=card, bank=bank, month=today.month, year=today.year, cycle=f"{today.year}-{today.month:02d}")
+    new_transaction = {"amount": 42.5, "type": "expense", "date": today.isoformat(), "credit_card_id": card,
+                       "category_id": category, "description": "query budget"}
+
+    failures = []
+    for method, path, max_statements, max_repeats in BUDGETS:
+        url = path.format(**values)
+        seen.clear()
+        client.request(method, url, headers=headers, json=new_transaction if method == "POST" else None)
+        status, stats = seen[-1]
+        worst = stats.executions.most_common(1)
+        repeats = worst[0][1] if worst else 0
+        if status >= 400:
+            failures.append(f"{method} {url}: HTTP {status}")
+        if stats.statements > max_statements:
+            failures.append(f"{method} {url}: {stats.statements} statements, budget {max_statements}")
+        if repeats > max_repeats:
+            failures.append(f"{method} {url}: N+1? {repeats}x {' '.join(worst[0][0].split())[:120]}")
+    assert not failures, "\n".join(failures)
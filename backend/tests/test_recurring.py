@@ -0,0 +1,92 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app import recurring_engine
+from app.database import SessionLocal
+from app.models import Category, MonthlyRollup, RecurringTransaction, Transaction, User
+
+
+def _entry(db, created: datetime) -> RecurringTransaction:
+    user = User(email="recurring@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    entry = RecurringTransaction(user_id=user.id, amount=Decimal("120"), type="expense", day_of_month=10,
+                                 description="Aluguel", created_at=created)
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def test_backfills_missed_months_once(db):
+    _entry(db, datetime(2026, 1, 20))
+    stats = recurring_engine.run_recurring(today=date(2026, 3, 2))
+    assert stats.transactions_created == 3
+    assert recurring_engine.run_recurring(today=date(2026, 3, 2)).transactions_created == 0
+    assert sorted(t.date for t in db.query(Transaction)) == [date(2026, 1, 10), date(2026, 2, 10), date(2026, 3, 10)]
+
+
+@pytest.mark.parametrize("category_edited", [False, True])
+def test_two_workers_on_the_same_due_entry(db, monkeypatch, category_edited):
+    """A worker that loses the race retries its batch instead of failing the scheduler tick.
+
+    With the category edited in between, the two workers write different rollup
+    rows, so the loser's conflict surfaces while inserting its rollup row.
+    """
+    entry = _entry(db, datetime(2026, 5, 1))
+    category_id = db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first()[0]
+    record_transactions = recurring_engine.record_transactions
+    other_worker = []
+
+    def race(session, transactions):
+        # The other worker commits the same period after this one checked for existing rows
+        if not other_worker:
+            monkeypatch.setattr(recurring_engine, "record_transactions", record_transactions)
+            if category_edited:
+                db.query(RecurringTransaction).filter(RecurringTransaction.id == entry.id).update(
+                    {RecurringTransaction.category_id: category_id})
+                db.commit()
+            other_worker.append(recurring_engine.run_recurring(SessionLocal, today=date(2026, 5, 15)))
+        record_transactions(session, transactions)
+
+    monkeypatch.setattr(recurring_engine, "record_transactions", race)
+    stats = recurring_engine.run_recurring(SessionLocal, today=date(2026, 5, 15))
+
+    assert other_worker[0].transactions_created == 1
+    assert stats.transactions_created == 0
+    assert db.query(Transaction).count() == 1
+    rollup = db.query(MonthlyRollup).one()
+    assert (rollup.total, rollup.count) == (Decimal("120.00"), 1)
+
+
+def test_reactivation_does_not_backfill_the_paused_months(db, client, login):
+    headers = login("paused@example.com")
+    entry = client.post("/recurring/", json={"amount": 80, "type": "expense", "day_of_month": 1,
+                                             "description": "Academia"}, headers=headers).json()
+    db.query(RecurringTransaction).update({RecurringTransaction.created_at: datetime(2025, 1, 1)})
+    db.commit()
+
+    client.put(f"/recurring/{entry['id']}", json={"is_active": False}, headers=headers)
+    assert recurring_engine.run_recurring().transactions_created == 0
+    client.put(f"/recurring/{entry['id']}", json={"is_active": True}, headers=headers)
+    assert recurring_engine.run_recurring().transactions_created == 1
+
+    today = date.today()
+    assert [t.recurring_period for t in db.query(Transaction)] == [today.year * 100 + today.month]
+
+
+def test_deleted_entry_releases_its_periods_for_a_reused_id(db, client, login):
+    headers = login("deleted@example.com")
+    first = client.post("/recurring/", json={"amount": 50, "type": "expense", "day_of_month": 1,
+                                             "description": "Streaming"}, headers=headers).json()
+    assert recurring_engine.run_recurring().transactions_created == 1
+    assert client.delete(f"/recurring/{first['id']}", headers=headers).status_code == 204
+    assert db.query(Transaction.recurring_id).scalar() is None
+
+    # SQLite hands the freed id to the next entry
+    second = client.post("/recurring/", json={"amount": 70, "type": "expense", "day_of_month": 1,
+                                              "description": "Internet"}, headers=headers).json()
+    assert second["id"] == first["id"]
+    assert recurring_engine.run_recurring().transactions_created == 1
+    assert sorted(t.amount for t in db.query(Transaction)) == [Decimal("50.00"), Decimal("70.00")]
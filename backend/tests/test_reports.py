@@ -0,0 +1,55 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from app import report_jobs
+
+
+@pytest.fixture(autouse=True)
+def reports_dir():
+    shutil.rmtree(report_jobs.REPORTS_DIR, ignore_errors=True)
+    yield report_jobs.REPORTS_DIR
+    report_jobs.shutdown()
+
+
+def _finished(client, headers, job_id: str) -> dict:
+    deadline = time.monotonic() + 30
+    while True:
+        job = client.get(f"/reports/jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def _report(client, headers) -> str:
+    r = client.post("/reports/jobs", json={"kind": "monthly", "year": 2026, "month": 4}, headers=headers)
+    assert r.status_code == 202, r.text
+    job_id = r.json()["id"]
+    assert _finished(client, headers, job_id)["status"] == "done"
+    return job_id
+
+
+def test_unchanged_data_reuses_the_report(client, login):
+    headers = login()
+    client.post("/transactions/", json={"amount": 30, "type": "expense", "date": "2026-04-02"}, headers=headers)
+    assert _report(client, headers) == _report(client, headers)
+
+
+def test_edit_without_amount_change_renders_a_new_report_and_drops_the_old_one(client, login, reports_dir):
+    headers = login()
+    category = client.post("/categories/", json={"name": "Mercado", "type": "expense"}, headers=headers).json()
+    client.post("/transactions/", json={"amount": 30, "type": "expense", "date": "2026-04-02",
+                                        "category_id": category["id"]}, headers=headers)
+    first = _report(client, headers)
+
+    # Same transactions, count and amounts: only the category name changes
+    client.put(f"/categories/{category['id']}", json={"name": "Supermercado", "type": "expense"}, headers=headers)
+    second = _report(client, headers)
+
+    assert second != first
+    assert client.get(f"/reports/jobs/{first}", headers=headers).status_code == 404
+    assert client.get(f"/reports/jobs/{second}/download", headers=headers).status_code == 200
+    files = [name for _, _, names in os.walk(reports_dir) for name in names]
+    assert len(files) == 1 and files[0].endswith(f"-{second}.pdf")
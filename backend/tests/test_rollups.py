@@ -0,0 +1,65 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models import MonthlyRollup, RecurringTransaction, Transaction, User
+from app.rollups import record_transactions
+
+
+def _user(db) -> User:
+    user = User(email="rollups@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _rollups(db):
+    return {
+        (r.year, r.month, r.category_id, r.type): (r.total, r.count)
+        for r in db.query(MonthlyRollup).all()
+    }
+
+
+def test_record_and_remove_transactions(db):
+    user = _user(db)
+    txs = [
+        Transaction(user_id=user.id, amount=Decimal("10.50"), type="expense", date=date(2026, 1, 3)),
+        Transaction(user_id=user.id, amount=Decimal("4.50"), type="expense", date=date(2026, 1, 20)),
+        Transaction(user_id=user.id, amount=Decimal("100"), type="income", date=date(2026, 2, 1)),
+    ]
+    db.add_all(txs)
+    record_transactions(db, txs)
+    db.commit()
+    assert _rollups(db) == {
+        (2026, 1, 0, "expense"): (Decimal("15.00"), 2),
+        (2026, 2, 0, "income"): (Decimal("100.00"), 1),
+    }
+
+    record_transactions(db, txs[2:], sign=-1)
+    db.delete(txs[2])
+    db.commit()
+    assert _rollups(db) == {(2026, 1, 0, "expense"): (Decimal("15.00"), 2)}
+
+
+def test_conflicting_pending_row_reaches_the_caller(db):
+    """A duplicate recurring period in the caller's pending rows is not taken for the rollup race."""
+    user = _user(db)
+    recurring = RecurringTransaction(user_id=user.id, amount=Decimal("50"), type="expense", day_of_month=5)
+    db.add(recurring)
+    db.commit()
+    # Written by another worker, without rollups so the next write has to insert one
+    db.add(Transaction(user_id=user.id, amount=Decimal("50"), type="expense", date=date(2026, 3, 5),
+                       recurring_id=recurring.id, recurring_period=202603))
+    db.commit()
+
+    duplicate = Transaction(user_id=user.id, amount=Decimal("50"), type="expense", date=date(2026, 3, 5),
+                            recurring_id=recurring.id, recurring_period=202603)
+    db.add(duplicate)
+    with pytest.raises(IntegrityError):
+        record_transactions(db, [duplicate])
+
+    db.rollback()
+    assert db.query(Transaction).count() == 1
+    assert _rollups(db) == {}
@@ -0,0 +1,105 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.database import engine
+from app.models import InstallmentPlan, Transaction
+from app.search import search_statement
+
+
+@pytest.fixture
+def transactions(client, login):
+    headers = login()
+    for day, description in (("2026-04-01", "Alimentação - Mercado"), ("2026-04-02", "Farmácia São João"),
+                             ("2026-04-03", "Mercadinho do bairro"), ("2026-04-04", "Posto_Shell")):
+        client.post("/transactions/", json={"amount": 10, "type": "expense", "date": day,
+                                            "description": description}, headers=headers)
+    return headers
+
+
+def _search(client, headers, q):
+    r = client.get("/transactions/search", params={"q": q}, headers=headers)
+    assert r.status_code == 200, r.text
+    return [t["description"] for t in r.json()]
+
+
+def test_prefix_and_accent_insensitive(client, transactions):
+    assert _search(client, transactions, "alimenta merc") == ["Alimentação - Mercado"]
+    assert sorted(_search(client, transactions, "merc")) == ["Alimentação - Mercado", "Mercadinho do bairro"]
+    assert _search(client, transactions, "farmacia sao") == ["Farmácia São João"]
+
+
+def test_other_users_transactions_are_not_found(client, login, transactions):
+    assert _search(client, login("other@example.com"), "mercado") == []
+
+
+def test_fallback_without_a_search_index(client, transactions, monkeypatch):
+    """Databases other than SQLite and PostgreSQL match with LIKE instead of failing."""
+    monkeypatch.setattr(engine.dialect, "name", "generic")
+    assert _search(client, transactions, "mercad") == ["Mercadinho do bairro", "Alimentação - Mercado"]
+    assert _search(client, transactions, "shell posto") == ["Posto_Shell"]
+    assert _search(client, transactions, "o_s") == ["Posto_Shell"]
+    assert _search(client, transactions, "xyz") == []
+
+
+@pytest.fixture
+def purchases(client, transactions):
+    card = client.post("/credit-cards/", json={"name": "Nu", "limit": 5000, "closing_day": 5, "due_day": 12},
+                       headers=transactions).json()
+    client.post("/transactions/", json={"amount": 300, "type": "expense", "date": "2026-02-10", "installments": 3,
+                                        "credit_card_id": card["id"], "description": "Geladeira Eletrolux"},
+                headers=transactions)
+    return transactions
+
+
+def test_installment_purchases_are_found(client, purchases):
+    found = client.get("/transactions/search", params={"q": "geladeira"}, headers=purchases).json()
+    assert [(t["date"], t["description"], t["id"]) for t in found] == [
+        ("2026-04-10", "Geladeira Eletrolux (3/3)", None),
+        ("2026-03-10", "Geladeira Eletrolux (2/3)", None),
+        ("2026-02-10", "Geladeira Eletrolux (1/3)", None),
+    ]
+    assert found[0]["installment_plan_id"] and found[0]["amount"] == 100
+
+    in_march = client.get("/transactions/search", params={"q": "geladeira", "start": "2026-03-01", "end": "2026-03-10"},
+                          headers=purchases).json()
+    assert [t["description"] for t in in_march] == ["Geladeira Eletrolux (2/3)"]
+    assert _search(client, purchases, "eletrolux mercado") == []
+
+
+def test_plan_description_edits_are_reindexed(client, purchases):
+    plan = client.get("/transactions/plans", headers=purchases).json()[0]
+    client.put(f"/transactions/plans/{plan['id']}", json={"description": "Fogão"}, headers=purchases)
+    assert _search(client, purchases, "geladeira") == []
+    assert len(_search(client, purchases, "fogao")) == 3
+    client.delete(f"/transactions/plans/{plan['id']}", headers=purchases)
+    assert _search(client, purchases, "fogao") == []
+
+
+def test_pages_merge_transactions_and_installments(client, purchases):
+    client.post("/transactions/", json={"amount": 10, "type": "expense", "date": "2026-03-20",
+                                        "description": "Geladeira usada"}, headers=purchases)
+    full = _search(client, purchases, "geladeira")
+    assert len(full) == 4
+    pages = []
+    for offset in range(0, 4, 3):
+        r = client.get("/transactions/search", params={"q": "geladeira", "limit": 3, "offset": offset},
+                       headers=purchases)
+        pages += [t["description"] for t in r.json()]
+    assert pages == full
+
+
+def test_postgresql_statement():
+    stmt = search_statement(InstallmentPlan, "postgresql", 7, ["alimenta", "merc"], [], 20)
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "installment_plans.search_vector @@ to_tsquery('sisfinance_pt', 'alimenta:* & merc:*')" in sql
+    assert "ORDER BY -ts_rank_cd(installment_plans.search_vector, to_tsquery('sisfinance_pt', 'alimenta:* & merc:*'))" in sql
+    assert "installment_plans.user_id = 7" in sql and "LIMIT 20" in sql
+
+
+def test_fallback_finds_installments(client, purchases, monkeypatch):
+    monkeypatch.setattr(engine.dialect, "name", "generic")
+    assert _search(client, purchases, "eletrolux") == [
+        "Geladeira Eletrolux (3/3)", "Geladeira Eletrolux (2/3)", "Geladeira Eletrolux (1/3)",
+    ]
+    stmt = search_statement(Transaction, "generic", 7, ["merc"], [], 20)
+    assert "ORDER BY transactions.date DESC, transactions.id DESC" in str(stmt)
@@ -0,0 +1,60 @@
+import pytest
+
+from app import fastjson
+
+
+@pytest.fixture(params=[False, True], ids=["pydantic", "fastjson"])
+def serializer(request, monkeypatch):
+    if request.param and fastjson.orjson is None:
+        pytest.skip("orjson not installed")
+    monkeypatch.setattr(fastjson, "FAST_JSON", request.param)
+
+
+def _key(item):
+    return (item["date"], item["id"], item["installment_plan_id"], item["installment_number"])
+
+
+def _pages(client, headers, limit: int, query: str = ""):
+    items, cursor, pages = [], None, 0
+    while True:
+        url = f"/transactions/?limit={limit}{query}" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        items += body["items"]
+        pages += 1
+        cursor = body["next_cursor"]
+        if not cursor:
+            return items, pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_cursor_pages_through_transactions_and_installments(client, login, serializer, limit):
+    headers = login()
+    card = client.post("/credit-cards/", json={"name": "Nu", "limit": 5000, "closing_day": 5, "due_day": 12},
+                       headers=headers).json()
+    # Several transactions and installments share a date, so pages split inside a day
+    for day in ("2026-01-15", "2026-02-15", "2026-02-15", "2026-03-01", "2026-03-15", "2026-04-20"):
+        client.post("/transactions/", json={"amount": 10, "type": "expense", "date": day}, headers=headers)
+    for first in ("2026-01-15", "2026-02-15"):
+        client.post("/transactions/", json={"amount": 300, "type": "expense", "date": first,
+                                            "credit_card_id": card["id"], "installments": 3}, headers=headers)
+
+    everything = client.get("/transactions/?limit=500", headers=headers).json()
+    assert everything["next_cursor"] is None
+    assert len(everything["items"]) == 12
+    assert sum(1 for i in everything["items"] if i["installment_plan_id"]) == 6
+
+    paged, pages = _pages(client, headers, limit)
+    assert [_key(i) for i in paged] == [_key(i) for i in everything["items"]]
+    assert pages == -(-12 // limit)
+    dates = [i["date"] for i in paged]
+    assert dates == sorted(dates, reverse=True)
+
+    march, _ = _pages(client, headers, limit, "&month=3&year=2026")
+    assert [i["date"] for i in march] == ["2026-03-15", "2026-03-15", "2026-03-15", "2026-03-01"]
+
+
+def test_invalid_cursor(client, login):
+    r = client.get("/transactions/?cursor=not-a-cursor", headers=login())
+    assert r.status_code == 400
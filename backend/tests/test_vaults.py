@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.balances import adjust_vault_balance
+from app.database import SessionLocal, engine
+from app.models import Bank, Vault
+
+
+@pytest.fixture
+def concurrent_deposit():
+    """concurrent_deposit(vault_id, amount): another request adds `amount` right after the next vault read."""
+    pending = []
+
+    def after(conn, cursor, statement, *args):
+        if pending and statement.lstrip().startswith("SELECT") and "FROM vaults" in statement:
+            vault_id, amount = pending.pop()
+            with SessionLocal() as other:
+                adjust_vault_balance(other, other.get(Vault, vault_id), amount)
+                other.commit()
+
+    event.listen(engine, "after_cursor_execute", after)
+    yield lambda vault_id, amount: pending.append((vault_id, Decimal(amount)))
+    event.remove(engine, "after_cursor_execute", after)
+
+
+@pytest.fixture
+def accounts(client, login):
+    headers = login()
+    banks = [client.post("/banks/", json={"name": name}, headers=headers).json()["id"] for name in ("Itaú", "Nubank")]
+    vault = client.post("/vaults/", json={"name": "Reserva", "bank_id": banks[0], "initial_balance": 100},
+                        headers=headers).json()["id"]
+    return headers, banks, vault
+
+
+def _balances(db, banks, vault):
+    db.expire_all()
+    return [db.get(Bank, b).current_balance for b in banks], db.get(Vault, vault)
+
+
+def test_balance_edit_keeps_a_concurrent_deposit(client, db, accounts, concurrent_deposit):
+    headers, banks, vault = accounts
+    concurrent_deposit(vault, "30")
+    assert client.put(f"/vaults/{vault}", json={"balance": 150}, headers=headers).status_code == 200
+
+    (first, second), row = _balances(db, banks, vault)
+    assert row.balance == Decimal("180.00")  # the edit's +50 on top of the deposit
+    assert (first, second) == (row.balance, 0)
+
+
+def test_moving_a_vault_takes_its_current_balance(client, db, accounts, concurrent_deposit):
+    headers, banks, vault = accounts
+    concurrent_deposit(vault, "30")
+    assert client.put(f"/vaults/{vault}", json={"bank_id": banks[1]}, headers=headers).status_code == 200
+
+    (first, second), row = _balances(db, banks, vault)
+    assert (row.bank_id, first, second) == (banks[1], 0, Decimal("130.00"))
+
+
+def test_deleting_a_vault_removes_its_current_balance(client, db, accounts, concurrent_deposit):
+    headers, banks, vault = accounts
+    concurrent_deposit(vault, "30")
+    assert client.delete(f"/vaults/{vault}", headers=headers).status_code == 204
+
+    db.expire_all()
+    assert db.get(Bank, banks[0]).current_balance == 0
@@ -1,6 +1,6 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { api } from '../services/api'
-import type { CreditCard } from '../types'
+import type { CreditCard, InvoiceDetail, InvoiceList } from '../types'
 
 export function useCreditCards() {
     const queryClient = useQueryClient()
@@ -30,6 +30,7 @@ export function useCreditCards() {
         },
         onSuccess: () => {
             queryClient.invalidateQueries({ queryKey: ['creditCards'] })
+            queryClient.invalidateQueries({ queryKey: ['invoices'] })
         }
     })
 
@@ -50,3 +51,25 @@ export function useCreditCards() {
         deleteMutation
     }
 }
+
+export function useInvoices(cardId: number | null, months = 6) {
+    return useQuery({
+        queryKey: ['invoices', cardId, months],
+        queryFn: async () => {
+            const res = await api.get(`/credit-cards/${cardId}/invoices`, { params: { months } })
+            return res.data as InvoiceList
+        },
+        enabled: cardId != null
+    })
+}
+
+export function useInvoice(cardId: number | null, cycle: string | null) {
+    return useQuery({
+        queryKey: ['invoices', cardId, cycle],
+        queryFn: async () => {
+            const res = await api.get(`/credit-cards/${cardId}/invoices/${cycle}`)
+            return res.data as InvoiceDetail
+        },
+        enabled: cardId != null && cycle != null
+    })
+}
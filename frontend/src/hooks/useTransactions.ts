@@ -1,6 +1,8 @@
-import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query'
+import { useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import { api } from '../services/api'
-import type { Transaction } from '../types'
+import type { Transaction, TransactionPage } from '../types'
+
+const PAGE_SIZE = 50
 
 interface TransactionPayload {
   amount: number
@@ -17,12 +19,15 @@ interface TransactionPayload {
 export function useTransactions(month: number, year: number) {
   const qc = useQueryClient()
 
-  const listQuery = useQuery({
+  const listQuery = useInfiniteQuery({
     queryKey: ['transactions', month, year],
-    queryFn: async () => {
-      const res = await api.get('/transactions', { params: { month, year } })
-      return res.data as Transaction[]
+    queryFn: async ({ pageParam }) => {
+      const params = { month, year, limit: PAGE_SIZE, ...(pageParam ? { cursor: pageParam } : {}) }
+      const res = await api.get('/transactions', { params })
+      return res.data as TransactionPage
     },
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
   })
 
   const addMutation = useMutation({
@@ -35,18 +40,25 @@ export function useTransactions(month: number, year: number) {
       qc.invalidateQueries({ queryKey: ['dashboard', month, year] })
       qc.invalidateQueries({ queryKey: ['banks'] })
       qc.invalidateQueries({ queryKey: ['vaults'] })
+      qc.invalidateQueries({ queryKey: ['invoices'] })
     }
   })
 
   const deleteMutation = useMutation({
-    mutationFn: async (id: number) => {
-      await api.delete(`/transactions/${id}`)
+    mutationFn: async (t: Transaction) => {
+      // Installments belong to a plan: deleting one cancels the whole purchase
+      if (t.installment_plan_id) {
+        await api.delete(`/transactions/plans/${t.installment_plan_id}`)
+      } else {
+        await api.delete(`/transactions/${t.id}`)
+      }
     },
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ['transactions', month, year] })
       qc.invalidateQueries({ queryKey: ['dashboard', month, year] })
       qc.invalidateQueries({ queryKey: ['banks'] })
       qc.invalidateQueries({ queryKey: ['vaults'] })
+      qc.invalidateQueries({ queryKey: ['invoices'] })
     }
   })
 
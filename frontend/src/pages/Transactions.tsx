@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { setAuthToken } from '../services/api'
 import { useTransactions } from '../hooks/useTransactions'
 import { useBanks } from '../hooks/useBanks'
@@ -7,6 +7,7 @@ import { useCategories, useCreateCategory } from '../hooks/useCategories'
 import { useCreditCards } from '../hooks/useCreditCards'
 import { formatCurrency, formatCurrencyInput, parseCurrency } from '../utils/currency'
 import { useToast } from '../components/Toast'
+import type { Transaction } from '../types'
 
 /* ═══════════════════════════════════════════════════════════════════════════
    CONSTANTS
@@ -184,10 +185,13 @@ export default function Transactions() {
     }
   }
 
-  const handleDelete = async (id: number) => {
-    if (confirm('Tem certeza que deseja excluir esta transação?')) {
+  const handleDelete = async (t: Transaction) => {
+    const message = t.installment_plan_id
+      ? 'Esta é uma compra parcelada. Excluir todas as parcelas?'
+      : 'Tem certeza que deseja excluir esta transação?'
+    if (confirm(message)) {
       try {
-        await deleteMutation.mutateAsync(id)
+        await deleteMutation.mutateAsync(t)
         showToast('Transação excluída com sucesso!', 'success')
       } catch (err: any) {
         showToast(err?.response?.data?.detail || 'Erro ao excluir transação', 'error')
@@ -195,7 +199,20 @@ export default function Transactions() {
     }
   }
 
-  const items = listQuery.data || []
+  const items = listQuery.data?.pages.flatMap(page => page.items) || []
+
+  // Load the next page when the end of the list scrolls into view
+  const loadMoreRef = useRef<HTMLDivElement>(null)
+  const { hasNextPage, isFetchingNextPage, fetchNextPage } = listQuery
+  useEffect(() => {
+    const node = loadMoreRef.current
+    if (!node || !hasNextPage) return
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting && !isFetchingNextPage) fetchNextPage()
+    })
+    observer.observe(node)
+    return () => observer.disconnect()
+  }, [hasNextPage, isFetchingNextPage, fetchNextPage])
   const filteredCategories = categories.filter(c => c.type === form.type)
 
   return (
@@ -411,7 +428,7 @@ export default function Transactions() {
               const bank = banks.find(b => b.id === vault?.bank_id)
 
               return (
-                <div key={t.id} className="transaction-item">
+                <div key={t.installment_plan_id ? `plan-${t.installment_plan_id}-${t.installment_number}` : t.id} className="transaction-item">
                   <div className="transaction-item__info">
                     <span className="transaction-item__description">
                       {t.description || (t.type === 'income' ? 'Receita' : 'Despesa')}
@@ -432,7 +449,7 @@ export default function Transactions() {
                     </span>
                     <button
                       className="btn-icon danger"
-                      onClick={() => handleDelete(t.id)}
+                      onClick={() => handleDelete(t)}
                       title="Excluir transação"
                     >
                       🗑️
@@ -442,6 +459,8 @@ export default function Transactions() {
               )
             })}
           </div>
+          <div ref={loadMoreRef} />
+          {isFetchingNextPage && <div className="loading">Carregando...</div>}
         </div>
       </div>
 
@@ -37,6 +37,27 @@ export interface CreditCard {
     created_at: string;
 }
 
+export interface Invoice {
+    cycle: string; // YYYY-MM of the closing date
+    status: 'open' | 'closed' | 'future';
+    start_date: string;
+    closing_date: string;
+    due_date: string;
+    total: number;
+    count: number;
+}
+
+export interface InvoiceList {
+    credit_card_id: number;
+    limit: number;
+    available_limit: number;
+    invoices: Invoice[];
+}
+
+export interface InvoiceDetail extends Invoice {
+    items: Transaction[];
+}
+
 export interface Category {
     id: number;
     user_id?: number;
@@ -48,7 +69,7 @@ export interface Category {
 }
 
 export interface Transaction {
-    id: number;
+    id: number | null; // null for installments of an installment plan
     user_id: number;
     category_id?: number;
     bank_id?: number;
@@ -60,6 +81,16 @@ export interface Transaction {
     description?: string;
     installment_number?: number;
     total_installments?: number;
+    category_name?: string;
+    bank_name?: string;
+    vault_name?: string;
+    credit_card_name?: string;
+    installment_plan_id?: number | null;
+}
+
+export interface TransactionPage {
+    items: Transaction[];
+    next_cursor?: string | null;
 }
 
 export interface RecurringTransaction {